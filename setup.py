@@ -29,7 +29,12 @@ setup(
     author_email='tom@tomforb.es',
     description='Render HTML and Markdown to a specific portion of a word document',
     install_requires=requires,
+    extras_require={
+        'markdown': ['markdown-it-py'],
+        'async': ['aiohttp'],
+    },
     long_description=readme,
+    python_requires='>=3.5',
     package_data={'wordinserter': ['images/*']},
     entry_points={
         'console_scripts': [
@@ -38,8 +43,10 @@ setup(
     },
     classifiers=[
         'Programming Language :: Python :: 3 :: Only',
-        'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6'
+        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9'
     ]
 )
@@ -0,0 +1,51 @@
+"""
+Time rendering a wide table with Word fitting the columns to their content as it is typed (AllowAutoFit) and with
+the column widths estimated up front. Against the fake COM backend this only measures wordinserter's own overhead and
+COM calls, Word's reflowing of the table only shows up with --word, which renders into a new Word document instead
+(Windows only).
+
+Usage: python tests/benchmarks/column_widths.py [rows] [columns] [--word]
+"""
+import sys
+import time
+
+from wordinserter import insert, parse
+from wordinserter.profiling import Profiler
+from wordinserter.renderers.fake import FakeConstants, FakeDocument
+
+
+def build_document(rows, columns):
+    cells = ["<td>Row {{0}} column {0}{1}</td>".format(column, " with some more text" * (column % 3))
+             for column in range(columns)]
+    row = "<tr>" + "".join(cells) + "</tr>"
+    return "<table>{0}</table>".format("".join(row.format(i) for i in range(rows)))
+
+
+def open_document(use_word):
+    if not use_word:
+        return FakeDocument(), FakeConstants()
+
+    from comtypes.client import CreateObject
+    word = CreateObject("Word.Application")
+    from comtypes.gen import Word as constants
+    return word.Documents.Add(), constants
+
+
+if __name__ == "__main__":
+    arguments = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    rows = int(arguments[0]) if arguments else 1000
+    columns = int(arguments[1]) if len(arguments) > 1 else 12
+    use_word = "--word" in sys.argv
+
+    for estimate in (False, True):
+        document, constants = open_document(use_word)
+        operations = parse(build_document(rows, columns))
+        profiler = Profiler()
+
+        start = time.perf_counter()
+        insert(operations, document=document, constants=constants, profiler=profiler,
+               estimate_column_widths=estimate)
+        elapsed = time.perf_counter() - start
+
+        print("estimate_column_widths={0!s:5} {1} x {2}: {3:8.1f} ms, {4} COM calls".format(
+            estimate, rows, columns, elapsed * 1000, profiler.com_calls))
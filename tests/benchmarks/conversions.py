@@ -0,0 +1,76 @@
+"""
+Compare the memoized CSS color and length conversions with the implementations they replaced, on the kind of values a
+document repeats on every element.
+
+Usage: python tests/benchmarks/conversions.py [values]
+"""
+import random
+import sys
+import timeit
+
+import webcolors
+
+from wordinserter.renderers.com import WordFormatter
+
+COLORS = ["black", "red", "#333", "#9bbb59", "#FFFFFF", "rgb(199, 12, 15)", "none"]
+SIZES = ["12px", "16px", "11pt", "10.5pt", "14", "1px", "0"]
+
+CSS3_NAMES_TO_HEX = getattr(webcolors, "css3_names_to_hex", None) or \
+    {name: webcolors.name_to_hex(name) for name in webcolors.names("css3")}
+
+
+def old_style_to_wdcolor(value):
+    if value == 'none':
+        return None
+
+    try:
+        if value.startswith('rgb('):
+            left, right = value.find("("), value.find(")")
+            value = webcolors.rgb_to_hex([int(v.strip()) for v in value[left + 1:right].split(",")])
+        elif value in CSS3_NAMES_TO_HEX:
+            value = CSS3_NAMES_TO_HEX[value]
+
+        rgb = webcolors.hex_to_rgb(value)
+        return int(rgb[0]) + 0x100 * int(rgb[1]) + 0x10000 * int(rgb[2])
+    except Exception:
+        return None
+
+
+def old_size_to_points(css_value):
+    if isinstance(css_value, str):
+        is_pt = css_value.endswith('pt')
+        if css_value.endswith("px") or is_pt:
+            css_value = css_value[:-2]
+
+        try:
+            css_value = float(css_value)
+        except ValueError:
+            return None
+
+        if is_pt:
+            return css_value
+
+        css_value = round(css_value)
+
+    return css_value * 0.75
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    colors = [random.choice(COLORS) for _ in range(count)]
+    sizes = [random.choice(SIZES) for _ in range(count)]
+
+    assert [old_style_to_wdcolor(c) for c in colors] == WordFormatter.styles_to_wdcolor(colors)
+    assert [old_size_to_points(s) for s in sizes] == WordFormatter.sizes_to_points(sizes)
+
+    cases = [
+        ("colors (old)", lambda: [old_style_to_wdcolor(c) for c in colors]),
+        ("colors (new)", lambda: WordFormatter.styles_to_wdcolor(colors)),
+        ("sizes (old)", lambda: [old_size_to_points(s) for s in sizes]),
+        ("sizes (new)", lambda: WordFormatter.sizes_to_points(sizes)),
+    ]
+
+    print("{0} values".format(count))
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print("{0:14} {1:8.1f} ms".format(name, best * 1000))
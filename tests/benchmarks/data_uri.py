@@ -0,0 +1,43 @@
+"""
+Compare the time and peak memory of decoding a large data: URI image with the streaming decoder and with the
+previous implementation, which split the URI and decoded it in one go.
+
+Usage: python tests/benchmarks/data_uri.py [megabytes]
+"""
+import base64
+import codecs
+import os
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from wordinserter.operations import DataURI, Image
+
+
+def old_decode(uri):
+    split = urlsplit(uri)
+    mimetype, rest = split.path.split(";")
+    encoding, data = rest.split(",")
+    return Image.write_to_temp_file(codecs.decode(bytes(data, "utf8"), "base64"))
+
+
+def new_decode(uri):
+    return DataURI(uri).decode()
+
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    uri = "data:image/png;base64," + base64.b64encode(os.urandom(megabytes * 1024 * 1024)).decode("ascii")
+    print("{0} MiB image, {1:.1f} MiB URI".format(megabytes, len(uri) / 1024 / 1024))
+
+    for name, decode in (("old", old_decode), ("streaming", new_decode)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        path = decode(uri)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        os.unlink(path)
+
+        print("{0:10} {1:8.0f} ms  peak {2:6.1f} MiB".format(name, elapsed * 1000, peak / 1024 / 1024))
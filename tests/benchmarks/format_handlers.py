@@ -0,0 +1,71 @@
+"""
+Time COMRenderer.handle_format over the formatted elements of the table background and style inheritance test
+documents, against the fake COM backend. "uncached" clears the compiled formats before every element, so every
+format is worked out again as it was before formats were compiled, "compiled" reuses them as rendering does.
+
+Usage: python tests/benchmarks/format_handlers.py [copies] [passes]
+"""
+import pathlib
+import sys
+import time
+
+from wordinserter import parse
+from wordinserter.renderers.com import COMRenderer
+from wordinserter.renderers.fake import FakeConstants, FakeDocument
+
+DOCS = pathlib.Path(__file__).parent.parent / "docs"
+WORKLOADS = ("tables_background_colors.html", "style_inheritance.html")
+
+
+class CollectingRenderer(COMRenderer):
+    """
+    Keeps the formats collected while rendering instead of applying them
+    """
+    def apply_recursive_formatting(self, stack):
+        self.formats = []
+        pending = [iter(stack)]
+
+        while pending:
+            item = next(pending[-1], None)
+            if item is None:
+                pending.pop()
+            elif isinstance(item, tuple):
+                self.formats.append(item)
+            else:
+                pending.append(iter(item))
+
+
+def best_of(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    passes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    for name in WORKLOADS:
+        renderer = CollectingRenderer(FakeDocument(), FakeConstants())
+        renderer.render(parse((DOCS / name).read_text() * copies))
+        formats = renderer.formats
+
+        def apply(clear):
+            for _ in range(passes):
+                for item in formats:
+                    if clear:
+                        renderer._compiled_formats.clear()
+                    renderer.handle_format(*item)
+
+        calls = len(formats) * passes
+        uncached = best_of(lambda: apply(True))
+        compiled = best_of(lambda: apply(False))
+
+        print("{0}: {1} formatted elements, {2} distinct formats".format(
+            name, len(formats), len(renderer._compiled_formats)))
+        print("  uncached  {0:8.2f} us per element".format(uncached / calls * 1000000))
+        print("  compiled  {0:8.2f} us per element".format(compiled / calls * 1000000))
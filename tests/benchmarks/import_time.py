@@ -0,0 +1,38 @@
+"""
+Report the import time of wordinserter and of each backend, the time a short-lived process pays before doing any
+work, measured with `python -X importtime` in new interpreters.
+
+Usage: python tests/benchmarks/import_time.py [runs]
+"""
+import subprocess
+import sys
+
+CASES = [
+    "import wordinserter",
+    "import wordinserter.cli",
+    "import wordinserter.parsers.simple",
+    "import wordinserter.parsers.html",
+    "import wordinserter.parsers.markdown",
+    "import wordinserter.renderers.com",
+    "import wordinserter.renderers.ooxml",
+]
+
+
+def cumulative(code):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    # Sum every top-level import the statement triggered, so parent packages are included
+    total = 0
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and not parts[2].startswith("  ") and parts[2].strip().startswith("wordinserter"):
+            total += int(parts[1])
+    return total / 1000
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    for code in CASES:
+        best = min(cumulative(code) for _ in range(runs))
+        print("{0:40} {1:8.1f} ms".format(code, best))
@@ -0,0 +1,64 @@
+"""
+Compare the peak RSS of building the BeautifulSoup tree for a large HTML file when the file is read into a string (the
+old CLI behaviour) and when it is memory mapped and fed to lxml in chunks.
+
+Each mode runs in its own process, so the peaks don't affect each other.
+
+Usage: python tests/benchmarks/input_memory.py [megabytes]
+"""
+import mmap
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROW = "<p>Paragraph {0} with <b>bold</b>, <i>italic</i> and café <a href='http://example.com/{0}'>a link</a></p>\n"
+
+
+def write_document(path, megabytes):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><head><meta charset='utf-8'></head><body>\n")
+        written, i = 0, 0
+        while written < megabytes * 1024 * 1024:
+            row = ROW.format(i)
+            f.write(row)
+            written += len(row.encode("utf-8"))
+            i += 1
+        f.write("</body></html>")
+
+
+def measure(mode, path):
+    import bs4
+    from wordinserter.parsers.html import soup_from_stream
+
+    start = time.perf_counter()
+
+    if mode == "read_text":
+        soup = bs4.BeautifulSoup(pathlib.Path(path).read_text(), "lxml")
+    else:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            soup = soup_from_stream(mapped)
+
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print("{0:10} peak RSS {1:8.0f} MiB {2:8.1f} s".format(mode, peak, elapsed))
+    return soup
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "input.html")
+        write_document(path, megabytes)
+        print("{0} MiB of HTML".format(megabytes))
+
+        for mode in ("read_text", "stream"):
+            subprocess.run([sys.executable, __file__, "--measure", mode, path], check=True)
@@ -0,0 +1,60 @@
+"""
+Time each row of a large table as it is rendered, with and without large document mode, to check that the time per
+row stays flat as the table grows. Against the fake COM backend this only measures wordinserter's own overhead, pass
+--word to render into a new Word document instead (Windows only).
+
+Usage: python tests/benchmarks/large_table.py [rows] [--word]
+"""
+import sys
+import time
+
+from wordinserter import insert, parse
+from wordinserter.operations import TableRow
+from wordinserter.renderers.fake import FakeConstants, FakeDocument
+
+BUCKETS = 10
+
+
+def build_document(rows):
+    body = "".join("<tr><td>Row {0}</td><td><b>{0}</b></td><td>Some text</td></tr>".format(i) for i in range(rows))
+    return "<table>{0}</table>".format(body)
+
+
+def open_document(use_word):
+    if not use_word:
+        return FakeDocument(), FakeConstants()
+
+    from comtypes.client import CreateObject
+    word = CreateObject("Word.Application")
+    from comtypes.gen import Word as constants
+    return word.Documents.Add(), constants
+
+
+def row_times(operations, document, constants, large_document):
+    starts, times = {}, []
+
+    hooks = {
+        "pre": {TableRow: lambda op, renderer: starts.__setitem__(id(op), time.perf_counter())},
+        "post": {TableRow: lambda op, renderer: times.append(time.perf_counter() - starts.pop(id(op)))},
+    }
+
+    start = time.perf_counter()
+    insert(operations, document=document, constants=constants, hooks=hooks, large_document=large_document)
+    return time.perf_counter() - start, times
+
+
+if __name__ == "__main__":
+    arguments = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    rows = int(arguments[0]) if arguments else 5000
+    use_word = "--word" in sys.argv
+
+    for large_document in (False, True):
+        document, constants = open_document(use_word)
+        total, times = row_times(parse(build_document(rows)), document, constants, large_document)
+
+        size = max(1, len(times) // BUCKETS)
+        buckets = [times[i:i + size] for i in range(0, len(times), size)]
+        means = " ".join("{0:7.1f}".format(sum(bucket) * 1e6 / len(bucket)) for bucket in buckets)
+
+        print("large_document={0!s:5} {1:8.1f} ms total, us/row by position: {2}".format(
+            large_document, total * 1000, means))
@@ -0,0 +1,41 @@
+"""
+Compare the COM calls made to number deeply nested outlines one list at a time (ApplyListTemplateWithLevel,
+ListIndent and ListOutdent for every list) and in bulk (one template for the whole list, then ListLevelNumber for
+each run of items at the same level), against the fake COM backend.
+
+Usage: python tests/benchmarks/list_numbering.py [depth] [items per level]
+"""
+import sys
+import time
+
+from wordinserter import parse
+from wordinserter.profiling import Profiler
+from wordinserter.renderers.com import COMRenderer
+from wordinserter.renderers.fake import FakeConstants, FakeDocument
+
+
+def outline(depth, items):
+    html = "<li>Item</li>" * items
+    for level in range(depth):
+        tag = "ol" if level % 2 else "ul"
+        html = "<li>Item<{0}>{1}</{0}></li>".format(tag, html) + "<li>Item</li>" * items
+    return "<ul>{0}</ul>".format(html)
+
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    content = outline(depth, items)
+
+    for bulk in (False, True):
+        profiler = Profiler()
+        start = time.perf_counter()
+        COMRenderer(FakeDocument(), FakeConstants(), profiler=profiler, bulk_list_numbering=bulk).render(
+            parse(content)
+        )
+        elapsed = time.perf_counter() - start
+        methods = profiler.as_dict()["method"]
+
+        print("{0:9} {1:6} COM calls, {2:5} in render_list, {3:5} in list_element {4:8.1f} ms".format(
+            "bulk" if bulk else "per-list", profiler.com_calls, methods["render_list"]["com_calls"],
+            methods["list_element"]["com_calls"], elapsed * 1000))
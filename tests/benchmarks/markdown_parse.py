@@ -0,0 +1,60 @@
+"""
+Compare parsing Markdown directly into operations with rendering it to HTML and parsing that with the HTMLParser.
+
+Usage: python tests/benchmarks/markdown_parse.py [sections]
+"""
+import sys
+import timeit
+
+from markdown_it import MarkdownIt
+
+from wordinserter import parse
+
+SECTION = """
+## Section {0}
+
+Some **bold**, *italic* and `inline code` text with [a link](http://example.com/{0}).
+A second line in the same paragraph.
+
+- First item
+- Second item with **bold**
+  - A nested item
+
+1. One
+2. Two
+
+```python
+def section_{0}():
+    return {0}
+```
+
+| Name | Value |
+|------|------:|
+| a    | {0}   |
+| b    | 2     |
+"""
+
+
+def build_document(sections):
+    return "# Benchmark\n" + "".join(SECTION.format(i) for i in range(sections))
+
+
+def via_html(markdown, renderer):
+    return parse(renderer.render(markdown), parser="html")
+
+
+def native(markdown):
+    return parse(markdown, parser="markdown")
+
+
+if __name__ == "__main__":
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    document = build_document(sections)
+    renderer = MarkdownIt("commonmark").enable(["table", "strikethrough"])
+
+    print("{0} sections, {1:.1f} KiB of Markdown".format(sections, len(document) / 1024))
+
+    for name, func in (("markdown -> html -> HTMLParser", lambda: via_html(document, renderer)),
+                       ("MarkdownParser", lambda: native(document))):
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print("{0:32} {1:8.1f} ms".format(name, best * 1000))
@@ -0,0 +1,43 @@
+"""
+Render a long generated report to WordprocessingML with an increasing number of processes.
+
+Usage: python tests/benchmarks/parallel_ooxml.py [sections] [max processes]
+"""
+import os
+import sys
+import time
+
+from wordinserter import parse
+from wordinserter.incremental import top_level_blocks
+from wordinserter.renderers.ooxml import OOXMLRenderer
+
+SECTION = (
+    "<h2 id='section-{0}'>Section {0}</h2>"
+    "<p>Paragraph with <b>bold</b>, <i>italic</i> and <a href='http://example.com/{0}'>a link</a>.</p>"
+    "<ul><li>One</li><li>Two<ol><li>Nested</li></ol></li></ul>"
+    "<table>" + "<tr><td>Cell</td><td style='color: red'>{0}</td><td>More text</td></tr>" * 20 + "</table>"
+    "<p style='text-align: center'>" + "Some longer text to type. " * 20 + "</p>"
+)
+
+
+if __name__ == "__main__":
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+
+    operations = parse("".join(SECTION.format(i) for i in range(sections)))
+    print("{0} sections, {1} top-level blocks".format(sections, len(top_level_blocks(operations))))
+
+    start = time.perf_counter()
+    serial = OOXMLRenderer().render(operations)
+    baseline = time.perf_counter() - start
+    print("{0:>9} {1:8.0f} ms".format("serial", baseline * 1000))
+
+    processes = 1
+    while processes <= max_processes:
+        start = time.perf_counter()
+        package = OOXMLRenderer(processes=processes).render(operations)
+        elapsed = time.perf_counter() - start
+
+        assert package == serial
+        print("{0:>9} {1:8.0f} ms  {2:.2f}x".format(processes, elapsed * 1000, baseline / elapsed))
+        processes *= 2
@@ -0,0 +1,54 @@
+"""
+Time rendering deeply nested lists against the fake COM backend, to measure the overhead of the render loop itself.
+
+Only the public `insert()` API is used, so the same script can be run against older revisions for comparison.
+
+Usage: python tests/benchmarks/render_loop.py [depth ...]
+"""
+import sys
+import time
+
+from wordinserter import insert
+from wordinserter.exceptions import InsertError
+from wordinserter.operations import BulletList, Format, Group, ListElement, Text
+from wordinserter.renderers.fake import FakeConstants, FakeDocument
+
+
+def build_document(depth):
+    # Built directly rather than parsed, as parsers have their own limits on how deeply markup can nest
+    operation = BulletList(ListElement(Text(text="Item {0}".format(depth))))
+    for level in reversed(range(depth - 1)):
+        operation = BulletList(ListElement(Text(text="Item {0}".format(level)), operation))
+
+    root = Group(operation)
+    stack = [(root, None)]
+    while stack:
+        operation, parent = stack.pop()
+        operation.set_parent(parent)
+        operation.format = Format()
+        stack.extend((child, operation) for child in operation.children)
+
+    return root
+
+
+def time_render(depth, repeat=3):
+    best = None
+    for _ in range(repeat):
+        operations = build_document(depth)
+        start = time.perf_counter()
+        insert(operations, document=FakeDocument(), constants=FakeConstants())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    depths = [int(arg) for arg in sys.argv[1:]] or [10, 100, 250, 500, 900]
+
+    for depth in depths:
+        try:
+            elapsed = time_render(depth)
+        except (RecursionError, InsertError) as e:
+            print("depth {0:5}: failed with {1}".format(depth, getattr(e, "cause", [type(e)])[0].__name__))
+            continue
+        print("depth {0:5}: {1:8.2f} ms  {2:6.1f} us/list".format(depth, elapsed * 1000, elapsed * 1e6 / depth))
@@ -0,0 +1,48 @@
+"""
+Time compiling a generated report into a render plan and rendering the report against the fake COM backend, and print
+the number of COM calls the report needs.
+
+Usage: python tests/benchmarks/render_plan.py [sections]
+"""
+import sys
+import time
+
+from wordinserter import parse
+from wordinserter.plan import compile_plan, count_com_calls
+from wordinserter.renderers.com import COMRenderer
+from wordinserter.renderers.fake import FakeConstants, FakeDocument
+
+SECTION = (
+    "<h2>Section {0}</h2>"
+    "<p>Paragraph with <b>bold</b>, <i>italic</i> and <a href='http://example.com/{0}'>a link</a>.</p>"
+    "<ul><li>One</li><li>Two<ol><li>Nested</li></ol></li></ul>"
+    "<table>" + "<tr><td>Cell</td><td style='color: red'>{0}</td></tr>" * 5 + "</table>"
+)
+
+
+def best_of(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    operations = parse("".join(SECTION.format(i) for i in range(sections)))
+
+    plan = None
+
+    def compile_once():
+        global plan
+        plan = compile_plan(operations)
+
+    compiled = best_of(compile_once)
+    rendered = best_of(lambda: COMRenderer(FakeDocument(), FakeConstants()).render(operations))
+
+    print("{0} sections, {1} instructions, {2} COM calls".format(sections, len(plan), count_com_calls(operations)))
+    print("compile      {0:8.1f} ms".format(compiled * 1000))
+    print("render       {0:8.1f} ms".format(rendered * 1000))
@@ -0,0 +1,28 @@
+"""
+Compare the SimpleParser with the HTMLParser on generated markup that only uses the simple subset.
+
+Usage: python tests/benchmarks/simple_parser.py [paragraphs]
+"""
+import sys
+import timeit
+
+from wordinserter import parse
+
+ROW = "<p>Paragraph {0} with <b>bold</b>, <i>italic</i> and <u>underlined</u> text<br>and a second line</p>"
+LIST = "<ul><li>One</li><li>Two <b>bold</b><ul><li>Nested</li></ul></li></ul>"
+TABLE = "<table><tr><th>Name</th><th>Value</th></tr><tr><td>a</td><td>{0}</td></tr></table>"
+
+
+def build_document(paragraphs):
+    return "\n".join(ROW.format(i) + (LIST + TABLE.format(i) if i % 10 == 0 else "") for i in range(paragraphs))
+
+
+if __name__ == "__main__":
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    document = build_document(paragraphs)
+
+    print("{0} paragraphs, {1:.1f} KiB of HTML".format(paragraphs, len(document) / 1024))
+
+    for parser in ("html", "simple"):
+        best = min(timeit.repeat(lambda: parse(document, parser=parser), number=1, repeat=5))
+        print("{0:8} {1:8.1f} ms".format(parser, best * 1000))
@@ -0,0 +1,40 @@
+"""
+Compare how much memory a parsed operation tree retains with each `source` mode of the HTML parser.
+
+Usage: python tests/benchmarks/source_memory.py [paragraphs]
+"""
+import gc
+import sys
+import tracemalloc
+
+from wordinserter import parse
+
+ROW = "<p>Paragraph {0} with <b>bold</b>, <i>italic</i> and <a href='http://example.com/{0}'>a link</a></p>"
+
+
+def build_document(paragraphs):
+    body = "\n".join(ROW.format(i) for i in range(paragraphs))
+    return "<html><body>{0}<table><tr><td>1</td><td>2</td></tr></table></body></html>".format(body)
+
+
+def retained_memory(document, source):
+    gc.collect()
+    tracemalloc.start()
+    operations = parse(document, source=source)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del operations
+    return current, peak
+
+
+if __name__ == "__main__":
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    document = build_document(paragraphs)
+
+    print("{0} paragraphs, {1:.1f} KiB of HTML".format(paragraphs, len(document) / 1024))
+
+    for mode in ("element", "locator", None):
+        current, peak = retained_memory(document, mode)
+        print("source={0!r:10} retained {1:10.1f} KiB  peak {2:10.1f} KiB".format(
+            mode, current / 1024, peak / 1024))
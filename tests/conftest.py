@@ -3,6 +3,7 @@ import pathlib
 import pytest
 
 from wordinserter import parsers
+from wordinserter.renderers.fake import FakeConstants, FakeDocument
 
 docs = pathlib.Path(__file__).parent / 'docs'
 
@@ -20,3 +21,13 @@ def html_parser():
 @pytest.fixture(params=sorted(docs.glob('*.html')), ids=lambda p: str(p.name))
 def html_document(request):
     return request.param
+
+
+@pytest.fixture
+def fake_document():
+    return FakeDocument()
+
+
+@pytest.fixture
+def constants():
+    return FakeConstants()
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from wordinserter import aio, parse
+from wordinserter.incremental import structural_hash
+from wordinserter.operations import Paragraph
+from wordinserter.renderers.fake import FakeConstants, FakeDocument
+
+
+@pytest.fixture
+def worker():
+    with aio.ComWorker() as worker:
+        yield worker
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_worker_runs_on_one_thread(worker):
+    async def main():
+        return await asyncio.gather(*(worker.run(threading.get_ident) for _ in range(5)))
+
+    idents = run(main())
+
+    assert len(set(idents)) == 1
+    assert idents[0] != threading.get_ident()
+
+
+def test_worker_errors(worker):
+    def fail():
+        raise ValueError("broken")
+
+    with pytest.raises(ValueError):
+        run(worker.run(fail))
+
+    # The worker keeps running after an error
+    assert run(worker.run(lambda: 1)) == 1
+
+
+def test_worker_does_not_block_loop(worker):
+    ticks = []
+
+    async def tick():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(worker.run(time.sleep, 0.2), tick())
+
+    run(main())
+
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.2
+
+
+def test_parse_async():
+    html = "<p>Some <b>bold</b> text</p>"
+
+    assert structural_hash(run(aio.parse_async(html))) == structural_hash(parse(html))
+
+
+def test_concurrent_inserts(worker):
+    threads = set()
+    hooks = {"pre": {Paragraph: lambda operation, renderer: threads.add(threading.get_ident())}}
+
+    async def render(number):
+        document = await worker.run(FakeDocument)
+        operations = await aio.parse_async("<p>Document {0}</p>".format(number))
+        await aio.insert_async(operations, worker, document=document, constants=FakeConstants(), hooks=hooks)
+        return document.text
+
+    async def main():
+        return await asyncio.gather(*(render(number) for number in range(10)))
+
+    texts = run(main())
+
+    assert texts == ["Document {0}\r".format(number) for number in range(10)]
+    assert len(threads) == 1 and threading.get_ident() not in threads
+
+
+class FakeResponse(object):
+    content = b"image data"
+
+
+def test_prefetch_images(monkeypatch):
+    monkeypatch.setattr(aio, "aiohttp", None)
+    fetched = []
+
+    def get(url, **kwargs):
+        fetched.append(url)
+        if url.endswith("missing.png"):
+            raise aio.requests.ConnectionError("missing")
+        return FakeResponse()
+
+    monkeypatch.setattr(aio.requests, "get", get)
+    operations = parse("<img src='http://example.com/a.png' width=10><img src='http://example.com/missing.png'>"
+                       "<img src='data:image/png;base64,AAAA'>")
+
+    with pytest.warns(UserWarning):
+        run(aio.prefetch_images(operations))
+
+    images = list(aio._remote_images(operations))
+    found, missing = sorted(images, key=lambda image: image.location)
+
+    assert sorted(fetched) == ["http://example.com/a.png", "http://example.com/missing.png"]
+    path, height, width = found.get_image_path_and_dimensions()
+    with open(path, "rb") as fd:
+        assert fd.read() == b"image data"
+    assert width == 10
+    assert missing.get_image_path_and_dimensions()[1:] == (300, 220)
+
+
+def test_prefetch_limit(monkeypatch):
+    monkeypatch.setattr(aio, "aiohttp", None)
+    lock = threading.Lock()
+    running, most = [0], [0]
+
+    def get(url, **kwargs):
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return FakeResponse()
+
+    monkeypatch.setattr(aio.requests, "get", get)
+    operations = parse("".join("<img src='http://example.com/{0}.png'>".format(i) for i in range(8)))
+
+    run(aio.prefetch_images(operations, limit=2))
+
+    assert most[0] == 2
+
+
+def test_data_uris_are_not_downloaded():
+    operations = parse("<img src='data:image/png;base64,AAAA'><img src='HTTPS://example.com/a.png'>")
+
+    assert [image.location for image in aio._remote_images(operations)] == ["HTTPS://example.com/a.png"]
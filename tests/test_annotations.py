@@ -0,0 +1,98 @@
+import pytest
+
+from wordinserter import insert
+from wordinserter.references import ReferenceIndex
+from wordinserter.renderers.com import COMRenderer
+
+DOCUMENT = (
+    "<p>See <a href='!later'>the later section</a> and <a href='http://example.com'>a <b>link</b></a></p>"
+    "<h2 id='later'>Later</h2><p>Back to <a href='#later'>the heading</a>, <a href='@FILENAME'>file</a></p>"
+)
+
+
+def calls(fake_document, *names):
+    return [(path, args, kwargs) for kind, path, args, kwargs in fake_document.calls
+            if kind == "call" and any(path == name or path.endswith("." + name) for name in names)]
+
+
+def added_before(fake_document, first, second):
+    paths = [path for kind, path, args, kwargs in fake_document.calls]
+    return max(i for i, path in enumerate(paths) if path.endswith(first)) < \
+        min(i for i, path in enumerate(paths) if path.endswith(second))
+
+
+def test_reference_index(html_parser):
+    index = ReferenceIndex(html_parser.parse(DOCUMENT + "<a href='#missing'>missing</a>"))
+
+    assert list(index.bookmarks) == ["later"]
+    assert list(index.references) == ["later", "missing"]
+    assert index.resolve("!later") is index.bookmarks["later"]
+    assert index.resolve("http://example.com") is None
+    assert index.unresolved() == ["missing"]
+
+
+def test_deferred_annotations_type_the_same_text(html_parser, constants, fake_document):
+    streamed = type(fake_document)()
+    insert(html_parser.parse(DOCUMENT), document=streamed, constants=constants)
+    insert(html_parser.parse(DOCUMENT), document=fake_document, constants=constants, deferred_annotations=True)
+
+    assert fake_document.text == streamed.text
+
+
+def test_deferred_annotations_are_added_at_the_end(html_parser, constants, fake_document):
+    insert(html_parser.parse(DOCUMENT), document=fake_document, constants=constants, deferred_annotations=True)
+
+    paths = [path for kind, path, args, kwargs in fake_document.calls]
+    last_typed = max(i for i, path in enumerate(paths) if path.startswith("Selection.Type"))
+    added = [i for i, path in enumerate(paths) if path.endswith((".Add", "Fields.Update"))
+             and not path.startswith("Document.Tables")]
+
+    assert added and min(added) > last_typed
+    assert paths.count("Document.Fields.Update") == 1
+    assert not any(path.startswith("Selection.MoveRight") for path in paths)
+
+
+def test_deferred_annotation_ranges(html_parser, constants, fake_document):
+    insert(html_parser.parse(DOCUMENT), document=fake_document, constants=constants, deferred_annotations=True)
+    text = fake_document.text
+
+    def anchor(call):
+        rng = call[2].get("Anchor") or call[2].get("Range") or call[1][1]
+        return text[rng.Start:rng.End]
+
+    bookmarks = calls(fake_document, "Bookmarks.Add")
+    assert [(args[0], anchor((path, args, kwargs))) for path, args, kwargs in bookmarks] == [("later", "Later")]
+
+    # Bookmarks come first, then hyperlinks and fields from the end of the document backwards
+    links = calls(fake_document, "Hyperlinks.Add", "Fields.Add")
+    assert [anchor(call) for call in links] == ["file", "the heading", "a link", "the later section"]
+    assert links[-1][2]["Text"] == "REF later \\h \\* charformat"
+    assert added_before(fake_document, "Bookmarks.Add", "Fields.Add")
+
+
+def test_deferred_footnotes(html_parser, constants, fake_document):
+    operations = html_parser.parse("<p>Text<footnote data-content='A note'></footnote> after</p>")
+    insert(operations, document=fake_document, constants=constants, deferred_annotations=True)
+
+    footnotes = calls(fake_document, "Footnotes.Add")
+    assert len(footnotes) == 1
+    assert footnotes[0][1][0].Start == len("Text")
+
+
+def test_unresolved_references_warn(html_parser, constants, fake_document):
+    with pytest.warns(UserWarning, match="missing"):
+        insert(html_parser.parse("<p><a href='!missing'>missing</a></p>"), document=fake_document,
+               constants=constants, deferred_annotations=True)
+
+
+def test_streamed_renderer_stays_streamed(html_parser, constants, fake_document):
+    renderer = COMRenderer(fake_document, constants)
+
+    for _ in range(2):
+        del fake_document.calls[:]
+        renderer.render(html_parser.parse(DOCUMENT))
+
+        # Hyperlinks are added as they are typed, before the text after them
+        paths = [path for kind, path, args, kwargs in fake_document.calls]
+        assert max(i for i, path in enumerate(paths) if path.endswith("Hyperlinks.Add")) < \
+            max(i for i, path in enumerate(paths) if path.startswith("Selection.Type"))
@@ -0,0 +1,85 @@
+import pytest
+
+from wordinserter import insert
+from wordinserter.renderers.column_widths import estimate_column_widths, text_extent
+
+
+def first_table(html_parser, html):
+    return html_parser.parse(html).children[0].children[0]
+
+
+def property_sets(fake_document, name):
+    return [(path, args[0]) for kind, path, args, kwargs in fake_document.calls
+            if kind == "set" and path.endswith("." + name)]
+
+
+def test_text_extent(html_parser):
+    table = first_table(html_parser, "<table><tr><td>one two<br/>three<p>a much longer line</p></td></tr></table>")
+
+    assert text_extent(table.children[0].children[0]) == (len("a much longer line"), len("longer"))
+
+
+def test_short_content_fills_the_width(html_parser):
+    table = first_table(html_parser, "<table><tr><td>ab</td><td>abcdef</td></tr></table>")
+
+    widths = estimate_column_widths(table, 100, character_width=1, padding=0)
+
+    assert widths == pytest.approx([25, 75])
+
+
+def test_long_content_keeps_room_for_words(html_parser):
+    long_text = " ".join(["word"] * 100)
+    table = first_table(html_parser, "<table><tr><td>x</td><td>{0}</td><td>antidisestablishment</td></tr></table>"
+                        .format(long_text))
+
+    widths = estimate_column_widths(table, 100, character_width=1, padding=0)
+
+    assert sum(widths) == pytest.approx(100)
+    assert widths[0] >= 1 and widths[2] >= len("antidisestablishment")
+    assert widths[1] > widths[2]
+
+
+def test_explicit_widths(html_parser):
+    table = first_table(html_parser, "<table><tr><td style='width: 50pt'>a</td><td style='width: 25%'>b</td>"
+                                     "<td>c</td></tr></table>")
+
+    assert estimate_column_widths(table, 400) == pytest.approx([50, 100, 250])
+
+
+def test_explicit_widths_wider_than_the_table(html_parser):
+    table = first_table(html_parser, "<table><tr><td style='width: 500pt'>a</td><td>hello world</td></tr></table>")
+
+    widths = estimate_column_widths(table, 468, character_width=1, padding=0)
+
+    assert sum(widths) == pytest.approx(468)
+    assert widths == pytest.approx([500 * 468 / 505, 5 * 468 / 505])
+
+
+def test_renderer_sets_columns_once(html_parser, fake_document, constants):
+    html = "<table>" + "<tr><td>Name</td><td>A longer description</td></tr>" * 20 + "</table>"
+    insert(html_parser.parse(html), document=fake_document, constants=constants, estimate_column_widths=True)
+
+    columns = property_sets(fake_document, "Columns().Width")
+    assert len(columns) == 2
+    assert sum(width for path, width in columns) == pytest.approx(612 - 72 * 2)
+    assert property_sets(fake_document, "AllowAutoFit") == [("Table.AllowAutoFit", False)]
+
+
+def test_nested_tables_fill_their_cell(html_parser, fake_document, constants):
+    html = "<table><tr><td>Outer</td><td><table><tr><td>a</td><td>b</td></tr></table></td></tr></table>"
+    operations = html_parser.parse(html)
+    insert(operations, document=fake_document, constants=constants, estimate_column_widths=True)
+
+    outer = operations.children[0].children[0]
+    inner = outer.children[0].children[1].children[0]
+    outer_cell = outer.children[0].children[1]
+
+    inner_width = sum(cell.render.estimated_width for cell in inner.children[0].children)
+    assert inner_width == pytest.approx(outer_cell.render.estimated_width)
+
+
+def test_without_estimates(html_parser, fake_document, constants):
+    insert(html_parser.parse("<table><tr><td>a</td></tr></table>"), document=fake_document, constants=constants)
+
+    assert property_sets(fake_document, "Columns().Width") == []
+    assert [value for path, value in property_sets(fake_document, "AllowAutoFit")] == [True]
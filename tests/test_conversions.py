@@ -0,0 +1,80 @@
+import pytest
+
+from wordinserter.renderers.com import WordFormatter
+from wordinserter.renderers.conversions import (css_color_to_wdcolor,
+                                                css_colors_to_wdcolor_batch,
+                                                css_length_to_points,
+                                                css_lengths_to_points_batch)
+
+RED = 0x0000FF
+ORANGE = 0x00A5FF
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("red", RED),
+    ("Red", RED),
+    ("orange", ORANGE),
+    ("#f00", RED),
+    ("#FF0000", RED),
+    ("#ff000080", RED),
+    ("#9bbb59", 0x59BB9B),
+    ("rgb(255, 0, 0)", RED),
+    ("rgb(100%,0%,0%)", RED),
+    ("rgb(255 0 0 / 50%)", RED),
+    ("rgba(255, 165, 0, 0.5)", ORANGE),
+    ("hsl(0, 100%, 50%)", RED),
+    ("hsla(120deg, 100%, 25%, 1)", 0x008000),
+    ("hsl(0, 0%, 100%)", 0xFFFFFF),
+    ("none", None),
+    ("transparent", None),
+    ("not-a-color", None),
+    ("rgb(1, 2)", None),
+    ("#12345", None),
+    ("ff0000", None),
+    ("face", None),
+    ("bad", None),
+    (None, None),
+])
+def test_colors(value, expected):
+    assert css_color_to_wdcolor(value) == expected
+    assert WordFormatter.style_to_wdcolor(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("16px", 12),
+    ("16.4px", 12),
+    ("16", 12),
+    (16, 12),
+    ("11pt", 11),
+    ("10.5pt", 10.5),
+    ("1in", 72),
+    ("2.54cm", 72),
+    ("25.4mm", 72),
+    ("1pc", 12),
+    ("1.5em", 18),
+    ("2rem", 24),
+    ("50%", None),
+    (" 12PX ", 9),
+    ("auto", None),
+    ("12furlongs", None),
+    ("", None),
+])
+def test_lengths(value, expected):
+    if expected is None:
+        assert css_length_to_points(value) is None
+    else:
+        assert css_length_to_points(value) == pytest.approx(expected)
+    assert WordFormatter.size_to_points(value) == css_length_to_points(value)
+
+
+def test_percentages():
+    assert css_length_to_points("50%", percent_of=12) == pytest.approx(6)
+    assert css_length_to_points("150%", percent_of=468) == pytest.approx(702)
+    assert css_length_to_points("50%") is None
+
+
+def test_batches():
+    assert css_colors_to_wdcolor_batch(["red", "#f00", "none"]) == [RED, RED, None]
+    assert css_lengths_to_points_batch(["16px", "1in", "auto"]) == [12, 72, None]
+    assert WordFormatter.styles_to_wdcolor(["orange"]) == [ORANGE]
+    assert WordFormatter.sizes_to_points(["2pt"]) == [2]
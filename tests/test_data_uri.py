@@ -0,0 +1,75 @@
+import base64
+import importlib.util
+import io
+import os
+import tempfile
+
+import pytest
+
+from wordinserter import parse
+from wordinserter.operations import DataURI, Image, decode_base64_to_file
+
+DATA = os.urandom(10000)
+
+
+def data_uri(data=DATA):
+    return "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+
+
+def find_images(operations):
+    return [operation for operation in operations.descendants if isinstance(operation, Image)]
+
+
+@pytest.mark.parametrize("chunk_size", [4, 7, 1000, 1024 * 1024])
+def test_decode_in_chunks(chunk_size):
+    text = "xx" + base64.encodebytes(DATA).decode("ascii")
+    destination = io.BytesIO()
+
+    decode_base64_to_file(text, 2, destination, chunk_size=chunk_size)
+
+    assert destination.getvalue() == DATA
+
+
+def test_decode_incorrect_padding():
+    with pytest.raises(ValueError):
+        decode_base64_to_file("AAAAA", 0, io.BytesIO())
+
+
+def test_image_path():
+    image = Image(location=data_uri())
+
+    path, height, width = image.get_image_path_and_dimensions()
+
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_invalid_data_uri():
+    image = Image(location="data:image/png;base64,AAAAA")
+
+    with pytest.warns(UserWarning, match="Could not decode data URI"):
+        assert image.get_image_path_and_dimensions()[1:] == (300, 220)
+
+
+def test_invalid_data_uri_leaves_no_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    with pytest.warns(UserWarning, match="Could not decode data URI"):
+        assert DataURI("data:image/png;base64,AAAAA").decode() is None
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("parser, markup", [
+    ("html", "<p><img src='{0}'><img src='{0}'><img src='{1}'></p>"),
+    pytest.param("markdown", "![a]({0}) ![b]({0}) ![c]({1})", marks=pytest.mark.skipif(
+        importlib.util.find_spec("markdown_it") is None, reason="markdown-it-py is not installed")),
+])
+def test_identical_data_uris_are_decoded_once(parser, markup):
+    first, second, other = find_images(parse(markup.format(data_uri(), data_uri(DATA[:100])), parser=parser))
+
+    assert first.data_uri is second.data_uri
+    assert first.location is second.location
+    assert other.data_uri is not first.data_uri
+    assert first.get_image_path_and_dimensions()[0] == second.get_image_path_and_dimensions()[0]
+    assert other.get_image_path_and_dimensions()[0] != first.get_image_path_and_dimensions()[0]
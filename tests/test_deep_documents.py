@@ -0,0 +1,89 @@
+import pytest
+
+from wordinserter import parse, print_operations
+from wordinserter.operations import (BulletList, Group, ListElement, Paragraph,
+                                     Span, Text)
+from wordinserter.parsers.fixes import (correct_whitespace,
+                                        normalize_list_elements,
+                                        normalize_table_colspans)
+from wordinserter.utils import pprint
+
+DEPTH = 50000
+NODES = 1000000
+
+
+@pytest.fixture(scope="module")
+def deep_document():
+    return parse("<div>" * DEPTH + "<p> deep <b>text</b></p>" + "</div>" * DEPTH)
+
+
+@pytest.fixture(scope="module")
+def large_tree():
+    # 1000 paragraphs of 999 Text operations
+    root = Group([Paragraph([Text(text=" word \n") for _ in range(999)]) for _ in range(1000)])
+    root.set_parents()
+    return root
+
+
+def test_deeply_nested_elements(deep_document):
+    descendants = list(deep_document.descendants)
+
+    # <html>, the divs, then the paragraph's contents
+    assert len(descendants) == DEPTH + 5
+    assert all(isinstance(op, Group) for op in descendants[:DEPTH + 1])
+
+    paragraph, text = descendants[DEPTH + 1:DEPTH + 3]
+    assert isinstance(paragraph, Paragraph)
+    assert paragraph.parent is descendants[DEPTH]
+    assert text.text == "deep "
+    assert len(list(paragraph.ancestors)) == DEPTH + 2
+
+
+def test_deeply_nested_inline_elements():
+    operations = parse("<p>" + "<span class='nested'>" * DEPTH + "text" + "</span>" * DEPTH + "</p>")
+
+    *spans, text = operations.descendants
+
+    assert len(spans) == DEPTH + 2
+    assert sum(isinstance(op, Span) for op in spans) == DEPTH
+    assert text.text == "text"
+
+
+def test_deeply_nested_lists():
+    operations = parse("<ul><li>item" * 5000 + "</li></ul>" * 5000)
+
+    lists = [op for op in operations.descendants if isinstance(op, BulletList)]
+
+    assert len(lists) == 5000
+    # Each nested list is moved out of its list element, into the enclosing list
+    assert all(not isinstance(op.parent, ListElement) for op in lists)
+
+
+def test_print_deep_document(capsys):
+    # Each line is indented by its depth, so this is kept well past the recursion limit but short of DEPTH
+    depth = 3000
+    operations = Group()
+    for _ in range(depth):
+        operations = Group(operations)
+
+    print_operations([operations])
+    pprint([operations])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[depth] == "  " * depth + "Group"
+    assert lines[-1] == "/Group"
+    assert len(lines) == 3 * (depth + 1)
+
+
+def test_large_tree(large_tree):
+    assert sum(1 for _ in large_tree.descendants) == NODES
+
+    large_tree.set_parents()
+    correct_whitespace(large_tree)
+    normalize_list_elements(large_tree)
+    normalize_table_colspans(large_tree)
+
+    first, last = large_tree.children[0].children[0], large_tree.children[-1].children[-1]
+    assert first.parent is large_tree.children[0]
+    assert first.text == "word "
+    assert last.text == " word "
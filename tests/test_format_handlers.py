@@ -0,0 +1,54 @@
+from wordinserter import insert
+from wordinserter.operations import Format, Paragraph, TableCell
+from wordinserter.renderers.com import CELL, RANGE, COMRenderer, FormatAssignment
+
+
+def property_sets(fake_document, *names):
+    return [(path, args[0]) for kind, path, args, kwargs in fake_document.calls
+            if kind == "set" and path.rsplit(".", 1)[-1] in names]
+
+
+def test_equal_formats_share_assignments(fake_document, constants):
+    renderer = COMRenderer(fake_document, constants)
+
+    first = renderer.compile_format(Format(font_size="10pt", color="red"), Paragraph)
+    second = renderer.compile_format(Format(font_size="10pt", color="red"), Paragraph)
+
+    assert first is second
+    assert first == (
+        FormatAssignment(RANGE, ("Font",), "Size", 10),
+        FormatAssignment(RANGE, ("Font",), "Color", 255),
+    )
+
+
+def test_assignments_depend_on_the_element(fake_document, constants):
+    renderer = COMRenderer(fake_document, constants)
+
+    assert renderer.compile_format(Format(background="#ff0000"), TableCell) == (
+        FormatAssignment(CELL, ("Shading",), "BackgroundPatternColor", 255),
+    )
+    assert renderer.compile_format(Format(background="red"), Paragraph) == (
+        FormatAssignment(RANGE, (), "HighlightColorIndex", "wdRed"),
+    )
+    assert renderer.compile_format(Format(vertical_align="middle"), Paragraph) == ()
+
+
+def test_table_cell_formats(html_parser, fake_document, constants):
+    html = "<table><tr><td style='background-color: #0000ff; vertical-align: bottom; " \
+           "border-style: solid; border-color: red'>x</td></tr></table>"
+    insert(html_parser.parse(html), document=fake_document, constants=constants)
+
+    sets = property_sets(fake_document, "BackgroundPatternColor", "VerticalAlignment", "LineStyle", "Color")
+    assert sets == [
+        ("Cell.Shading.BackgroundPatternColor", 0xff0000),
+        ("Cell.VerticalAlignment", "wdCellAlignVerticalBottom"),
+    ] + [("Cell.Range.Borders().LineStyle", "wdLineStyleSingle")] * 4 + [("Cell.Range.Borders().Color", 255)] * 4
+
+
+def test_conversions_happen_once_per_format(html_parser, fake_document, constants):
+    html = "<p style='line-height: 150%'>Paragraph</p>" * 10
+    insert(html_parser.parse(html), document=fake_document, constants=constants)
+
+    conversions = [path for kind, path, args, kwargs in fake_document.calls if path.endswith("LinesToPoints")]
+    assert len(conversions) == 1
+    assert len(property_sets(fake_document, "LineSpacing")) == 10
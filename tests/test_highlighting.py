@@ -0,0 +1,44 @@
+import pytest
+
+from wordinserter.highlighting import highlight_runs, highlighted_operations
+from wordinserter.operations import Bold, CodeBlock, Span, Text
+
+CODE = 'def f(x):\n    return "a"  # comment\n'
+
+
+def test_highlight_preserves_text():
+    operations = highlighted_operations(CODE, "python")
+
+    text = "".join(op.text for op in operations.descendants if isinstance(op, Text))
+    assert text == CODE
+
+
+def test_highlight_formats_tokens():
+    operations = highlighted_operations(CODE, "python")
+
+    bold_text = [op.children[0].text for op in operations.descendants if isinstance(op, Bold)]
+    assert bold_text == ["def ", "return "]
+
+    colors = {op.format.color for op in operations.descendants if isinstance(op, Span)}
+    assert all(color.startswith("#") for color in colors)
+
+
+def test_highlight_sets_parents():
+    operations = highlighted_operations(CODE, "python")
+
+    assert all(op.parent is not None for op in operations.descendants)
+
+
+def test_highlight_runs_are_cached():
+    highlight_runs.cache_clear()
+    highlighted_operations(CODE, "python")
+    highlighted_operations(CODE, "python")
+
+    assert highlight_runs.cache_info().hits == 1
+
+
+def test_highlight_unknown_language():
+    block = CodeBlock(text=CODE, highlight="not-a-language")
+
+    with pytest.warns(UserWarning):
+        assert block.highlighted_operations() is None
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+import pytest
+
+# -X importtime and the lazy imports (module __getattr__) both need Python 3.7, older versions import every backend
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7), reason="Lazy imports need Python 3.7")
+
+# Importing the package used to take around 450ms, most of it in bs4, cssutils and requests. It now takes a few tens
+# of milliseconds, the budget leaves plenty of room for slow machines.
+IMPORT_TIME_BUDGET_MS = 150
+
+HEAVY_MODULES = ["bs4", "cssutils", "lxml", "requests", "webcolors", "markdown_it", "pygments", "comtypes", "docopt"]
+
+
+def cumulative_import_time(module):
+    """
+    :return: The cumulative import time of `module` in a new interpreter, in milliseconds, from `python -X importtime`
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+
+    raise AssertionError("{0} not found in -X importtime output".format(module))
+
+
+def imported_modules(code):
+    result = subprocess.run([sys.executable, "-c", code + "; import sys; print(' '.join(sys.modules))"],
+                            stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize("module", ["wordinserter", "wordinserter.cli"])
+def test_import_time_budget(module):
+    # The best of a few runs, the first may be compiling bytecode
+    assert min(cumulative_import_time(module) for _ in range(3)) < IMPORT_TIME_BUDGET_MS
+
+
+@pytest.mark.parametrize("module", ["wordinserter", "wordinserter.cli"])
+def test_no_heavy_imports(module):
+    assert imported_modules("import " + module) & set(HEAVY_MODULES) == set()
+
+
+def test_simple_parser_does_not_import_bs4():
+    modules = imported_modules("from wordinserter import parse; parse('<p>a <b>b</b></p>', parser='simple')")
+
+    assert "bs4" not in modules and "cssutils" not in modules
+
+
+def test_backends_load_on_first_use():
+    modules = imported_modules("from wordinserter import parsers, renderers; parsers['html']; renderers['ooxml']")
+
+    assert {"bs4", "cssutils", "wordinserter.renderers.ooxml"} <= modules
+    assert "wordinserter.renderers.com" not in modules
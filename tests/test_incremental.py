@@ -0,0 +1,96 @@
+from wordinserter import insert
+from wordinserter.incremental import (DELETE, INSERT, KEEP, bookmark_name,
+                                      diff_blocks, parse_bookmark_name,
+                                      structural_hash, top_level_blocks)
+
+DOCUMENT = "<h1>Title</h1><p>First <b>paragraph</b></p><p>Second</p><table><tr><td>1</td></tr></table>"
+
+
+def hashes(html_parser, html):
+    return [structural_hash(block) for block in top_level_blocks(html_parser.parse(html))]
+
+
+def test_top_level_blocks(html_parser):
+    blocks = top_level_blocks(html_parser.parse(DOCUMENT))
+
+    assert [block.__class__.__name__ for block in blocks] == ["Heading", "Paragraph", "Paragraph", "Table"]
+
+
+def test_structural_hash_is_stable(html_parser):
+    assert hashes(html_parser, DOCUMENT) == hashes(html_parser, DOCUMENT)
+
+
+def test_structural_hash_includes_formatting(html_parser):
+    plain = hashes(html_parser, "<p>Text</p>")
+    styled = hashes(html_parser, "<p style='color: red'>Text</p>")
+
+    assert plain != styled
+
+
+def test_structural_hash_identical_blocks(html_parser):
+    first, second = hashes(html_parser, "<p>Same</p><p>Same</p>")
+
+    assert first == second
+
+
+def test_diff_unchanged(html_parser):
+    old = hashes(html_parser, DOCUMENT)
+
+    assert all(change.action == KEEP for change in diff_blocks(old, old))
+
+
+def test_diff_changed_block(html_parser):
+    old = hashes(html_parser, DOCUMENT)
+    new = hashes(html_parser, DOCUMENT.replace("Second", "Changed"))
+
+    changes = [change for change in diff_blocks(old, new) if change.action != KEEP]
+
+    assert changes == [(DELETE, 2, None), (INSERT, None, 2)]
+
+
+def test_diff_added_and_removed_blocks(html_parser):
+    old = hashes(html_parser, "<p>One</p><p>Two</p><p>Three</p>")
+    new = hashes(html_parser, "<p>Zero</p><p>One</p><p>Three</p>")
+
+    assert diff_blocks(old, new) == [
+        (INSERT, None, 0),
+        (KEEP, 0, 1),
+        (DELETE, 1, None),
+        (KEEP, 2, 2),
+    ]
+
+
+def test_diff_truncated_hashes(html_parser):
+    old = hashes(html_parser, DOCUMENT)
+    truncated = [parse_bookmark_name(bookmark_name(h, 0))[0] for h in old]
+
+    assert all(change.action == KEEP for change in diff_blocks(truncated, old))
+
+
+def test_bookmark_names():
+    block_hash = "0123456789abcdef0123456789abcdef01234567"
+    name = bookmark_name(block_hash, 3)
+
+    assert len(name) <= 40
+    assert parse_bookmark_name(name) == (block_hash[:20], 3)
+    assert parse_bookmark_name("Heading1") is None
+
+
+def render_incrementally(html_parser, document, constants, html):
+    insert(html_parser.parse(html), document=document, constants=constants, incremental=True)
+
+
+def test_render_incremental(html_parser, fake_document, constants):
+    render_incrementally(html_parser, fake_document, constants, "<p>One</p><p>Two</p><p>Three</p>")
+    assert fake_document.text == "One\rTwo\rThree\r"
+
+    calls = len(fake_document.calls)
+    render_incrementally(html_parser, fake_document, constants, "<p>Zero</p><p>One</p><p>Changed</p><p>Three</p>")
+    assert fake_document.text == "Zero\rOne\rChanged\rThree\r"
+
+    typed = [args[0] for kind, path, args, _ in fake_document.calls[calls:] if path == "Selection.TypeText"]
+    assert typed == ["Zero", "Changed"]
+
+    render_incrementally(html_parser, fake_document, constants, "<p>Three</p>")
+    assert fake_document.text == "Three\r"
+    assert len(fake_document.Bookmarks) == 1
@@ -0,0 +1,73 @@
+import pytest
+
+from wordinserter.renderers import COMRenderer
+
+
+def table(rows):
+    return "<table>{0}</table>".format("".join("<tr><td>{0}</td><td>x</td></tr>".format(i) for i in range(rows)))
+
+
+def render(html_parser, fake_document, constants, html, **kwargs):
+    renderer = COMRenderer(fake_document, constants, large_document=True)
+    for name, value in kwargs.items():
+        setattr(renderer, name, value)
+    renderer.render(html_parser.parse(html))
+    return [(kind, path, args) for kind, path, args, _ in fake_document.calls]
+
+
+def test_options_are_restored(html_parser, fake_document, constants):
+    calls = render(html_parser, fake_document, constants, "<p>Text</p>")
+    sets = [(path, args[0]) for kind, path, args in calls if kind == "set" and path.startswith("Application.")]
+
+    assert sets[:4] == [("Application.ScreenUpdating", False), ("Application.Options.Pagination", False),
+                        ("Application.Options.CheckSpellingAsYouType", False),
+                        ("Application.Options.CheckGrammarAsYouType", False)]
+    assert [path for path, _ in sets[4:]] == [path for path, _ in sets[:4]]
+    assert all(value is not False for _, value in sets[4:])
+    paths = [path for kind, path, args in calls]
+    assert paths.count("Application.UndoRecord.StartCustomRecord") == 1
+    assert paths.count("Application.UndoRecord.EndCustomRecord") == 1
+    assert ("call", "Application.UndoRecord.StartCustomRecord", ("wordinserter",)) in calls
+    # The undo record is ended after everything is typed and before the options are restored
+    assert paths.index("Application.UndoRecord.EndCustomRecord") > max(
+        index for index, path in enumerate(paths) if path.startswith("Selection.Type"))
+    assert paths.index("Application.UndoRecord.EndCustomRecord") < paths.index("Application.ScreenUpdating", 1)
+
+
+def test_options_are_restored_when_undo_records_fail(html_parser, fake_document, constants):
+    def start_custom_record(name):
+        raise AttributeError("UndoRecord needs Word 2010")
+
+    # Not set through the FakeObject, which would record it as a property set
+    fake_document.Application.UndoRecord._attributes["StartCustomRecord"] = start_custom_record
+
+    with pytest.raises(AttributeError):
+        render(html_parser, fake_document, constants, "<p>Text</p>")
+
+    calls = [(kind, path, args) for kind, path, args, _ in fake_document.calls]
+    sets = [(path, args[0]) for kind, path, args in calls if kind == "set" and path.startswith("Application.")]
+    assert len(sets) == 8
+    assert all(value is not False for _, value in sets[4:])
+    assert not any(path == "Application.UndoRecord.EndCustomRecord" for kind, path, args in calls)
+
+
+def test_chunked_table(html_parser, fake_document, constants):
+    calls = render(html_parser, fake_document, constants, table(10), TABLE_CHUNK_ROWS=4)
+
+    assert [args for kind, path, args in calls if path == "Selection.InsertRowsBelow"] == [(4,), (2,)]
+    assert sum(1 for kind, path, args in calls if path == "Document.UndoClear") == 2
+    assert "".join(str(i) + "x" for i in range(10)) in fake_document.text
+
+
+def test_undo_checkpoints(html_parser, fake_document, constants):
+    calls = render(html_parser, fake_document, constants, "<p>a</p>" * 10, UNDO_CHECKPOINT_OPERATIONS=5)
+
+    # 22 operations, checked whenever an operation with children finishes
+    assert sum(1 for kind, path, args in calls if path == "Document.UndoClear") == 3
+
+
+def test_not_enabled_by_default(html_parser, fake_document, constants):
+    COMRenderer(fake_document, constants).render(html_parser.parse(table(300)))
+
+    assert not any(path.startswith("Application.") or path == "Selection.InsertRowsBelow"
+                   for kind, path, args, kwargs in fake_document.calls)
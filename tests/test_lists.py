@@ -0,0 +1,75 @@
+from wordinserter import insert
+from wordinserter.lists import MAX_LIST_LEVEL, list_layout
+from wordinserter.operations import BulletList, NumberedList
+from wordinserter.profiling import Profiler
+from wordinserter.renderers.com import COMRenderer
+from wordinserter.renderers.fake import FakeDocument
+
+NESTED = (
+    "<ul><li>One<ol><li>Two<ol><li>Three</li></ol></li><li>Two again</li></ol></li><li>One again</li></ul>"
+    "<p>After</p>"
+)
+
+
+def outline(depth, items):
+    html = "<li>Item</li>" * items
+    for _ in range(depth):
+        html = "<li>Item<ul>{0}</ul></li>".format(html) + "<li>Item</li>" * items
+    return "<ul>{0}</ul>".format(html)
+
+
+def test_list_layout(html_parser):
+    top = html_parser.parse(NESTED).children[0].children[0]
+
+    layout = list_layout(top)
+
+    texts = [item.element.children[0].text for item in layout]
+    assert texts == ["One", "Two", "Three", "Two again", "One again"]
+    assert [item.level for item in layout] == [1, 2, 3, 2, 1]
+    assert [item.list.__class__ for item in layout] == [BulletList, NumberedList, NumberedList, NumberedList,
+                                                        BulletList]
+
+
+def test_list_layout_limits_levels(html_parser):
+    top = html_parser.parse(outline(12, 1)).children[0].children[0]
+
+    assert max(item.level for item in list_layout(top)) == MAX_LIST_LEVEL
+
+
+def test_list_layout_with_table(html_parser):
+    top = html_parser.parse("<ul><li>One<table><tr><td>Cell</td></tr></table></li></ul>").children[0].children[0]
+
+    assert list_layout(top) is None
+
+
+def test_bulk_numbering_types_the_same_text(html_parser, fake_document, constants):
+    streamed = FakeDocument()
+    insert(html_parser.parse(NESTED), document=streamed, constants=constants)
+    insert(html_parser.parse(NESTED), document=fake_document, constants=constants, bulk_list_numbering=True)
+
+    assert fake_document.text == streamed.text
+
+
+def test_bulk_numbering_levels(html_parser, fake_document, constants):
+    insert(html_parser.parse(NESTED), document=fake_document, constants=constants, bulk_list_numbering=True)
+
+    paths = [path for kind, path, args, kwargs in fake_document.calls]
+    assert not any(path.endswith(("ListIndent", "ListOutdent")) for path in paths)
+
+    levels = [args[0] for kind, path, args, kwargs in fake_document.calls
+              if kind == "set" and path.endswith("ListLevelNumber")]
+    assert levels == [2, 3, 2]
+
+    # The whole list gets the bullet template, then levels 2 and 3 get the numbered one
+    applied = [kwargs for kind, path, args, kwargs in fake_document.calls
+               if path.endswith("ApplyListTemplateWithLevel")]
+    assert [kwargs.get("ApplyLevel") for kwargs in applied] == [None, 2, 3]
+
+
+def test_bulk_numbering_needs_fewer_com_calls(html_parser, constants):
+    def list_calls(**kwargs):
+        profiler = Profiler()
+        COMRenderer(FakeDocument(), constants, profiler=profiler, **kwargs).render(html_parser.parse(outline(6, 20)))
+        return profiler.as_dict()["method"]["render_list"]["com_calls"]
+
+    assert list_calls(bulk_list_numbering=True) < list_calls() / 2
@@ -0,0 +1,90 @@
+import pytest
+
+from wordinserter import insert, parse
+from wordinserter.operations import (Bold, BulletList, CodeBlock, Heading, HyperLink, Image, InlineCode, LineBreak,
+                                     ListElement, NumberedList, Paragraph, SourceLocator, Table, TableCell, TableRow,
+                                     Text)
+
+pytest.importorskip("markdown_it")
+
+
+def blocks(markdown, **kwargs):
+    return parse(markdown, parser="markdown", **kwargs).children
+
+
+def test_heading():
+    heading, = blocks("## A *nice* title")
+
+    assert isinstance(heading, Heading)
+    assert heading.level == 2
+    assert all(isinstance(child, Text) for child in heading.children)
+    assert "".join(child.text for child in heading.children) == "A nice title"
+
+
+def test_inline():
+    paragraph, = blocks("Some **bold**, `code` and a [link](http://example.com)  \nnext")
+
+    assert isinstance(paragraph, Paragraph)
+    assert [child.__class__ for child in paragraph.children] == [Text, Bold, Text, InlineCode, Text, HyperLink,
+                                                                 LineBreak, Text]
+    assert paragraph.children[5].location == "http://example.com"
+
+
+def test_lists():
+    bullets, numbers = blocks("- one\n- two\n  - nested\n\n1. first\n")
+
+    assert isinstance(bullets, BulletList)
+    assert [child.__class__ for child in bullets.children] == [ListElement, ListElement, BulletList]
+    # Tight lists don't wrap their content in paragraphs
+    assert isinstance(bullets.children[0].children[0], Text)
+    assert isinstance(numbers, NumberedList)
+
+
+def test_code_block():
+    code, = blocks("```python\nprint(1)\n```")
+
+    assert isinstance(code, CodeBlock)
+    assert code.highlight == "python"
+    assert code.text == "print(1)"
+
+
+def test_table():
+    table, = blocks("| a | b |\n|:--|--:|\n| 1 | 2 |")
+
+    assert isinstance(table, Table)
+    assert table.dimensions == (2, 2)
+    assert all(isinstance(row, TableRow) for row in table.children)
+    cell = table.children[1].children[1]
+    assert isinstance(cell, TableCell)
+    assert cell.format.text_align == "right"
+
+
+def test_image():
+    paragraph, = blocks("![An *image*](http://example.com/image.png)")
+    image = paragraph.children[0]
+
+    assert isinstance(image, Image)
+    assert image.location == "http://example.com/image.png"
+    assert image.caption == "An image"
+
+
+def test_html_block():
+    # The HTMLParser wraps its output in a Group for <html>
+    html, = blocks("<div><b>bold</b></div>")
+
+    assert isinstance(html.children[0], Bold)
+
+
+def test_source():
+    heading, paragraph = blocks("# Title\n\ntext")
+
+    assert paragraph.source == SourceLocator("p", 3, None)
+    assert blocks("text", source=None)[0].source is None
+
+
+def test_render(fake_document, constants):
+    insert(parse("# Title\n\n- one\n- two\n\n| a |\n|---|\n| 1 |", parser="markdown"),
+           document=fake_document, constants=constants)
+
+    assert "Title" in fake_document.text
+    assert "one\rtwo" in fake_document.text
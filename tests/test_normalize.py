@@ -1,7 +1,8 @@
 import pytest
 
-from wordinserter.operations import Table, TableCell, TableRow
-from wordinserter.parsers.fixes import table_colspans
+from wordinserter.operations import (Bold, Format, Group, LineBreak, Paragraph, Span, Table, TableCell, TableRow,
+                                     Text)
+from wordinserter.parsers.fixes import coalesce_text_runs, table_colspans
 
 
 class TestNormalizeTable:
@@ -30,3 +31,90 @@ class TestNormalizeTable:
         table_colspans.normalize_table(eight_column_table)
 
         assert tuple(c.colspan for c in given_row.children) == expected_spans
+
+
+class TestTableMetrics:
+    @staticmethod
+    def table(html_parser, html):
+        return html_parser.parse(html).children[0].children[0]
+
+    def test_metrics(self, html_parser):
+        table = self.table(html_parser, "<table style='width: 50%'><tr><td style='width: 20pt'>a</td><td>b</td></tr>"
+                                        "<tr><td>c</td><td style='width: 30pt'>d</td></tr></table>")
+        metrics = table.metrics
+
+        assert table.metrics is metrics
+        assert metrics.dimensions == table.dimensions == (2, 2)
+        assert metrics.uniform and metrics.width == (50, "%")
+        # update_child_widths gives every cell in a column the width of the first cell in it with one
+        assert metrics.cell_widths == [[(20, "pt"), (30, "pt")], [(20, "pt"), (30, "pt")]]
+        assert [cell.format.width for row in table.children for cell in row.children] == ["20pt", "30pt"] * 2
+
+    def test_invalidated_by_changes(self, html_parser):
+        table = self.table(html_parser, "<table><tr><td>a</td><td>b</td></tr></table>")
+        assert table.dimensions == (1, 2)
+
+        table.add_child(TableRow(TableCell(colspan=1, rowspan=1)))
+        assert table.dimensions == (2, 2) and not table.is_uniform
+
+        table.children[0].add_child(TableCell(colspan=2, rowspan=1))
+        assert table.dimensions == (2, 4)
+
+        table.children[1].children[0].colspan = 5
+        assert table.dimensions == (2, 4)
+        table.invalidate_metrics()
+        assert table.dimensions == (2, 5)
+
+
+class TestCoalesceTextRuns:
+    @staticmethod
+    def coalesce(*children):
+        paragraph = Paragraph(*children)
+        root = Group(paragraph)
+        root.set_parents()
+        return paragraph, coalesce_text_runs(root)
+
+    def test_merges_adjacent_text(self):
+        paragraph, removed = self.coalesce(Text(text="a "), Text(text="&"), Text(text=" b"))
+
+        assert removed == 2
+        assert [child.text for child in paragraph.children] == ["a & b"]
+
+    def test_flattens_spans(self):
+        bold = Bold(Text(text="c"))
+        paragraph, removed = self.coalesce(Text(text="a"), Span(Text(text="b"), bold), Text(text="d"))
+
+        assert removed == 1 + 1
+        assert paragraph.children[1] is bold
+        assert bold.parent is paragraph
+        assert [child.text for child in (paragraph.children[0], paragraph.children[2])] == ["ab", "d"]
+
+    def test_flattens_nested_spans(self):
+        paragraph, removed = self.coalesce(Span(Span(Text(text="a")), Text(text="b")))
+
+        assert removed == 3
+        assert [child.text for child in paragraph.children] == ["ab"]
+
+    @pytest.mark.parametrize("span", [
+        Span(Text(text="b"), attributes={"id": "bookmark"}),
+        Span(LineBreak()),
+    ])
+    def test_keeps_spans(self, span):
+        paragraph, removed = self.coalesce(Text(text="a"), span)
+
+        assert removed == 0
+        assert paragraph.children[1] is span
+
+    def test_keeps_formatted_spans(self):
+        span = Span(Text(text="b"))
+        span.format = Format(color="red")
+        paragraph, removed = self.coalesce(Text(text="a"), span)
+
+        assert removed == 0
+
+    def test_root_is_not_flattened_into(self):
+        root = Group(Group(Text(text="a")), Group(Text(text="b")))
+        root.set_parents()
+
+        assert coalesce_text_runs(root) == 0
+        assert len(root.children) == 2
@@ -0,0 +1,129 @@
+import pickle
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from lxml import etree
+
+from wordinserter import insert
+from wordinserter.operations import Group, Heading, Paragraph, Text
+from wordinserter.renderers.ooxml import (OOXMLRenderer, _pickle_detached,
+                                          split_blocks)
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+DOCUMENT = (
+    "<h1 id='top'>Title</h1><p>Some <b>bold <i>italic</i></b> text, <a href='http://example.com'>a link</a></p>"
+    "<ul><li>One</li><li>Two<ol><li>Nested</li></ol></li></ul>"
+    "<table><tr><td colspan='2'>Wide</td></tr><tr><td>a</td><td><p style='text-align: center'>b</p></td></tr></table>"
+    "<h2 id='second'>Second</h2><ol><li>Again <a href='#top'>back to the top</a></li></ol>"
+    "<p style='color: red; font-size: 16px'>Red</p><p><a href='http://example.org'>another</a></p>"
+)
+
+
+def test_document_parts_are_valid_xml(html_parser, html_document):
+    package = OOXMLRenderer().render(html_parser.parse(html_document.read_text()))
+
+    for part in (package.document, package.numbering, package.relationships):
+        etree.fromstring(part.encode())
+
+
+def test_formatting(html_parser):
+    document = etree.fromstring(OOXMLRenderer().render(html_parser.parse(DOCUMENT)).document.encode())
+    runs = {run.findtext(W + "t"): run for run in document.iter(W + "r")}
+
+    assert runs["bold "].find(W + "rPr/" + W + "b") is not None
+    assert runs["italic"].find(W + "rPr/" + W + "i") is not None
+    assert runs["Red"].find(W + "rPr/" + W + "color").get(W + "val") == "FF0000"
+    assert runs["Red"].find(W + "rPr/" + W + "sz").get(W + "val") == "24"
+    assert document.find(".//" + W + "gridSpan").get(W + "val") == "2"
+    assert document.find(".//" + W + "jc").get(W + "val") == "center"
+
+
+def test_ids_are_merged(html_parser):
+    operations = html_parser.parse(DOCUMENT)
+    package = OOXMLRenderer(executor=ThreadPoolExecutor(2), chunk_size=1).render(operations)
+    document = etree.fromstring(package.document.encode())
+
+    num_ids = [element.get(W + "val") for element in document.iter(W + "numId")]
+    assert num_ids == ["1", "1", "1", "2"]
+    assert [element.get(W + "id") for element in document.iter(W + "bookmarkStart")] == ["1", "2"]
+    assert 'Id="rId3"' in package.relationships and 'Target="http://example.com"' in package.relationships
+    assert 'Id="rId4"' in package.relationships and 'Target="http://example.org"' in package.relationships
+    assert '<w:num w:numId="2">' in package.numbering
+    assert "@" not in package.document
+
+
+def test_parallel_matches_serial(html_parser):
+    operations = html_parser.parse(DOCUMENT * 5)
+
+    serial = OOXMLRenderer().render(operations)
+    parallel = OOXMLRenderer(processes=2, chunk_size=3).render(operations)
+
+    assert parallel == serial
+
+
+def ignore_operation(operation, renderer):
+    pass
+
+
+def test_parallel_hooks_must_be_picklable(html_parser):
+    operations = html_parser.parse(DOCUMENT)
+    hooks = {"pre": {Paragraph: lambda operation, renderer: None}}
+
+    with pytest.raises(ValueError, match="picklable"):
+        OOXMLRenderer(processes=2, hooks=hooks).render(operations)
+
+    # Module level hooks are sent to the workers, and threads don't need the hooks pickled at all
+    OOXMLRenderer(processes=2, hooks={"pre": {Paragraph: ignore_operation}}).render(operations)
+    OOXMLRenderer(executor=ThreadPoolExecutor(2), hooks=hooks).render(operations)
+
+
+def test_style_values_are_escaped():
+    renderer = OOXMLRenderer()
+    renderer._push_paragraph_properties(style='a"b<c')
+    renderer._run_styles.append("x&y")
+    renderer._open_paragraph()
+
+    assert '<w:pStyle w:val="a&quot;b&lt;c"/>' in "".join(renderer._parts)
+    assert '<w:rStyle w:val="x&amp;y"/>' in renderer._run_properties(Text(text="z"))
+
+
+def test_invalid_xml_characters_are_removed():
+    heading = Heading(Text(text="tab\x0bbed \x00text\x1f"), level=1, attributes={"id": "a\x1fb"})
+    package = OOXMLRenderer().render(Group([heading]))
+    document = etree.fromstring(package.document.encode())
+
+    assert "".join(document.itertext()) == "tabbed text"
+    assert document.find(".//" + W + "bookmarkStart").get(W + "name") == "ab"
+
+
+def test_split_blocks_keeps_inline_runs_together():
+    blocks = [Paragraph(), Text(text="a"), Text(text="b"), Paragraph(), Paragraph()]
+
+    chunks = split_blocks(blocks, 1)
+
+    assert [len(chunk) for chunk in chunks] == [3, 1, 1]
+
+
+def test_chunks_are_pickled_without_the_document():
+    blocks = [Paragraph(Text(text=str(i))) for i in range(100)]
+    root = Group(blocks)
+    root.set_parents()
+
+    payload = _pickle_detached(blocks[:1])
+
+    assert len(payload) < len(pickle.dumps(root)) / 10
+    assert blocks[0].parent is root
+
+
+def test_save(html_parser, tmp_path):
+    path = tmp_path / "document.docx"
+
+    insert(html_parser.parse(DOCUMENT + "<img src='nonsense'>"), renderer="ooxml", path=str(path))
+
+    with zipfile.ZipFile(str(path)) as package:
+        names = package.namelist()
+
+    assert {"[Content_Types].xml", "word/document.xml", "word/numbering.xml", "word/styles.xml",
+            "word/media/image1.png"} <= set(names)
@@ -1,3 +1,87 @@
+import bs4
+import pytest
+
+from wordinserter import insert
+from wordinserter.operations import SourceLocator, Text
+from wordinserter.profiling import Profiler
+
+
 def test_parse_doc(html_parser, html_document):
     with html_document.open() as fd:
         html_parser.parse(fd.read())
+
+
+def test_parse_source_locator(html_parser):
+    operations = html_parser.parse("<p>Hello <b>world</b></p>")
+
+    assert all(op.source is None or isinstance(op.source, SourceLocator) for op in operations.descendants)
+    assert {op.source.name for op in operations.descendants if op.source} >= {"p", "b"}
+
+
+def test_parse_source_element(html_parser):
+    operations = html_parser.parse("<p>Hello <b>world</b></p>", source="element")
+
+    assert any(isinstance(op.source, bs4.Tag) for op in operations.descendants)
+
+
+def test_parse_source_none(html_parser):
+    operations = html_parser.parse("<p>Hello <b>world</b></p>", source=None)
+
+    assert all(op.source is None for op in operations.descendants)
+
+
+def test_parse_source_invalid(html_parser):
+    with pytest.raises(RuntimeError):
+        html_parser.parse("<p>Hello</p>", source="everything")
+
+
+def test_render_doc(html_parser, html_document, fake_document, constants):
+    content = html_document.read_text()
+    if "<img" in content:
+        pytest.skip("Rendering images fetches them over the network")
+
+    insert(html_parser.parse(content), document=fake_document, constants=constants)
+
+    assert fake_document.calls
+
+
+def test_parse_skips_non_rendered_elements(html_parser):
+    profiler = Profiler()
+    operations = html_parser.parse(
+        "<html><head><title>Title</title><style>p { color: red }</style></head>"
+        "<body><script>var a = '<p>script</p>';</script><noscript><p>No script</p></noscript><p>Hello</p>"
+        "<template><p>Template</p></template></body></html>",
+        profiler=profiler
+    )
+
+    texts = [op.text for op in operations.descendants if isinstance(op, Text)]
+    assert texts == ["Hello"]
+    # head, title, its text, style, its text, script, its text, noscript, p, its text, template and its p and text
+    assert profiler.counters["skip_elements.skipped"] == 13
+
+
+def test_parse_skip_elements_is_configurable(html_parser):
+    content = "<p>Hello</p><noscript><p>No script</p></noscript>"
+
+    def texts(**kwargs):
+        return [op.text for op in html_parser.parse(content, **kwargs).descendants if isinstance(op, Text)]
+
+    assert texts() == ["Hello"]
+    assert texts(skip_elements=()) == ["Hello", "No script"]
+    assert texts(skip_elements={"p", "noscript"}) == []
+
+
+def test_parser_keeps_no_per_document_state(html_parser):
+    # Parse a second document part way through the first, as another thread sharing the parser could
+    class InterleavingParser(html_parser.__class__):
+        def apply_stylesheets(self, parser, stylesheets):
+            self.inner = self.parse("<p>Inner <script>x</script></p>", source="element", skip_elements=())
+            super().apply_stylesheets(parser, stylesheets)
+
+    parser = InterleavingParser()
+    outer = parser.parse("<p>Outer <script>x</script></p>", stylesheets=["p {color: red}"])
+
+    assert "x" not in "".join(op.text for op in outer.descendants if isinstance(op, Text))
+    assert all(op.source is None or isinstance(op.source, SourceLocator) for op in outer.descendants)
+    assert "x" in "".join(op.text for op in parser.inner.descendants if isinstance(op, Text))
+    assert any(isinstance(op.source, bs4.Tag) for op in parser.inner.descendants)
@@ -0,0 +1,61 @@
+import pickle
+
+from wordinserter.operations import Bold, Paragraph, Text
+from wordinserter.plan import (EMIT, ENTER, EXIT, compile_plan,
+                               count_com_calls, diff_plans, plan_operations)
+from wordinserter.profiling import Profiler
+from wordinserter.renderers.com import COMRenderer
+
+
+DOCUMENT = (
+    "<p>Some <b>bold</b> text</p>"
+    "<table><tr><td colspan='2' style='color: red'>Wide</td></tr><tr><td>a</td><td>b</td></tr></table>"
+)
+
+
+def test_instructions(html_parser):
+    plan = compile_plan(html_parser.parse("<p>Some <b>bold</b></p>"))
+
+    assert [(i.opcode, i.name) for i in plan][1:-1] == [
+        (ENTER, "Paragraph"), (EMIT, "Text"), (ENTER, "Bold"), (EMIT, "Text"), (EXIT, "Bold"), (EXIT, "Paragraph")
+    ]
+    assert plan.instructions[2].args == (("text", "Some "),)
+
+
+def test_lines(html_parser):
+    lines = compile_plan(html_parser.parse(DOCUMENT)).lines()
+
+    assert "  enter Table rows=2 columns=2 border='1'" in lines
+    assert "        emit Text text='Wide'" in lines
+    assert any(line.strip().startswith("enter TableCell colspan=2") and "format.color='red'" in line
+               for line in lines)
+
+
+def test_plans_are_comparable(html_parser):
+    plan = compile_plan(html_parser.parse(DOCUMENT))
+    same = compile_plan(html_parser.parse(DOCUMENT))
+    different = compile_plan(html_parser.parse(DOCUMENT.replace("bold", "italic")))
+
+    assert plan == same and plan.digest == same.digest
+    assert plan != different and plan.digest != different.digest
+    assert pickle.loads(pickle.dumps(plan)) == plan
+
+    diff = diff_plans(plan, different)
+    assert "-      emit Text text='bold'" in diff
+    assert "+      emit Text text='italic'" in diff
+
+
+def test_plan_operations_are_indexed():
+    paragraph = Paragraph(Text(text="a"), Bold(Text(text="b")))
+    plan = compile_plan([paragraph])
+    operations = plan_operations([paragraph])
+
+    assert all(operations[i.index].__class__.__name__ == i.name for i in plan)
+
+
+def test_count_com_calls(html_parser, fake_document, constants):
+    operations = html_parser.parse(DOCUMENT)
+    profiler = Profiler()
+    COMRenderer(fake_document, constants, profiler=profiler).render(html_parser.parse(DOCUMENT))
+
+    assert count_com_calls(operations) == profiler.com_calls
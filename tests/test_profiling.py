@@ -0,0 +1,78 @@
+import json
+
+from wordinserter import insert
+from wordinserter.profiling import CountingProxy, Profiler
+from wordinserter.renderers import COMRenderer
+
+DOCUMENT = "<h1>Title</h1><p>Some <b>bold</b> and <i>italic</i> text</p><ul><li>One</li><li>Two</li></ul>"
+
+
+def profile(html_parser, fake_document, constants, html=DOCUMENT):
+    profiler = Profiler()
+    operations = html_parser.parse(html, profiler=profiler)
+    insert(operations, document=fake_document, constants=constants, profiler=profiler)
+    return profiler
+
+
+def test_parser_phases(html_parser, fake_document, constants):
+    stats = profile(html_parser, fake_document, constants).as_dict()
+
+    assert set(stats["parser"]) == {"parse", "bs4", "build", "normalize_list_elements", "set_parents",
+                                     "correct_whitespace", "normalize_table_colspans", "coalesce_text_runs"}
+    assert all(stat["count"] == 1 for stat in stats["parser"].values())
+
+
+def test_operations_and_methods(html_parser, fake_document, constants):
+    stats = profile(html_parser, fake_document, constants).as_dict()
+
+    assert stats["operation"]["Bold"]["count"] == 1
+    assert stats["operation"]["ListElement"]["count"] == 2
+    assert stats["method"]["list_element"]["count"] == 2
+    assert stats["method"]["text"]["com_calls"] > 0
+
+
+def test_com_calls_are_counted(html_parser, fake_document, constants):
+    profiler = profile(html_parser, fake_document, constants)
+    stats = profiler.as_dict()
+
+    assert profiler.com_calls >= len(fake_document.calls)
+    assert stats["operation"]["Group"]["com_calls"] <= profiler.com_calls
+    assert stats["operation"]["Text"]["com_calls"] >= stats["operation"]["Text"]["count"]
+
+
+def test_nested_operations_are_not_counted_twice(html_parser, fake_document, constants):
+    stats = profile(html_parser, fake_document, constants, "<div><div><p>Nested</p></div></div>").as_dict()
+
+    assert stats["operation"]["Group"]["time"] <= stats["renderer"]["render"]["time"]
+
+
+def test_json(html_parser, fake_document, constants):
+    profiler = profile(html_parser, fake_document, constants)
+
+    assert json.loads(profiler.to_json()) == json.loads(json.dumps(profiler.as_dict()))
+
+
+def test_flamegraph(html_parser, fake_document, constants, tmpdir):
+    profiler = profile(html_parser, fake_document, constants)
+    path = str(tmpdir.join("profile.folded"))
+    profiler.write_flamegraph(path)
+
+    with open(path) as fd:
+        lines = fd.read().splitlines()
+
+    assert "parse;bs4" in [line.rsplit(" ", 1)[0] for line in lines]
+    assert any(line.startswith("render;Group;") and line.endswith(tuple("0123456789")) for line in lines)
+
+
+def test_disabled_profiler_does_not_wrap(fake_document, constants):
+    renderer = COMRenderer(fake_document, constants)
+    assert renderer.document is fake_document
+
+    renderer = COMRenderer(fake_document, constants, profiler=Profiler())
+    assert isinstance(renderer.document, CountingProxy)
+
+
+def test_counters(html_parser, fake_document, constants):
+    stats = profile(html_parser, fake_document, constants, html="<p>a<!-- comment --> b <span>c</span></p>").as_dict()
+
+    assert stats["counters"]["coalesce_text_runs.removed"] == 3
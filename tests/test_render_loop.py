@@ -0,0 +1,88 @@
+import pytest
+
+from wordinserter import insert
+from wordinserter.exceptions import InsertError
+from wordinserter.operations import Bold, Group, Paragraph, Span, Text
+from wordinserter.renderers import COMRenderer, renders
+
+DOCUMENT = "<p>Some <b>bold <i>italic</i></b> text</p><ul><li>One</li><li>Two <b>bold</b></li></ul>"
+
+
+def nested(depth):
+    operation = Text(text="deep")
+    for _ in range(depth):
+        operation = Span(operation)
+
+    root = Group(operation)
+    stack = [(root, None)]
+    while stack:
+        operation, parent = stack.pop()
+        operation.set_parent(parent)
+        stack.extend((child, operation) for child in operation.children)
+
+    return root
+
+
+def test_deep_nesting(fake_document, constants):
+    insert(nested(5000), document=fake_document, constants=constants)
+
+    assert fake_document.text == "deep"
+
+
+def test_hook_order(html_parser, fake_document, constants):
+    events = []
+
+    def hook(name):
+        return lambda operation, renderer: events.append((name, operation.__class__.__name__))
+
+    hooks = {"pre": {cls: hook("pre") for cls in (Paragraph, Bold, Text)},
+             "post": {cls: hook("post") for cls in (Paragraph, Bold, Text)}}
+
+    insert(html_parser.parse("<p>a <b>b</b></p>"), document=fake_document, constants=constants, hooks=hooks)
+
+    assert events == [("pre", "Paragraph"), ("pre", "Text"), ("post", "Text"), ("pre", "Bold"), ("pre", "Text"),
+                      ("post", "Text"), ("post", "Bold"), ("post", "Paragraph")]
+
+
+class FailingRenderer(COMRenderer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closed = []
+
+    @renders(Bold)
+    def bold(self, op):
+        try:
+            yield
+        finally:
+            self.closed.append(op)
+
+    @renders(Text)
+    def text(self, op):
+        if op.text == "fail":
+            raise ValueError(op.text)
+        super().text(op)
+
+
+def test_errors_close_open_methods(html_parser, fake_document, constants):
+    operations = html_parser.parse("<p><b>ok <b>fail</b></b></p>")
+    renderer = FailingRenderer(fake_document, constants)
+
+    with pytest.raises(InsertError) as error:
+        renderer.render(operations)
+
+    assert isinstance(error.value.operation, Text)
+    assert error.value.operation.text == "fail"
+    assert len(renderer.closed) == 2
+
+
+def test_render_methods_must_yield(fake_document, constants):
+    class NoYield(COMRenderer):
+        @renders(Bold)
+        def bold(self, op):
+            return
+            yield
+
+    with pytest.raises(InsertError) as error:
+        NoYield(fake_document, constants).render(Group(Bold(Text(text="x"))))
+
+    assert isinstance(error.value.__cause__, RuntimeError)
@@ -0,0 +1,71 @@
+import pytest
+
+from wordinserter import insert
+from wordinserter.renderers.run_properties import RunProperties
+
+
+def font_calls(html_parser, fake_document, constants, html):
+    insert(html_parser.parse(html), document=fake_document, constants=constants)
+    return [(path.rsplit(".", 1)[-1], args[0]) for kind, path, args, kwargs in fake_document.calls
+            if kind == "set" and ".Font." in path]
+
+
+def test_pending():
+    properties = RunProperties()
+    properties.push("bold")
+    properties.push("bold")
+
+    assert properties.pending() == [("bold", True)]
+
+    properties.mark_applied("bold", True)
+    properties.pop("bold")
+
+    assert properties.pending() == []
+
+
+@pytest.mark.parametrize("html", [
+    "<p><b>a</b><b>b</b></p>",
+    "<p><b><strong>a</strong>b</b></p>",
+])
+def test_redundant_toggles(html_parser, fake_document, constants, html):
+    assert font_calls(html_parser, fake_document, constants, html) == [("Bold", True), ("Bold", False)]
+
+
+def test_nested_bold_stays_bold(html_parser, fake_document, constants):
+    calls = font_calls(html_parser, fake_document, constants, "<p><b>a <b>b</b> c</b> d</p>")
+
+    assert calls == [("Bold", True), ("Bold", False)]
+    assert fake_document.text.startswith("a b c d")
+
+
+def font_call_batches(html_parser, fake_document, constants, html):
+    """
+    The font properties set before each piece of text is typed, as sets since their order within a batch is arbitrary
+    """
+    insert(html_parser.parse(html), document=fake_document, constants=constants)
+    batches = [set()]
+    for kind, path, args, kwargs in fake_document.calls:
+        if kind == "set" and ".Font." in path:
+            batches[-1].add((path.rsplit(".", 1)[-1], args[0]))
+        elif path.endswith(".TypeText") and batches[-1]:
+            batches.append(set())
+    return [batch for batch in batches if batch]
+
+
+def test_mixed(html_parser, fake_document, constants):
+    batches = font_call_batches(html_parser, fake_document, constants, "<p><b>a <i>b</i></b><u>c</u></p>")
+
+    assert batches == [{("Bold", True)}, {("Italic", True)},
+                       {("Bold", False), ("Italic", False), ("Underline", "wdUnderlineSingle")},
+                       {("Underline", "wdUnderlineNone")}]
+
+
+def test_inline_code_font(fake_document, constants):
+    pytest.importorskip("markdown_it")
+    from wordinserter import parse
+
+    insert(parse("a `b` `c` d", parser="markdown"), document=fake_document, constants=constants)
+    names = [args[0] for kind, path, args, kwargs in fake_document.calls if kind == "set" and path.endswith("Font.Name")]
+
+    assert names[0] == "Courier New"
+    assert len(names) == 4
@@ -0,0 +1,83 @@
+import pytest
+
+from wordinserter import parse
+from wordinserter.incremental import structural_hash
+from wordinserter.operations import SourceLocator
+from wordinserter.profiling import Profiler
+
+SUPPORTED = [
+    "",
+    "<p>a</p>\n<p>b &amp; c&nbsp;</p>",
+    "hello <b>bold</b> world<br>next",
+    "<P>Upper <STRONG>case</STRONG> <em>and</em> <u>more</u></P>",
+    "<p>  lots   of\n space </p>",
+    "<p> <b> bold</b> first</p>&nbsp;\n<p>\xa0<br> after a break</p><p> </p>",
+    "<ul> <li>  spaced\t</li> </ul><table><tr><td> cell </td></tr></table>",
+    "<p>a<br/>b</p>",
+    "<ul>\n<li>a <i>b</i>\n<ul><li>c</li></ul></li>\n<li>d</li></ul>",
+    "<ol><li></li></ol><p>x</p>",
+    "<ul><li><p>paragraph in a list</p></li></ul>",
+    "<table>\n<thead><tr><th>h</th></tr></thead><tbody>\n<tr><td>1 <b>b</b></td></tr></tbody></table>",
+    "  x ",
+    " \n x<br> y",
+    "\xa0x",
+    "<ul><li>\t</li></ul>",
+    "<ul><li>a</li><li> </li></ul><ol><li><ul><li>&#32;</li></ul></li></ol>",
+    "&#32;x &#9;",
+    " &#32;\n",
+    "<ul>&#32;<li>a</li></ul>",
+]
+
+UNSUPPORTED = [
+    "<p style='color: red'>a</p>",
+    "<div>a</div>",
+    "<p>unclosed<p>paragraphs",
+    "<!-- comment --><p>a</p>",
+    "<p><ul><li>a list in a paragraph</li></ul></p>",
+    "a < b",
+    "<br></br>",
+]
+
+
+def parsed_with_bs4(content, **kwargs):
+    profiler = Profiler()
+    operations = parse(content, parser="simple", profiler=profiler, **kwargs)
+    return operations, "bs4" in profiler.as_dict().get("parser", {})
+
+
+@pytest.mark.parametrize("content", SUPPORTED)
+def test_same_as_html_parser(content):
+    operations, fallback = parsed_with_bs4(content)
+
+    assert not fallback
+    assert structural_hash(operations) == structural_hash(parse(content))
+
+
+@pytest.mark.parametrize("content", UNSUPPORTED)
+def test_fallback(content):
+    operations, fallback = parsed_with_bs4(content)
+
+    assert fallback
+    assert structural_hash(operations) == structural_hash(parse(content))
+
+
+def test_stylesheets_fall_back():
+    _, fallback = parsed_with_bs4("<p>a</p>", stylesheets=["p { color: red }"])
+
+    assert fallback
+
+
+@pytest.mark.parametrize("skip_elements, fallback", [((), False), ({"script"}, False), ({"b"}, True)])
+def test_skip_elements(skip_elements, fallback):
+    content = "<p>a <b>b</b></p>"
+    operations, used_bs4 = parsed_with_bs4(content, skip_elements=skip_elements)
+
+    assert used_bs4 == fallback
+    assert structural_hash(operations) == structural_hash(parse(content, skip_elements=skip_elements))
+
+
+def test_source():
+    html, = parse("<p>a</p>\n  <p>b</p>", parser="simple").children
+
+    assert html.children[1].source == SourceLocator("p", 2, 2)
+    assert parse("<p>a</p>", parser="simple", source=None)[0][0].source is None
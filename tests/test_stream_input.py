@@ -0,0 +1,47 @@
+import io
+
+import pytest
+
+from wordinserter import parse
+from wordinserter.parsers.html import detect_encoding, soup_from_stream
+
+
+def test_stream_matches_string(html_document):
+    content = html_document.read_text()
+
+    from_string = parse(content)
+    from_stream = parse(io.BytesIO(content.encode("utf-8")))
+
+    assert repr(from_stream) == repr(from_string)
+
+
+def test_small_chunks():
+    content = "<p>Caf\xe9 <b>bold</b></p>" * 1000
+
+    soup = soup_from_stream(io.BytesIO(content.encode("utf-8")), chunk_size=7)
+
+    assert soup.get_text() == "Caf\xe9 bold" * 1000
+
+
+@pytest.mark.parametrize("data, encoding", [
+    ("<p>\xe9</p>".encode("utf-8-sig"), "utf-8"),
+    ("<p>\xe9</p>".encode("utf-16"), "utf-16le"),
+    ("<meta charset='iso-8859-1'><p>\xe9</p>".encode("latin-1"), "iso8859-1"),
+    ("<meta charset='not-an-encoding'><p>\xe9</p>".encode("utf-8"), "utf-8"),
+    (b"<p>\xe9</p>", "windows-1252"),
+    ("<p>\xe9</p>".encode("utf-8")[:-5], "utf-8"),
+])
+def test_detect_encoding(data, encoding):
+    assert detect_encoding(data)[1] == encoding
+
+
+def test_declared_encoding_is_used():
+    content = "<html><head><meta charset='iso-8859-1'></head><body><p>Caf\xe9</p></body></html>"
+
+    operations = parse(io.BytesIO(content.encode("latin-1")))
+
+    assert "Caf\xe9" in repr(operations)
+
+
+def test_empty_stream():
+    assert repr(parse(io.BytesIO(b""))) == repr(parse(""))
@@ -0,0 +1,48 @@
+import warnings
+
+from wordinserter import insert
+from wordinserter.styles import style_names
+
+DOCUMENT = "<p class='missing'>One</p>" * 20 + "<p class='quote other'>Two</p><p class='missing'>Three</p>"
+
+
+def applied_styles(fake_document):
+    return [args[0] for kind, path, args, kwargs in fake_document.calls
+            if kind == "set" and path.endswith("Range.Style")]
+
+
+def test_style_names(html_parser):
+    operations = html_parser.parse("<ul class='list'><li><span class='a b'>x</span></li></ul><p class='b c'>y</p>")
+
+    assert style_names(operations) == ["list", "a", "b", "c"]
+
+
+def test_missing_styles_warn_once(html_parser, constants, fake_document):
+    operations = html_parser.parse(DOCUMENT)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        insert(operations, document=fake_document, constants=constants)
+
+    assert sorted(str(warning.message) for warning in caught) == [
+        "Unable to apply style name 'missing'",
+        "Unable to apply style name 'other'",
+    ]
+    assert applied_styles(fake_document) == ["quote"]
+
+    lookups = [args[0] for kind, path, args, kwargs in fake_document.calls if path == "Document.Styles"]
+    assert sorted(lookups) == ["missing", "other", "quote"]
+
+
+def test_missing_styles_are_created(html_parser, constants, fake_document):
+    operations = html_parser.parse(DOCUMENT)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        insert(operations, document=fake_document, constants=constants, styles={"missing": "Quote"})
+
+    assert [str(warning.message) for warning in caught] == ["Unable to apply style name 'other'"]
+
+    added = [kwargs["Name"] for kind, path, args, kwargs in fake_document.calls if path == "Document.Styles.Add"]
+    assert added == ["missing"]
+    assert applied_styles(fake_document) == ["missing"] * 20 + ["quote", "missing"]
@@ -1,27 +1,82 @@
-
-from .parsers import HTMLParser, MarkdownParser
-from .renderers import COMRenderer
+import importlib
 import inspect
+import sys
+from collections.abc import MutableMapping
+
+# The subpackages have to be imported before the registries below replace them as attributes of this module. Neither
+# imports a parser or renderer backend.
+from . import parsers as _parser_modules
+from . import renderers as _renderer_modules
+
+
+class Registry(MutableMapping):
+    """
+    A mapping of names to parser or renderer classes. Classes can be given as "module:attribute" strings, which are
+    imported the first time they are looked up.
+    """
+    def __init__(self, entries):
+        self._entries = dict(entries)
+
+    def __getitem__(self, name):
+        entry = self._entries[name]
+
+        if isinstance(entry, str):
+            module, _, attribute = entry.partition(":")
+            entry = self._entries[name] = getattr(importlib.import_module(module), attribute)
+
+        return entry
+
+    def __setitem__(self, name, value):
+        self._entries[name] = value
+
+    def __delitem__(self, name):
+        del self._entries[name]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+parsers = Registry({
+    "html": "wordinserter.parsers.html:HTMLParser",
+    "markdown": "wordinserter.parsers.markdown:MarkdownParser",
+    "simple": "wordinserter.parsers.simple:SimpleParser",
+})
+
+renderers = Registry({
+    "com": "wordinserter.renderers.com:COMRenderer",
+    "ooxml": "wordinserter.renderers.ooxml:OOXMLRenderer",
+})
+
+
+def __getattr__(name):
+    # HTMLParser, COMRenderer and the rest used to be imported here eagerly
+    if name in _parser_modules.PARSERS:
+        return getattr(_parser_modules, name)
+
+    if name in _renderer_modules.RENDERERS:
+        return getattr(_renderer_modules, name)
+
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
 
-parsers = {
-    "html": HTMLParser,
-    "markdown": MarkdownParser
-}
 
-renderers = {
-    "com": COMRenderer
-}
+if sys.version_info < (3, 7):
+    # Without module __getattr__ the backends are imported up front, as they were before the registries
+    from .parsers import HTMLParser, MarkdownParser, SimpleParser
+    from .renderers import COMRenderer, OOXMLRenderer
 
 
 def parse(text, parser='html', **kwargs):
     """
     Parse some given input into a list of operations to perform
     :param text: Text input
-    :param parser: Either 'html' or 'markdown', or a class that inherits from BaseParser
+    :param parser: Either 'html', 'markdown' or 'simple', or a class that inherits from BaseParser
     :return: A list of operations
     """
     if isinstance(parser, str) and parser not in parsers:
-        raise RuntimeError("Format {0} not recognized".format(format))
+        raise RuntimeError("Format {0} not recognized".format(parser))
 
     # If we have been given a string instead of a parsers class then lookup the class from the parsers dictionary
     if not inspect.isclass(parser):
@@ -36,7 +91,7 @@ def insert(operations, renderer="com", **kwargs):
     """
     Render a list of operations to a word document using the specified renderer
     :param operations: A sequence of operations to execute
-    :param renderer: Either a string (only 'COM' supported at this time) or a class that inherits from BaseRenderer
+    :param renderer: Either a string ('com' or 'ooxml') or a class that inherits from BaseRenderer
     :param kwargs: Keyword arguments to pass to the renderer
     """
     if isinstance(renderer, str) and renderer not in renderers:
@@ -50,8 +105,9 @@ def insert(operations, renderer="com", **kwargs):
 
 
 def print_operations(operations, indent_level=0):
-    indent = "  " * indent_level if indent_level > 0 else ""
+    stack = [(op, indent_level) for op in reversed(list(operations))]
 
-    for op in operations:
-        print(indent + op.__class__.__name__)
-        print_operations(op.children, indent_level + 1)
+    while stack:
+        op, level = stack.pop()
+        print("  " * level + op.__class__.__name__)
+        stack.extend((child, level + 1) for child in reversed(op.children))
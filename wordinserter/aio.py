@@ -0,0 +1,192 @@
+"""
+asyncio support.
+
+Word's COM objects live in a single-threaded apartment: they must be created and used on the same thread, and calls to
+them block. `ComWorker` owns a thread that runs COM work from a queue, so any number of coroutines can share one Word
+instance without blocking the event loop:
+
+    worker = ComWorker()
+    document = await worker.run(create_document)  # Create Word objects on the worker thread
+
+    operations = await parse_async(html)
+    await insert_async(operations, worker, document=document, constants=constants)
+
+    worker.close()
+
+Images are downloaded with aiohttp if it is installed, otherwise with requests in an executor.
+"""
+import asyncio
+import functools
+import queue
+import threading
+import warnings
+
+import requests
+
+from . import insert, parse
+from .operations import Image
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+try:
+    import comtypes
+except ImportError:
+    comtypes = None
+
+_STOP = object()
+
+# The number of images prefetch_images downloads at once
+PREFETCH_LIMIT = 8
+
+
+class ComWorker(object):
+    """
+    Runs functions on a dedicated thread with COM initialized as a single-threaded apartment. Work is run one item at a
+    time, in the order it was submitted.
+    """
+    def __init__(self, name="wordinserter-com"):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        if comtypes is not None:
+            comtypes.CoInitialize()
+
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+
+                func, future, loop = item
+                if future.cancelled():
+                    continue
+
+                try:
+                    result = func()
+                except BaseException as e:
+                    loop.call_soon_threadsafe(_set_exception, future, e)
+                else:
+                    loop.call_soon_threadsafe(_set_result, future, result)
+        finally:
+            if comtypes is not None:
+                comtypes.CoUninitialize()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue `func` to be called on the worker thread.
+        :return: An asyncio Future for the result, bound to the current event loop
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError("ComWorker has been closed")
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._queue.put((functools.partial(func, *args, **kwargs), future, loop))
+        return future
+
+    async def run(self, func, *args, **kwargs):
+        return await self.submit(func, *args, **kwargs)
+
+    def close(self, wait=True):
+        """
+        Stop the worker once the work already queued has finished
+        """
+        self._queue.put(_STOP)
+        if wait:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _set_result(future, result):
+    if not future.cancelled():
+        future.set_result(result)
+
+
+def _set_exception(future, exception):
+    if not future.cancelled():
+        future.set_exception(exception)
+
+
+async def parse_async(text, parser="html", executor=None, **kwargs):
+    """
+    Parse `text` in an executor. Takes the same arguments as `wordinserter.parse`.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, functools.partial(parse, text, parser=parser, **kwargs))
+
+
+def _remote_images(operations):
+    stack = [operations]
+
+    while stack:
+        operation = stack.pop()
+
+        if isinstance(operation, Image):
+            # Only the start of the location is looked at, it can be a data: URI of several megabytes
+            if operation.location[:8].lower().startswith(("http://", "https://")):
+                yield operation
+        else:
+            stack.extend(operation.children)
+
+
+async def _download_aiohttp(session, image):
+    async with session.get(image.location, ssl=False, timeout=aiohttp.ClientTimeout(total=5)) as response:
+        return await response.read()
+
+
+async def _download_requests(image, executor):
+    loop = asyncio.get_event_loop()
+    get = functools.partial(requests.get, image.location, verify=False, timeout=5)
+    response = await loop.run_in_executor(executor, get)
+    return response.content
+
+
+async def prefetch_images(operations, executor=None, limit=PREFETCH_LIMIT):
+    """
+    Download every http(s) image in `operations` concurrently, so the renderer doesn't have to fetch them while it
+    holds the COM worker. Images that can't be downloaded are replaced by the 404 image, as they are when rendering.
+    :param limit: The most images to download at once
+    """
+    images = list(_remote_images(operations))
+    if not images:
+        return
+
+    semaphore = asyncio.Semaphore(limit)
+
+    async def fetch(download, image, *args):
+        try:
+            async with semaphore:
+                data = await download(*args)
+        except Exception as e:
+            warnings.warn('Unable to prefetch image {url}: {ex}'.format(url=image.location, ex=e))
+            image.set_not_found()
+        else:
+            image.set_content(data)
+
+    if aiohttp is not None:
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(fetch(_download_aiohttp, image, session, image) for image in images))
+    else:
+        await asyncio.gather(*(fetch(_download_requests, image, image, executor) for image in images))
+
+
+async def insert_async(operations, worker, renderer="com", prefetch=True, executor=None, **kwargs):
+    """
+    Render `operations` on `worker`. The document passed in `kwargs` must have been created on the worker's thread.
+    Takes the same arguments as `wordinserter.insert`.
+    :param prefetch: Download images with async I/O before rendering
+    """
+    if prefetch:
+        await prefetch_images(operations, executor=executor)
+
+    return await worker.run(insert, operations, renderer=renderer, **kwargs)
@@ -12,27 +12,51 @@ Options:
     --hidden            Hide the Word window while rendering
 """
 
+import mmap
 import pathlib
 import sys
 import tempfile
 import inspect
 import os
+from contextlib import contextmanager
 
-from comtypes import gen
-from contexttimer import Timer
-from docopt import docopt
-
-from comtypes.client import CreateObject
 from wordinserter import insert, parse
 
 
-def get_file_contents(path):
+def get_file_path(path):
     path = pathlib.Path(path)
     if not path.exists() and not path.is_file():
         print('{0} does not exist or is not a file'.format(path), file=sys.stderr)
         exit(1)
 
-    return path.read_text()
+    return path
+
+
+def get_file_contents(path):
+    return get_file_path(path).read_text()
+
+
+@contextmanager
+def open_input(path):
+    """
+    Open the document to parse as bytes, so the parser can read it in chunks: stdin's buffer for '-', otherwise a
+    memory map of the file, or the file itself if it can't be mapped (if it is empty, for example).
+    """
+    if path == '-':
+        yield sys.stdin.buffer
+        return
+
+    with get_file_path(path).open('rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mapped = None
+
+        if mapped is None:
+            yield f
+        else:
+            with mapped:
+                yield mapped
 
 
 def save_as_image(document, save_as, constants):
@@ -74,12 +98,14 @@ SAVE_FORMATS = {
 
 
 def run():
+    # Imported here so that importing this module, and exiting early on bad arguments, stays fast
+    from docopt import docopt
+
     arguments = docopt(__doc__, version='0.1')
 
-    if arguments['<path>'] == '-':
-        text = sys.stdin.read()
-    else:
-        text = get_file_contents(arguments['<path>'])
+    if arguments['<path>'] != '-':
+        # Fail before opening Word if the input doesn't exist
+        get_file_path(arguments['<path>'])
 
     css = []
 
@@ -103,8 +129,12 @@ def run():
             print('Error: Path {0} already exists. Not overwriting'.format(save_as), file=sys.stderr)
             exit(1)
 
-    with Timer(factor=1000) as t:
-        parsed = parse(text, stylesheets=css)
+    from comtypes import gen
+    from comtypes.client import CreateObject
+    from contexttimer import Timer
+
+    with Timer(factor=1000) as t, open_input(arguments['<path>']) as stream:
+        parsed = parse(stream, stylesheets=css)
 
     print('Parsed in {0:f} ms'.format(t.elapsed))
 
@@ -0,0 +1,99 @@
+"""
+Syntax highlighting for CodeBlocks.
+
+Pygments tokens are mapped straight onto Text operations wrapped in the relevant formatting operations, rather than
+rendering the code to HTML and parsing that again. Lexers, the token style table and the highlighted runs of recently
+seen snippets are all cached, so documents that repeat the same code (or the same language) only pay for it once.
+"""
+from functools import lru_cache
+
+from pygments.lexers import get_lexer_by_name
+from pygments.styles import get_style_by_name
+from pygments.util import ClassNotFound
+
+from .operations import Bold, Format, Group, Italic, Span, Text, UnderLine
+
+STYLE = get_style_by_name("default")
+
+# (color, bold, italic, underline) for text that has no styling at all
+_PLAIN = (None, False, False, False)
+
+
+@lru_cache(maxsize=None)
+def get_lexer(language):
+    """
+    Return the lexer for a language, or None if Pygments doesn't know about it.
+    """
+    try:
+        return get_lexer_by_name(language)
+    except ClassNotFound:
+        return None
+
+
+@lru_cache(maxsize=None)
+def token_style(token_type):
+    """
+    Map a token type to a (color, bold, italic, underline) tuple
+    """
+    style = STYLE.style_for_token(token_type)
+    color = "#" + style["color"] if style["color"] else None
+    return color, bool(style["bold"]), bool(style["italic"]), bool(style["underline"])
+
+
+@lru_cache(maxsize=256)
+def highlight_runs(text, language):
+    """
+    Split some code into runs of text that share the same style. Whitespace is merged into the preceding run as
+    colors and weights have no visible effect on it, which keeps the number of runs (and so Word calls) down.
+    :return: A tuple of (style, text) pairs, or None if the language is not known
+    """
+    lexer = get_lexer(language)
+    if lexer is None:
+        return None
+
+    runs = []
+
+    for token_type, value in lexer.get_tokens(text):
+        if not value:
+            continue
+
+        style = token_style(token_type)
+
+        if runs and (runs[-1][0] == style or (value.isspace() and not runs[-1][0][3])):
+            runs[-1][1].append(value)
+        else:
+            runs.append((style, [value]))
+
+    return tuple((style, "".join(values)) for style, values in runs)
+
+
+def _build_run(style, text):
+    color, bold, italic, underline = style
+
+    operation = Text(text=text)
+
+    for enabled, wrapper in ((underline, UnderLine), (italic, Italic), (bold, Bold)):
+        if enabled:
+            operation = wrapper(operation)
+            operation.format = Format()
+
+    if style == _PLAIN:
+        return operation
+
+    span = Span(operation)
+    span.format = Format(color=color) if color else Format()
+    return span
+
+
+def highlighted_operations(text, language):
+    """
+    Highlight some code, returning a Group of operations or None if the language is not known
+    """
+    runs = highlight_runs(text, language)
+    if runs is None:
+        return None
+
+    group = Group([_build_run(style, value) for style, value in runs])
+    group.format = Format()
+    group.set_parents()
+    return group
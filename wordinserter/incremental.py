@@ -0,0 +1,124 @@
+"""
+Support for incrementally re-rendering a document.
+
+Each top-level block of an operation tree is identified by a structural hash of its contents. When a document is
+rendered incrementally every block is wrapped in a hidden bookmark whose name embeds that hash, so the next render can
+compare the hashes of the new tree against the bookmarks already in the document and only touch the blocks that
+changed. Nothing in this module talks to Word, the COM side lives in `COMRenderer.render_incremental`.
+"""
+import difflib
+import hashlib
+import re
+from collections import namedtuple
+
+from .operations import Group
+
+BOOKMARK_PREFIX = "_wi_"
+# Bookmark names are limited to 40 characters, so only part of the hash is used.
+_HASH_LENGTH = 20
+_BOOKMARK_REGEX = re.compile(r"^{0}([0-9a-f]{{{1}}})_(\d+)$".format(BOOKMARK_PREFIX, _HASH_LENGTH))
+
+BlockChange = namedtuple("BlockChange", ["action", "old_index", "new_index"])
+
+KEEP, DELETE, INSERT = "keep", "delete", "insert"
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(val)) for key, val in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(val) for val in value)
+    return value
+
+
+def _describe(operation):
+    names = sorted(operation.requires | operation.optional)
+    fields = tuple((name, _freeze(getattr(operation, name, None))) for name in names)
+
+    format_fields = None
+    if operation.format is not None:
+        format_fields = tuple((name, _freeze(getattr(operation.format, name)))
+                              for name in sorted(operation.format.optional))
+
+    description = (operation.__class__.__name__, fields, _freeze(operation.original_attributes), format_fields)
+    return repr(description).encode("utf8")
+
+
+def structural_hash(operation):
+    """
+    Hash an operation and all of its children. Two operations have the same hash if they would render the same
+    content, regardless of where they are in a tree or any data attached to them while rendering.
+    :return: A hex digest
+    """
+    digests = {}
+    stack = [(operation, False)]
+
+    while stack:
+        op, children_done = stack.pop()
+
+        if not children_done:
+            stack.append((op, True))
+            stack.extend((child, False) for child in reversed(op.children))
+            continue
+
+        digest = hashlib.sha1(_describe(op))
+        for child in op.children:
+            digest.update(digests.pop(id(child)))
+        digests[id(op)] = digest.digest()
+
+    return digests[id(operation)].hex()
+
+
+def top_level_blocks(operations):
+    """
+    Return the blocks that make up a document. Parsers wrap the content in formatting-free Groups (`<html>`, for
+    example) which are skipped over.
+    """
+    node = operations
+
+    while len(node.children) == 1 \
+            and isinstance(node.children[0], Group) \
+            and not (node.children[0].format is not None and node.children[0].format.has_format()):
+        node = node.children[0]
+
+    return list(node.children)
+
+
+def bookmark_name(block_hash, number):
+    return "{0}{1}_{2}".format(BOOKMARK_PREFIX, block_hash[:_HASH_LENGTH], number)
+
+
+def parse_bookmark_name(name):
+    """
+    :return: A (hash, number) tuple if the name is a bookmark made by `bookmark_name`, otherwise None
+    """
+    match = _BOOKMARK_REGEX.match(name)
+    if match is None:
+        return None
+
+    return match.group(1), int(match.group(2))
+
+
+def diff_blocks(old_hashes, new_hashes):
+    """
+    Work out how to turn a document made of blocks with `old_hashes` into one with `new_hashes`. Hashes may be
+    truncated, only the common prefix of the two is compared.
+    :return: A list of BlockChanges in document order. Changes that delete a block come before those that
+             insert one in its place.
+    """
+    old_keys = [h[:_HASH_LENGTH] for h in old_hashes]
+    new_keys = [h[:_HASH_LENGTH] for h in new_hashes]
+
+    changes = []
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            changes.extend(BlockChange(KEEP, old, new)
+                           for old, new in zip(range(old_start, old_end), range(new_start, new_end)))
+            continue
+
+        changes.extend(BlockChange(DELETE, old, None) for old in range(old_start, old_end))
+        changes.extend(BlockChange(INSERT, None, new) for new in range(new_start, new_end))
+
+    return changes
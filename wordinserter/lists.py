@@ -0,0 +1,43 @@
+from collections import namedtuple
+
+from .operations import BaseList, ListElement, Table
+
+# Word lists have nine levels
+MAX_LIST_LEVEL = 9
+
+# A list element, the level it is numbered at and the list it belongs to
+ListLevel = namedtuple("ListLevel", ["element", "level", "list"])
+
+
+def list_layout(operation: BaseList, level=1):
+    """
+    Work out the level of every ListElement in a list, including the elements of lists nested in it, before the list
+    is rendered. Elements of `operation` itself are at `level`, and each nested list is one level deeper, up to
+    MAX_LIST_LEVEL.
+    :return: A list of ListLevels in document order, or None if the list contains a table, as table cells can't be
+             numbered along with the rest of the list
+    """
+    layout = []
+    stack = [(iter(operation.children), operation, level)]
+
+    while stack:
+        children, owner, owner_level = stack[-1]
+
+        for child in children:
+            if isinstance(child, Table):
+                return None
+
+            if isinstance(child, BaseList):
+                stack.append((iter(child.children), child, min(owner_level + 1, MAX_LIST_LEVEL)))
+                break
+
+            if isinstance(child, ListElement):
+                layout.append(ListLevel(child, owner_level, owner))
+
+            if child.children:
+                stack.append((iter(child.children), owner, owner_level))
+                break
+        else:
+            stack.pop()
+
+    return layout
@@ -1,9 +1,13 @@
-import codecs
+import binascii
+import os
 import tempfile
 import warnings
+from collections import namedtuple
 from urllib.parse import urlsplit
 
-import requests
+# A lightweight pointer back to the markup an operation was built from. Unlike the parsed element itself this does
+# not keep the whole source tree alive. `line` and `offset` are None if the underlying parser does not report them.
+SourceLocator = namedtuple("SourceLocator", ["name", "line", "offset"])
 
 
 class RenderData(object):
@@ -140,9 +144,16 @@ class Operation(object):
 
     @property
     def descendants(self):
-        for child in self.children:
-            yield child
-            yield from child.descendants
+        # A stack of iterators rather than nested generators, so each item is yielded in constant time at any depth
+        stack = [iter(self.children)]
+
+        while stack:
+            for child in stack[-1]:
+                yield child
+                stack.append(iter(child.children))
+                break
+            else:
+                stack.pop()
 
     def __repr__(self):
         if len(self.children) == 1:
@@ -157,9 +168,15 @@ class Operation(object):
 
     def set_parents(self, parent=None):
         self.set_parent(parent)
+        stack = [self]
+
+        while stack:
+            operation = stack.pop()
+
+            for child in operation.children:
+                child.set_parent(operation)
 
-        for child in self.children:
-            child.set_parents(self)
+            stack.extend(operation.children)
 
     def __len__(self):
         return len(self.children)
@@ -234,24 +251,14 @@ class CodeBlock(Operation):
     optional = {"highlight", "text"}
 
     def highlighted_operations(self):
-        from pygments.lexers import get_lexer_by_name
-        from pygments.util import ClassNotFound
-        from pygments import highlight
-        from pygments.formatters import get_formatter_by_name
-        from wordinserter import parse
-        import warnings
+        from wordinserter.highlighting import highlighted_operations
 
-        try:
-            formatter = get_formatter_by_name("html")
-            lexer = get_lexer_by_name(self.highlight)
-        except ClassNotFound:
-            warnings.warn("Lexer {0} or formatter html not found, not highlighting".format(self.highlight))
-            return None
+        operations = highlighted_operations(self.text, self.highlight)
 
-        formatter.noclasses = True
+        if operations is None:
+            warnings.warn("Lexer {0} not found, not highlighting".format(self.highlight))
 
-        highlighted_code = highlight(self.text, lexer=lexer, formatter=formatter)
-        return parse(highlighted_code, parser="html")
+        return operations
 
 
 class InlineCode(Operation):
@@ -324,9 +331,82 @@ class Font(Operation):
     optional = {"size", "color"}
 
 
+# How many characters of a data: URI are decoded at a time. A multiple of 4, so chunks usually decode on their own.
+DATA_URI_CHUNK_SIZE = 1024 * 1024
+
+_BASE64_WHITESPACE = b" \t\r\n\f\v"
+
+
+def decode_base64_to_file(text, start, destination, chunk_size=DATA_URI_CHUNK_SIZE):
+    """
+    Decode the base64 in `text[start:]` into the binary file `destination` a chunk at a time, so the decoded data and
+    a bytes copy of the text are never held in memory all at once. Whitespace is ignored.
+    :raises ValueError: If the text is not valid base64
+    """
+    remainder = b""
+
+    for offset in range(start, len(text), chunk_size):
+        chunk = remainder + text[offset:offset + chunk_size].encode("ascii").translate(None, _BASE64_WHITESPACE)
+        # Base64 decodes in groups of 4 characters, the rest is carried into the next chunk
+        usable = len(chunk) - len(chunk) % 4
+        destination.write(binascii.a2b_base64(memoryview(chunk)[:usable]))
+        remainder = chunk[usable:]
+
+    if remainder:
+        raise binascii.Error("Incorrect padding")
+
+
+class DataURI(object):
+    """
+    An image embedded in a data: URI. Parsers give every Image in a document with the same URI the same DataURI, so
+    the image is only decoded once.
+    """
+    def __init__(self, uri):
+        self.uri = uri
+        self._path = None
+        self._decoded = False
+
+    def decode(self):
+        """
+        Decode the image to a temporary file
+        :return: The path of the file, or None if the URI is invalid
+        """
+        if not self._decoded:
+            self._path = self._decode()
+            self._decoded = True
+
+        return self._path
+
+    def _decode(self):
+        uri = self.uri
+        comma = uri.find(",")
+        header = uri[len("data:"):comma].split(";") if comma != -1 else []
+
+        if len(header) != 2:
+            warnings.warn("Could not parse data URI! First 25 chars: {data}".format(data=uri[:25]))
+            return None
+
+        mimetype, encoding = header
+        if encoding != "base64":
+            warnings.warn("Encoding {0} is not valid".format(encoding))
+            return None
+
+        try:
+            with tempfile.NamedTemporaryFile(delete=False) as temp:
+                decode_base64_to_file(uri, comma + 1, temp)
+        except ValueError as e:
+            # Removed once it is closed, Windows can't remove an open file
+            os.remove(temp.name)
+            warnings.warn("Could not decode data URI: {ex}".format(ex=e))
+            return None
+
+        return temp.name
+
+
 class Image(ChildlessOperation):
     requires = {"location"}
     optional = {"height", "width", "caption"}
+    data_uri = None
 
     @staticmethod
     def write_to_temp_file(data):
@@ -341,6 +421,27 @@ class Image(ChildlessOperation):
         # Hard coded widths :'(
         return self.write_to_temp_file(not_found_image), 300, 220
 
+    def share_data_uri(self, data_uris):
+        """
+        If this image is a data: URI, use the same DataURI as the other images in `data_uris`, a dict the parser keeps
+        for a document, with the same URI
+        """
+        if self.location.startswith("data:"):
+            self.data_uri = data_uris.setdefault(self.location, DataURI(self.location))
+            # Don't keep a second copy of the URI alive
+            self.location = self.data_uri.uri
+
+    def set_content(self, data):
+        """
+        Use `data` as the image instead of fetching it from `location`, for callers that download images themselves
+        (see wordinserter.aio)
+        """
+        self._path_cache = (self.write_to_temp_file(data), self.height, self.width)
+
+    def set_not_found(self):
+        path, height, width = self.get_404_image_and_dimensions()
+        self._path_cache = (path, self.height or height, self.width or width)
+
     def get_image_path_and_dimensions(self):
         if hasattr(self, "_path_cache"):
             return self._path_cache
@@ -348,12 +449,25 @@ class Image(ChildlessOperation):
         result = self.location
         original_height, original_width = self.height, self.width
         height, width = original_height, original_width
+
+        if result.startswith("data:"):
+            # Checked before urlsplit, which would copy the whole URI
+            data_uri = self.data_uri or DataURI(result)
+            result = data_uri.decode()
+            if result is None:
+                result, height, width = self.get_404_image_and_dimensions()
+
+            self._path_cache = result, original_height or height, original_width or width
+            return self._path_cache
+
         split = urlsplit(result)
 
-        if split.scheme not in {"http", "https", "data"}:
+        if split.scheme not in {"http", "https"}:
             warnings.warn('Invalid image scheme {scheme}: {url}'.format(url=result, scheme=split.scheme))
             result, height, width = self.get_404_image_and_dimensions()
-        elif split.scheme in {"http", "https"}:
+        else:
+            import requests
+
             try:
                 response = requests.get(result, verify=False, timeout=5)
             except requests.RequestException as e:
@@ -361,23 +475,9 @@ class Image(ChildlessOperation):
                 result, height, width = self.get_404_image_and_dimensions()
             else:
                 result = self.write_to_temp_file(response.content)
-        elif split.scheme == 'data':
-            try:
-                mimetype, rest = split.path.split(";")
-                encoding, data = rest.split(",")
-            except Exception:
-                warnings.warn("Could not parse data URI! First 25 chars: {data}".format(data=result[:25]))
-                result, height, width = self.get_404_image_and_dimensions()
-            else:
-                if encoding != "base64":
-                    warnings.warn("Encoding {0} is not valid".format(encoding))
-                    result, height, width = self.get_404_image_and_dimensions()
-                else:
-                    image_content = codecs.decode(bytes(data, "utf8"), "base64")
-                    result = self.write_to_temp_file(image_content)
 
-        self._path_cache = result
-        return result, original_height or height, original_width or width
+        self._path_cache = result, original_height or height, original_width or width
+        return self._path_cache
 
 
 class HyperLink(Operation):
@@ -430,56 +530,106 @@ def get_value_and_unit(css_value):
     return value, unit
 
 
+class TableMetrics(object):
+    """
+    The measurements of a table that the parser fixes and the renderers need, worked out in a single pass over its
+    cells: the number of rows and columns, whether every row has the same number of cells, the table's width and the
+    width of every cell, each as a (value, unit) pair from `get_value_and_unit`.
+    """
+    def __init__(self, table):
+        self.rows = len(table.children)
+        self.columns = 0
+        self.uniform = bool(table.children)
+        self.width = get_value_and_unit(table.format.width if table.format is not None else None)
+        self.cell_widths = []
+
+        first_row = len(table.children[0].children) if table.children else 0
+
+        for row in table.children:
+            self.columns = max(self.columns, sum(cell.colspan or 1 for cell in row.children))
+            self.uniform = self.uniform and len(row.children) == first_row
+            self.cell_widths.append([get_value_and_unit(cell.format.width if cell.format is not None else None)
+                                     for cell in row.children])
+
+    @property
+    def dimensions(self):
+        return self.rows, self.columns
+
+
 class Table(Operation):
     allowed_children = {"TableRow", "TableHead", "TableBody"}
     optional = {"border"}
 
+    def __init__(self, *children, **kwargs):
+        self._metrics = None
+        super().__init__(*children, **kwargs)
+
+    @property
+    def metrics(self):
+        """
+        The table's TableMetrics. They are kept until the rows of the table are changed through the child methods of
+        the table or its rows, or until `invalidate_metrics` is called after changing cells directly.
+        """
+        if self._metrics is None:
+            self._metrics = TableMetrics(self)
+        return self._metrics
+
+    def invalidate_metrics(self):
+        self._metrics = None
+
     @property
     def dimensions(self):
         """
         Returns row, column counts
         """
-        if not self.has_children:
-            return 0, 0
-
-        rows = len(self.children)
-        columns = max(sum(child.colspan or 1 for child in row.children) for row in self.children)
+        return self.metrics.dimensions
 
-        return rows, columns
-    
     @property
     def is_uniform(self):
-        if not self.has_children:
-            return False
+        return self.metrics.uniform
 
-        if len(self.children) == 1:
-            return True
-
-        first_row = len(self.children[0].children)
-        return all(len(child.children) == first_row for child in self.children[1:])
-    
     @property
     def width(self):
-        return get_value_and_unit(self.format.width)
+        return self.metrics.width
 
     def update_child_widths(self):
-        if not self.is_uniform:
+        metrics = self.metrics
+        if not metrics.uniform:
             return
 
-        row_widths = [None] * self.dimensions[1]
+        # The width of each column is the width of its first cell that has a valid one
+        row_widths = [None] * metrics.columns
+        parsed_widths = [(None, None)] * metrics.columns
 
-        for idx, _ in enumerate(row_widths):
-            for row in self.children:
-                child = row.children[idx]
-                child_width, unit = child.width
-                if child_width is not None:
-                    row_widths[idx] = child.format.width
+        for idx in range(len(row_widths)):
+            for row, cell_widths in zip(self.children, metrics.cell_widths):
+                if idx < len(cell_widths) and cell_widths[idx][0] is not None:
+                    row_widths[idx] = row.children[idx].format.width
+                    parsed_widths[idx] = cell_widths[idx]
                     break
 
         for row in self.children:
             for idx, cell in enumerate(row.children):
                 cell.format.width = row_widths[idx]
 
+        metrics.cell_widths = [parsed_widths[:len(row.children)] for row in self.children]
+
+    def add_child(self, child):
+        self.invalidate_metrics()
+        super().add_child(child)
+
+    def insert_child(self, index, child):
+        self.invalidate_metrics()
+        super().insert_child(index, child)
+
+    def remove_child(self, child):
+        self.invalidate_metrics()
+        super().remove_child(child)
+
+    def replace_child(self, child, new_child):
+        self.invalidate_metrics()
+        super().replace_child(child, new_child)
+
 
 class TableHead(IgnoredOperation):
     allowed_children = {"TableRow"}
@@ -492,6 +642,26 @@ class TableBody(IgnoredOperation):
 class TableRow(Operation):
     allowed_children = {"TableCell"}
 
+    def _invalidate_table(self):
+        if isinstance(self.parent, Table):
+            self.parent.invalidate_metrics()
+
+    def add_child(self, child):
+        self._invalidate_table()
+        super().add_child(child)
+
+    def insert_child(self, index, child):
+        self._invalidate_table()
+        super().insert_child(index, child)
+
+    def remove_child(self, child):
+        self._invalidate_table()
+        super().remove_child(child)
+
+    def replace_child(self, child, new_child):
+        self._invalidate_table()
+        super().replace_child(child, new_child)
+
 
 class TableCell(Operation):
     optional = {"colspan", "rowspan", "orientation"}
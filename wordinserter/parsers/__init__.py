@@ -1,15 +1,62 @@
 import abc
+import importlib
+import sys
+
+# How much of the parsed markup each operation keeps a reference to in `Operation.source`.
+#  - "element" keeps the bs4 element itself. This is useful for debugging but keeps the whole bs4 tree alive for as
+#    long as the operations are.
+#  - "locator" keeps a small SourceLocator (tag name, line and offset) instead.
+#  - None does not record a source at all.
+SOURCE_MODES = {"element", "locator", None}
+
+# Elements whose contents are never rendered. Their subtrees are skipped while building operations, rather than being
+# built and then flattened into their parent like other unknown elements.
+SKIPPED_ELEMENTS = frozenset({"head", "meta", "noscript", "script", "style", "template"})
+
+# Parsers are imported when they are first used, so importing wordinserter doesn't import BeautifulSoup, cssutils or
+# markdown-it
+PARSERS = {
+    "HTMLParser": "wordinserter.parsers.html",
+    "MarkdownParser": "wordinserter.parsers.markdown",
+    "SimpleParser": "wordinserter.parsers.simple",
+}
 
 
 class ParseException(RuntimeError):
     pass
 
 
+class BuildState(object):
+    """
+    The state of one document being built. It is passed through the build methods rather than kept on the parser, so
+    one parser can parse several documents at once from different threads.
+    """
+    __slots__ = ("source_mode", "data_uris", "skip_elements", "skipped_nodes")
+
+    def __init__(self, source_mode="locator", skip_elements=SKIPPED_ELEMENTS, count_skipped=False):
+        self.source_mode = source_mode
+        # The DataURI of each data: URI image in the document, so identical images are decoded once
+        self.data_uris = {}
+        self.skip_elements = frozenset(skip_elements)
+        # The number of elements and strings in skipped subtrees, only counted when parsing with a profiler
+        self.skipped_nodes = 0 if count_skipped else None
+
+
 class BaseParser(abc.ABC):
     @abc.abstractmethod
     def parse(self, content):
         raise NotImplementedError()
 
 
-from .html import HTMLParser
-from .markdown import MarkdownParser
+def __getattr__(name):
+    if name not in PARSERS:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+
+    return getattr(importlib.import_module(PARSERS[name]), name)
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ (PEP 562) needs Python 3.7, so older versions import the parsers up front
+    from .html import HTMLParser
+    from .markdown import MarkdownParser
+    from .simple import SimpleParser
@@ -1,3 +1,4 @@
 from .list_elements import normalize_list_elements
 from .whitespace import correct_whitespace
 from .table_colspans import normalize_table_colspans
+from .text_runs import coalesce_text_runs
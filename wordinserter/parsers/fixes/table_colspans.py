@@ -2,12 +2,18 @@ from wordinserter.operations import Table
 
 
 def normalize_table_colspans(tokens):
-    for token in tokens:
+    stack = list(reversed(list(tokens)))
+
+    while stack:
+        token = stack.pop()
+
         if isinstance(token, Table):
             normalize_table(token)
+            # The colspans may have changed, so the metrics are worked out again, once, for the widths and renderers
+            token.invalidate_metrics()
             token.update_child_widths()
         else:
-            normalize_table_colspans(token.children)
+            stack.extend(reversed(token.children))
 
 
 def normalize_table(table: Table):
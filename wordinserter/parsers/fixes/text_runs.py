@@ -0,0 +1,75 @@
+from wordinserter.operations import (Bold, Group, HyperLink, InlineCode, Italic,
+                                     Span, Text, UnderLine)
+
+# Operations that can be moved out of a Span or Group without changing how they render. LineBreak is not one of them,
+# as it renders differently depending on its parent.
+INLINE = (Text, Bold, Italic, UnderLine, Span, HyperLink, InlineCode)
+
+
+def coalesce_text_runs(tokens):
+    """
+    Reduce the number of operations, and so COM calls, needed to render runs of text: Span and Group operations that
+    have no formatting and only contain inline operations are replaced by their children, and adjacent Text operations
+    are merged into one. Parents must already be set.
+    :return: The number of operations removed
+    """
+    removed = 0
+    # Children are coalesced before their parents, so wrappers that are flattened already contain merged text
+    stack = [(tokens, False)]
+
+    while stack:
+        operation, children_done = stack.pop()
+
+        if not children_done:
+            stack.append((operation, True))
+            stack.extend((child, False) for child in operation.children if child.children)
+            continue
+
+        removed += _coalesce_children(operation)
+
+    return removed
+
+
+def _is_flattenable(operation, parent):
+    if not isinstance(operation, (Span, Group)) or operation.id is not None:
+        return False
+
+    if _has_format(operation):
+        return False
+
+    # The root Group is never flattened into, its children are rendered as blocks
+    if isinstance(parent, Group) and parent.is_root_group:
+        return False
+
+    return all(isinstance(child, INLINE) and parent.is_child_allowed(child) for child in operation.children)
+
+
+def _has_format(operation):
+    return operation.format is not None and operation.format.has_format()
+
+
+def _coalesce_children(parent):
+    removed = 0
+    children = []
+
+    for child in parent.children:
+        if _is_flattenable(child, parent):
+            removed += 1
+            for grandchild in child.children:
+                grandchild.set_parent(parent)
+            new_children = child.children
+        else:
+            new_children = [child]
+
+        for new_child in new_children:
+            previous = children[-1] if children else None
+
+            if isinstance(new_child, Text) and isinstance(previous, Text) \
+                    and not _has_format(previous) and not _has_format(new_child):
+                previous.text += new_child.text
+                removed += 1
+            else:
+                children.append(new_child)
+
+    parent.children = children
+    return removed
@@ -12,33 +12,49 @@ def correct_whitespace(tokens):
 
 
 def remove_paragraph_whitespace(parent_token: Operation):
-    for token in list(parent_token):
+    stack = list(reversed(parent_token.children))
+
+    while stack:
+        token = stack.pop()
+
         if isinstance(token, Paragraph):
             _inner_remove_paragraph_whitespace(token)
         else:
-            remove_paragraph_whitespace(token)
+            stack.extend(reversed(token.children))
 
 
 def _inner_remove_paragraph_whitespace(parent_operation):
-    if isinstance(parent_operation, Text):
-        if parent_operation.text.startswith(" "):
-            parent_operation.text = parent_operation.text.lstrip()
-    elif not parent_operation.has_children:
-        return
-    else:
-        target = parent_operation[0]
-        _inner_remove_paragraph_whitespace(target)
+    # Follow the first child down to the first Text
+    while not isinstance(parent_operation, Text):
+        if not parent_operation.has_children:
+            return
+
+        parent_operation = parent_operation[0]
+
+    if parent_operation.text.startswith(" "):
+        parent_operation.text = parent_operation.text.lstrip()
 
 
 def remove_arbitrary_newlines(parent_token: Operation):
-    for token in list(parent_token):
-        if isinstance(token, Text):
-            if token.text.isspace() and not token.has_parent(Paragraph):
-                parent_token.remove_child(token)
+    # Whether each operation is inside a Paragraph is tracked on the stack, rather than walking up through the
+    # ancestors of every Text
+    in_paragraph = isinstance(parent_token, Paragraph) or parent_token.has_parent(Paragraph)
+    stack = [(parent_token, in_paragraph)]
+
+    while stack:
+        parent_token, in_paragraph = stack.pop()
+        nested = []
+
+        for token in list(parent_token):
+            if isinstance(token, Text):
+                if token.text.isspace() and not in_paragraph:
+                    parent_token.remove_child(token)
+                else:
+                    token.text = _COLLAPSE_REGEX.sub(' ', token.text)
+            elif isinstance(token, CodeBlock):
+                # Ignore CodeBlocks
+                continue
             else:
-                token.text = _COLLAPSE_REGEX.sub(' ', token.text)
-        elif isinstance(token, CodeBlock):
-            # Ignore CodeBlocks
-            continue
-        else:
-            remove_arbitrary_newlines(token)
+                nested.append((token, in_paragraph or isinstance(token, Paragraph)))
+
+        stack.extend(reversed(nested))
@@ -1,20 +1,24 @@
+import codecs
 import re
 from collections import defaultdict
 from functools import partial
 
 import bs4
 import cssutils
+from bs4.dammit import EncodingDetector
 
-from wordinserter.parsers.fixes import (correct_whitespace,
+from wordinserter.parsers.fixes import (coalesce_text_runs,
+                                        correct_whitespace,
                                         normalize_list_elements,
                                         normalize_table_colspans)
 
-from . import BaseParser
+from . import SKIPPED_ELEMENTS, SOURCE_MODES, BaseParser, BuildState
 from ..operations import (Bold, BulletList, CodeBlock, Footnote, Format, Group,
                           Heading, HyperLink, IgnoredOperation, Image, Italic,
                           LineBreak, ListElement, NumberedList, Paragraph,
-                          Span, Style, Table, TableBody, TableCell, TableHead,
-                          TableRow, Text, UnderLine)
+                          SourceLocator, Span, Style, Table, TableBody,
+                          TableCell, TableHead, TableRow, Text, UnderLine)
+from ..profiling import record
 
 _COLLAPSE_REGEX = re.compile(r'\s+')
 
@@ -54,55 +58,202 @@ MAPPING = {
     "br": LineBreak
 }
 
+# How many bytes of a file-like input are read and fed to lxml at a time, and how many are read first to detect the
+# encoding from
+CHUNK_SIZE = 1024 * 1024
+ENCODING_DETECTION_SIZE = 64 * 1024
+
+
+def detect_encoding(data):
+    """
+    Detect the encoding of the start of an HTML document from its byte order mark or a <meta> or XML declaration.
+    Otherwise it is UTF-8, if the data decodes as UTF-8, or Windows-1252.
+    :return: A (data without any byte order mark, encoding) tuple
+    """
+    data, encoding = EncodingDetector.strip_byte_order_mark(data)
+    if encoding is not None:
+        return data, encoding
+
+    encoding = EncodingDetector.find_declared_encoding(data, is_html=True)
+    if encoding is not None:
+        try:
+            return data, codecs.lookup(encoding).name
+        except LookupError:
+            pass
+
+    try:
+        # The chunk may end part way through a character
+        codecs.getincrementaldecoder("utf-8")().decode(data, final=False)
+    except UnicodeDecodeError:
+        return data, "windows-1252"
+
+    return data, "utf-8"
+
+
+def soup_from_stream(stream, chunk_size=CHUNK_SIZE):
+    """
+    Build a BeautifulSoup tree from a binary file-like object (an open file, a mmap, stdin's buffer), feeding it to
+    lxml a chunk at a time. Unlike `BeautifulSoup(stream.read())` the whole input is never held in memory as bytes or
+    as a decoded string.
+    """
+    soup = bs4.BeautifulSoup("", "lxml")
+    data = stream.read(max(chunk_size, ENCODING_DETECTION_SIZE))
+    if not data:
+        return soup
+
+    data, encoding = detect_encoding(data)
+
+    builder = soup.builder
+    builder.initialize_soup(soup)
+    soup.reset()
+    builder.reset()
+    builder.parser = builder.parser_for(encoding)
+    soup.original_encoding = encoding
+
+    try:
+        while data:
+            builder.parser.feed(data)
+            data = stream.read(chunk_size)
+        builder.parser.close()
+    except (UnicodeDecodeError, LookupError) as e:
+        raise bs4.ParserRejectedMarkup(e)
+
+    # Close out any unfinished strings and open tags, as BeautifulSoup does once it has fed all its markup
+    soup.endData()
+    while soup.currentTag is not None and soup.currentTag.name != soup.ROOT_TAG_NAME:
+        soup.popTag()
+
+    builder.soup = None
+    return soup
+
 
 class HTMLParser(BaseParser):
-    def parse(self, content, stylesheets=None):
-        parser = bs4.BeautifulSoup(content, "lxml")
+    def parse(self, content, stylesheets=None, source="locator", profiler=None, skip_elements=SKIPPED_ELEMENTS):
+        """
+        :param content: The markup as a string, as bytes or as a binary file-like object, which is read in chunks
+        :param skip_elements: Names of elements that are dropped along with everything inside them
+        """
+        if source not in SOURCE_MODES:
+            raise RuntimeError("Unknown source mode {0}".format(source))
+
+        state = BuildState(source, skip_elements, count_skipped=profiler is not None)
+
+        with record(profiler, "parser", "parse"):
+            with record(profiler, "parser", "bs4"):
+                if hasattr(content, "read"):
+                    parser = soup_from_stream(content)
+                else:
+                    parser = bs4.BeautifulSoup(content, "lxml")
+
+            if stylesheets:
+                with record(profiler, "parser", "css"):
+                    self.apply_stylesheets(parser, stylesheets)
+
+            with record(profiler, "parser", "build"):
+                tokens = []
 
-        if stylesheets:
-            # Iterate through each stylesheet, and each rule within each sheet, and apply the relevant styles as
-            # inline-styles.
-            docs = (cssutils.parseString(css_content) for css_content in stylesheets if css_content)
-            for doc in docs:
-                for rule in (rule for rule in doc.cssRules if rule.typeString == 'STYLE_RULE'):
-                    rule_styles = dict(rule.style)
-                    for selector in rule.selectorList:
-                        elements = parser.select(selector.selectorText)
-                        for element in elements:
-                            style = cssutils.parseStyle(element.attrs.get("style", ""))
-                            element_style = dict(style)
-                            element_style.update(rule_styles)
-                            for key, value in element_style.items():
-                                style[key] = value
-                            element.attrs["style"] = style.getCssText(" ")
+                for element in parser.childGenerator():
+                    item = self.build_element(element, state)
 
-        tokens = []
+                    if item is None:
+                        continue
+
+                    tokens.append(item)
 
-        for element in parser.childGenerator():
-            item = self.build_element(element)
+                tokens = Group(tokens)
 
-            if item is None:
-                continue
+                if profiler is not None:
+                    profiler.add_count("skip_elements.skipped", state.skipped_nodes)
 
-            tokens.append(item)
+            with record(profiler, "parser", "normalize_list_elements"):
+                normalize_list_elements(tokens)
 
-        tokens = Group(tokens)
-        normalize_list_elements(tokens)
+            with record(profiler, "parser", "set_parents"):
+                tokens.set_parents()
 
-        tokens.set_parents()
-        correct_whitespace(tokens)
+            with record(profiler, "parser", "correct_whitespace"):
+                correct_whitespace(tokens)
 
-        normalize_table_colspans(tokens)
+            with record(profiler, "parser", "normalize_table_colspans"):
+                normalize_table_colspans(tokens)
+
+            with record(profiler, "parser", "coalesce_text_runs"):
+                removed = coalesce_text_runs(tokens)
+                if profiler is not None:
+                    profiler.add_count("coalesce_text_runs.removed", removed)
 
         return tokens
 
-    def build_element(self, element):
+    def apply_stylesheets(self, parser, stylesheets):
+        # Iterate through each stylesheet, and each rule within each sheet, and apply the relevant styles as
+        # inline-styles.
+        docs = (cssutils.parseString(css_content) for css_content in stylesheets if css_content)
+        for doc in docs:
+            for rule in (rule for rule in doc.cssRules if rule.typeString == 'STYLE_RULE'):
+                rule_styles = dict(rule.style)
+                for selector in rule.selectorList:
+                    elements = parser.select(selector.selectorText)
+                    for element in elements:
+                        style = cssutils.parseStyle(element.attrs.get("style", ""))
+                        element_style = dict(style)
+                        element_style.update(rule_styles)
+                        for key, value in element_style.items():
+                            style[key] = value
+                        element.attrs["style"] = style.getCssText(" ")
+
+    def build_element(self, element, state=None):
+        """
+        Build the operation for an element and all of its descendants. The tree is walked with an explicit stack of
+        open elements rather than by recursion, so deeply nested markup doesn't hit the recursion limit.
+        :param state: The BuildState of the document the element is in, a new one by default
+        :return: The operation, or None if the element doesn't produce one
+        """
+        if state is None:
+            state = BuildState()
+
+        if not isinstance(element, bs4.Tag):
+            return self._build_string(element)
+
+        if element.name in state.skip_elements:
+            self._skip_element(element, state)
+            return None
+
+        # Each frame is an element, its operation, its inline style and an iterator over its remaining children
+        stack = [self._open_element(element, state)]
+
+        while True:
+            element, instance, element_style, children = stack[-1]
+
+            for child in children:
+                if isinstance(child, bs4.Tag):
+                    if child.name in state.skip_elements:
+                        self._skip_element(child, state)
+                        continue
+
+                    stack.append(self._open_element(child, state))
+                    break
+
+                self._add_built_child(instance, self._build_string(child))
+            else:
+                stack.pop()
+                item = self._close_element(element, instance, element_style, state)
+
+                if not stack:
+                    return item
+
+                self._add_built_child(stack[-1][1], item)
+
+    def _skip_element(self, element, state):
+        if state.skipped_nodes is not None:
+            state.skipped_nodes += 1 + sum(1 for _ in element.descendants)
+
+    def _build_string(self, element):
         if isinstance(element, bs4.Comment):
             return None
 
-        if isinstance(element, bs4.NavigableString):
-            return Text(text=str(element))
+        return Text(text=str(element))
 
+    def _open_element(self, element, state):
         cls = MAPPING.get(element.name, IgnoredOperation)
 
         style_attr = element.attrs.get('style')
@@ -156,31 +307,48 @@ class HTMLParser(BaseParser):
 
         instance = cls(attributes=element.attrs)
 
-        for idx, child in enumerate(element.children):
-            item = self.build_element(child)
-            if item is None:
-                continue
+        if isinstance(instance, Image):
+            instance.share_data_uri(state.data_uris)
 
-            if isinstance(item, IgnoredOperation):
-                instance.add_children(item.children)
-            else:
-                self.recursively_add_children(instance, item)
+        return element, instance, element_style, iter(element.children)
 
+    def _close_element(self, element, instance, element_style, state):
         if instance.requires_children and not instance.children:
             return None
 
         instance.format = self._build_format(element, element_style)
-        instance.set_source(element)
+
+        if state.source_mode == "locator":
+            # Read from the instance: older bs4 versions only set these when the builder tracks positions, and a
+            # missing attribute falls back to find(), searching every descendant of the element.
+            positions = vars(element)
+            instance.set_source(SourceLocator(element.name, positions.get("sourceline"), positions.get("sourcepos")))
+        elif state.source_mode == "element":
+            instance.set_source(element)
+
         return instance
 
+    def _add_built_child(self, instance, item):
+        if item is None:
+            return
+
+        if isinstance(item, IgnoredOperation):
+            instance.add_children(item.children)
+        else:
+            self.recursively_add_children(instance, item)
+
     def recursively_add_children(self, parent, child):
-        # If the direct child is not allowed then we recurse through the childs children until we
+        # If the direct child is not allowed then we go through the childs children until we
         # find a child we can add.
-        if not parent.is_child_allowed(child):
-            for child in child.children:
-                self.recursively_add_children(parent, child)
-        else:
-            parent.add_child(child)
+        stack = [child]
+
+        while stack:
+            child = stack.pop()
+
+            if parent.is_child_allowed(child):
+                parent.add_child(child)
+            else:
+                stack.extend(reversed(child.children))
 
     def _build_format(self, element, style):
         args = {}
@@ -1,96 +1,212 @@
-from . import BaseParser, ParseException
-from ..operations import (BaseList, Bold, BulletList, CodeBlock, Format, Group,
-                          HyperLink, IgnoredOperation, Image, InlineCode,
-                          Italic, ListElement, NumberedList, Paragraph, Style,
-                          Table, TableCell, TableHead, TableRow, Text,
-                          UnderLine)
-from .html import HTMLParser
+from functools import partial
+
+from wordinserter.parsers.fixes import (coalesce_text_runs,
+                                        correct_whitespace,
+                                        normalize_list_elements,
+                                        normalize_table_colspans)
+
+from . import SOURCE_MODES, BaseParser, BuildState, ParseException
+from ..operations import (Bold, BulletList, CodeBlock, Format, Group, Heading,
+                          HyperLink, Image, InlineCode, Italic, LineBreak,
+                          ListElement, NumberedList, Paragraph, SourceLocator,
+                          Span, Table, TableCell, TableRow, Text)
+from ..profiling import record
+
+try:
+    from markdown_it import MarkdownIt
+except ImportError:  # pragma: no cover
+    MarkdownIt = None
+
+# Tokens that open an operation, keyed by markdown-it token type without the "_open" suffix
+MAPPING = {
+    "paragraph": Paragraph,
+    "heading": Heading,
+    "bullet_list": BulletList,
+    "ordered_list": NumberedList,
+    "list_item": ListElement,
+    "blockquote": Group,
+
+    "table": partial(Table, border="1"),
+    "tr": TableRow,
+    "th": partial(TableCell, colspan=1, rowspan=1),
+    "td": partial(TableCell, colspan=1, rowspan=1),
+
+    "em": Italic,
+    "strong": Bold,
+    "s": Span,
+    "link": HyperLink,
+}
+
+# Tokens whose content is added directly to the enclosing operation, like the IgnoredOperations the HTMLParser makes
+# for <thead> and <tbody>
+FLATTENED = {"thead_open", "tbody_open"}
 
 
 class MarkdownParser(BaseParser):
+    """
+    Parses CommonMark (plus tables and strikethrough) into operations using markdown-it-py's token stream, without
+    going through HTML. Raw HTML blocks in the document are handed to the HTMLParser, inline HTML is dropped.
+    """
     def __init__(self):
-        raise RuntimeError("Markdown is not supported at this time. Blame the CommonMark Library")
-        self.html_parser = HTMLParser()
-
-    def parse(self, content):
-        p = CommonMark.Parser()
-        ast = p.parse(content)
-
-        returner = []
-
-        import sys
-        sys.stdout.flush()
-
-        for obj in ast.children:
-            result = self._parse_node(obj)
-
-            if result is None:
-                continue
-
-            returner.append(result)
-
-        return returner
-
-    def _parse_node(self, node):
-
-        children = node.children + node.inline_content
-
-        if node.t in ("ATXHeader", "SetextHeader"):
-            obj = Style(name="Heading {0}".format(node.level))
-        elif node.t == "Paragraph":
-            obj = Paragraph()
-        elif node.t == "Str":
-            obj = Text(text=node.c)
-        elif node.t in ("Softbreak", "Hardbreak"):
-            obj = Text(text=" ")
-        elif node.t == "Emph":
-            obj = Italic()
-        elif node.t == "Strong":
-            obj = Bold()
-        elif node.t == "Image":
-            caption = node.label[0].c if len(node.label) else ""
-            obj = Image(location=node.destination, caption=caption)
-        elif node.t == "HtmlBlock":
-            # Special case. Parse the HTML into instructions
-            instructions = self.html_parser.parse(node.string_content)
-
-            if not instructions:
-                obj = IgnoredOperation()
-            elif len(instructions) == 1:
-                # Only contains one instruction, carry on as normal
-                return instructions[0]
+        if MarkdownIt is None:
+            raise ParseException("Markdown support requires markdown-it-py: pip install wordinserter[markdown]")
+
+        self.markdown = MarkdownIt("commonmark").enable(["table", "strikethrough"])
+        self._html_parser = None
+
+    @property
+    def html_parser(self):
+        # Only documents with raw HTML blocks need BeautifulSoup
+        if self._html_parser is None:
+            from .html import HTMLParser
+            self._html_parser = HTMLParser()
+
+        return self._html_parser
+
+    def parse(self, content, source="locator", profiler=None):
+        if source not in SOURCE_MODES:
+            raise RuntimeError("Unknown source mode {0}".format(source))
+
+        state = BuildState(source)
+
+        with record(profiler, "parser", "parse"):
+            with record(profiler, "parser", "markdown"):
+                tokens = self.markdown.parse(content)
+
+            with record(profiler, "parser", "build"):
+                operations = Group(self.build_tokens(tokens, state))
+                operations.format = Format()
+
+            with record(profiler, "parser", "normalize_list_elements"):
+                normalize_list_elements(operations)
+
+            with record(profiler, "parser", "set_parents"):
+                operations.set_parents()
+
+            with record(profiler, "parser", "correct_whitespace"):
+                correct_whitespace(operations)
+
+            with record(profiler, "parser", "normalize_table_colspans"):
+                normalize_table_colspans(operations)
+
+            with record(profiler, "parser", "coalesce_text_runs"):
+                removed = coalesce_text_runs(operations)
+                if profiler is not None:
+                    profiler.add_count("coalesce_text_runs.removed", removed)
+
+        return operations
+
+    def build_tokens(self, tokens, state=None):
+        """
+        Turn a flat list of markdown-it tokens into a list of operations. Opening tokens push a new operation that
+        following tokens are added to, until the matching closing token.
+        :param state: The BuildState of the document the tokens are in, a new one by default
+        """
+        if state is None:
+            state = BuildState()
+
+        root = Group()
+        stack = [root]
+
+        for token in tokens:
+            if token.nesting == -1:
+                stack.pop()
+            elif token.nesting == 1:
+                if token.hidden or token.type in FLATTENED:
+                    # Paragraphs in tight lists are hidden, their content belongs directly to the list element
+                    stack.append(stack[-1])
+                else:
+                    operation = self.build_container(token, state)
+                    self.add_child(stack[-1], operation)
+                    stack.append(operation)
+            elif token.type == "inline":
+                for child in self.build_tokens(token.children, state):
+                    self.add_child(stack[-1], child)
+            elif token.type == "html_block":
+                # Raw HTML is parsed by the HTMLParser, which returns a Group
+                for child in self.html_parser.parse(token.content, source=state.source_mode).children:
+                    self.add_child(stack[-1], child)
             else:
-                # Lots of instructions. Return a group
-                return Group(instructions)
-        elif node.t == "List":
-            obj = BulletList() if node.list_data["type"] == "Bullet" else NumberedList()
-        elif node.t == "ListItem":
-            obj = ListElement()
-        elif node.t == "Link":
-            obj = HyperLink(location=node.destination)
-            children.extend(node.label)
-        elif node.t in ("ReferenceDef", "HorizontalRule"):
-            # ToDo: handle markdown references
-            obj = IgnoredOperation()
-        elif node.t == "Code":
-            # Need an inline code object
-            obj = InlineCode([Text(text=node.c)])
-        elif node.t == "IndentedCode":
-            obj = CodeBlock([Text(text=node.string_content)])
+                operation = self.build_leaf(token, state)
+                if operation is not None:
+                    self.add_child(stack[-1], operation)
+
+        return root.children
+
+    def build_container(self, token, state):
+        name = token.type[:-len("_open")]
+        cls = MAPPING.get(name)
+        if cls is None:
+            raise ParseException("Cannot process token type {0}".format(token.type))
+
+        if cls is Heading:
+            operation = Heading(level=int(token.tag[1:]))
+        elif cls is HyperLink:
+            operation = HyperLink(location=token.attrGet("href"))
         else:
-            CommonMark.dumpAST(node)
-            raise ParseException("Cannot process node type {0}".format(node.t))
+            operation = cls()
+
+        operation.format = self.build_format(token)
+        self.set_source(operation, token, state)
+        return operation
+
+    def build_leaf(self, token, state):
+        if token.type == "text":
+            operation = Text(text=token.content)
+        elif token.type == "softbreak":
+            operation = Text(text=" ")
+        elif token.type == "hardbreak":
+            operation = LineBreak()
+        elif token.type == "code_inline":
+            operation = InlineCode(Text(text=token.content))
+        elif token.type in ("fence", "code_block"):
+            text = token.content[:-1] if token.content.endswith("\n") else token.content
+            highlight = token.info.split()[0] if token.info.strip() else None
+            operation = CodeBlock(Text(text=text), highlight=highlight, text=text)
+        elif token.type == "image":
+            caption = "".join(child.content for child in token.children or [])
+            operation = Image(location=token.attrGet("src"), caption=caption or None)
+            operation.share_data_uri(state.data_uris)
+        elif token.type in ("hr", "html_inline"):
+            return None
+        else:
+            raise ParseException("Cannot process token type {0}".format(token.type))
+
+        if not isinstance(operation, Text):
+            operation.format = Format()
+            self.set_source(operation, token, state)
+
+        return operation
+
+    def build_format(self, token):
+        args = {}
 
-        if isinstance(node.c, list):
-            children = children + node.c
+        if token.type == "s_open":
+            args["text_decoration"] = "line-through"
 
-        for child in children:
-            result = self._parse_node(child)
+        # Table cells are aligned with an inline style, e.g. "text-align:right"
+        style = token.attrGet("style")
+        if style and style.startswith("text-align:"):
+            args["text_align"] = style[len("text-align:"):]
 
-            if result is None:
-                continue
+        return Format(**args)
 
-            obj.add_child(result)
+    def set_source(self, operation, token, state):
+        if state.source_mode == "locator":
+            line = token.map[0] + 1 if token.map else None
+            operation.set_source(SourceLocator(token.tag or token.type, line, None))
+        elif state.source_mode == "element":
+            operation.set_source(token)
 
-        obj.set_source(node)
-        return obj
+    def add_child(self, parent, child):
+        # Same as HTMLParser.recursively_add_children, children that are not allowed (formatting inside a heading,
+        # for example) are replaced by their own children.
+        stack = [child]
+
+        while stack:
+            child = stack.pop()
+
+            if parent.is_child_allowed(child):
+                parent.add_child(child)
+            else:
+                stack.extend(reversed(child.children))
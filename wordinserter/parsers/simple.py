@@ -0,0 +1,253 @@
+import html
+import re
+from bisect import bisect_right
+from functools import partial
+
+from wordinserter.parsers.fixes import coalesce_text_runs, normalize_list_elements
+
+from . import SKIPPED_ELEMENTS, SOURCE_MODES, BaseParser
+from ..operations import (Bold, BulletList, Format, Group, Italic, LineBreak,
+                          ListElement, NumberedList, Paragraph, SourceLocator,
+                          Table, TableCell, TableRow, Text, UnderLine)
+from ..profiling import record
+
+_TAG_REGEX = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)\s*(/?)>")
+_COLLAPSE_REGEX = re.compile(r"\s+")
+HTML_WHITESPACE = " \t\n\r\f"
+
+INLINE = {"b", "strong", "i", "em", "u", "br"}
+
+# The tags in the subset, and the tags each of them may contain. Anything else falls back to the HTMLParser, as do
+# structures that lxml would rearrange, like a list inside a paragraph or text directly inside a table.
+ALLOWED_CHILDREN = {
+    None: INLINE | {"p", "ul", "ol", "table"},
+    "p": INLINE,
+    "b": INLINE,
+    "strong": INLINE,
+    "i": INLINE,
+    "em": INLINE,
+    "u": INLINE,
+    "ul": {"li"},
+    "ol": {"li"},
+    "li": INLINE | {"p", "ul", "ol", "table"},
+    "table": {"thead", "tbody", "tr"},
+    "thead": {"tr"},
+    "tbody": {"tr"},
+    "tr": {"td", "th"},
+    "td": INLINE | {"p", "ul", "ol", "table"},
+    "th": INLINE | {"p", "ul", "ol", "table"},
+}
+
+# Every tag the subset handles
+TAGS = frozenset(name for names in ALLOWED_CHILDREN.values() for name in names)
+
+# Elements that can't contain text other than whitespace
+NO_TEXT = {"ul", "ol", "table", "thead", "tbody", "tr"}
+
+MAPPING = {
+    "p": Paragraph,
+    "b": Bold,
+    "strong": Bold,
+    "i": Italic,
+    "em": Italic,
+    "u": UnderLine,
+    "ul": BulletList,
+    "ol": NumberedList,
+    "li": ListElement,
+    "table": partial(Table, border="1"),
+    "tr": TableRow,
+    "td": partial(TableCell, colspan=1, rowspan=1),
+    "th": partial(TableCell, colspan=1, rowspan=1),
+}
+
+# Like the IgnoredOperations the HTMLParser builds for them, their children are added to the enclosing table
+FLATTENED = {"thead", "tbody"}
+
+
+class Unsupported(Exception):
+    """
+    Raised by the tokenizer when the input uses something outside of the subset the SimpleParser handles
+    """
+
+
+class SimpleParser(BaseParser):
+    """
+    A fast parser for a small, trusted subset of HTML: paragraphs, b/strong/i/em/u, br, lists and tables, with no
+    attributes, comments or CSS. The markup is tokenized by hand without building a DOM, and produces the same
+    operations as the HTMLParser. Any input outside of the subset is parsed with the HTMLParser instead.
+    """
+
+    def parse(self, content, stylesheets=None, source="locator", profiler=None, skip_elements=SKIPPED_ELEMENTS):
+        if source not in SOURCE_MODES:
+            raise RuntimeError("Unknown source mode {0}".format(source))
+
+        if isinstance(content, bytes):
+            content = content.decode("utf8")
+
+        # Stylesheets need CSS selectors, and "element" sources need the parsed elements, which only the HTMLParser has.
+        # None of the elements skipped by default are in the subset, but skipping one that is needs the HTMLParser too.
+        if stylesheets or source == "element" or not TAGS.isdisjoint(skip_elements):
+            return self.fallback(content, stylesheets, source, profiler, skip_elements)
+
+        with record(profiler, "parser", "parse"):
+            try:
+                with record(profiler, "parser", "tokenize"):
+                    tokens, has_lists = self.tokenize(content, source)
+            except Unsupported:
+                tokens = None
+
+            if tokens is not None:
+                if has_lists:
+                    with record(profiler, "parser", "normalize_list_elements"):
+                        normalize_list_elements(tokens)
+
+                # Whitespace is corrected while tokenizing, so correct_whitespace isn't needed
+                with record(profiler, "parser", "set_parents"):
+                    tokens.set_parents()
+
+                with record(profiler, "parser", "coalesce_text_runs"):
+                    removed = coalesce_text_runs(tokens)
+                    if profiler is not None:
+                        profiler.add_count("coalesce_text_runs.removed", removed)
+
+                return tokens
+
+        return self.fallback(content, stylesheets, source, profiler, skip_elements)
+
+    def fallback(self, content, stylesheets, source, profiler, skip_elements=SKIPPED_ELEMENTS):
+        from .html import HTMLParser
+
+        return HTMLParser().parse(content, stylesheets=stylesheets, source=source, profiler=profiler,
+                                  skip_elements=skip_elements)
+
+    def tokenize(self, content, source="locator"):
+        """
+        :return: A (tokens, has_lists) tuple. tokens is a Group holding the <html> element the HTMLParser would wrap
+                 everything in, or nothing if the document is only whitespace.
+        :raises Unsupported: If the content can't be parsed by this parser.
+        """
+        # The offset each line starts at, to give operations a SourceLocator
+        line_starts = None
+        if source == "locator":
+            line_starts = [0] + [match.end() for match in re.finditer("\n", content)]
+
+        document = Group()
+        self.add(None, document, "html", 0, line_starts)
+
+        stack = [(None, document)]
+        has_lists = False
+        paragraphs = 0
+        # The ids of list elements that had whitespace dropped from them, see add_text
+        had_text = set()
+        position = 0
+
+        while True:
+            start = content.find("<", position)
+            text = content[position:] if start == -1 else content[position:start]
+
+            if "&" in text:
+                text = html.unescape(text)
+
+            if position == 0:
+                # lxml drops the whitespace at the start of the document, including character references to whitespace,
+                # but not other characters str.strip() would. It doesn't create an <html> element if that is everything.
+                text = text.lstrip(HTML_WHITESPACE)
+                if not text and start == -1:
+                    return Group(), False
+
+            if text:
+                self.add_text(stack, text, paragraphs > 0, had_text)
+
+            if start == -1:
+                break
+
+            match = _TAG_REGEX.match(content, start)
+            if match is None:
+                raise Unsupported()
+
+            closing, name, self_closing = match.groups()
+            name = name.lower()
+            position = match.end()
+
+            if closing:
+                if self_closing or name == "br" or stack[-1][0] != name:
+                    raise Unsupported()
+                self.close(stack, had_text)
+                paragraphs -= name == "p"
+                continue
+
+            if name not in ALLOWED_CHILDREN[stack[-1][0]]:
+                raise Unsupported()
+
+            if name == "br":
+                self.add(stack[-1][1], LineBreak(), name, start, line_starts)
+                continue
+
+            if self_closing:
+                raise Unsupported()
+
+            has_lists = has_lists or name in ("ul", "ol")
+            paragraphs += name == "p"
+
+            if name in FLATTENED:
+                stack.append((name, stack[-1][1]))
+            else:
+                operation = MAPPING[name]()
+                self.add(None, operation, name, start, line_starts)
+                stack.append((name, operation))
+
+        if len(stack) != 1:
+            raise Unsupported()
+
+        return Group([document]), has_lists
+
+    def add_text(self, stack, text, in_paragraph, had_text):
+        name, parent = stack[-1]
+
+        if name in NO_TEXT:
+            if not text.isspace():
+                raise Unsupported()
+            return
+
+        # The same as correct_whitespace: whitespace outside of paragraphs is dropped and runs of whitespace are
+        # collapsed to a single space.
+        if text.isspace() and not in_paragraph:
+            # The HTMLParser only removes it after building, so a list element that had it isn't dropped as empty
+            if parent.requires_children:
+                had_text.add(id(parent))
+            return
+
+        parent.add_child(Text(text=_COLLAPSE_REGEX.sub(" ", text)))
+
+    def close(self, stack, had_text):
+        name, operation = stack.pop()
+
+        if name in FLATTENED:
+            return
+
+        if name == "table" and not operation.children:
+            raise Unsupported()
+
+        if name == "p":
+            # Also like correct_whitespace, strip the whitespace at the start of a paragraph
+            first = operation
+            while first.children:
+                first = first.children[0]
+            if isinstance(first, Text):
+                first.text = first.text.lstrip()
+
+        # Empty lists and list elements are dropped, as they are by the HTMLParser
+        if operation.requires_children and not operation.children and id(operation) not in had_text:
+            return
+
+        stack[-1][1].add_child(operation)
+
+    def add(self, parent, operation, name, position, line_starts):
+        operation.format = Format()
+
+        if line_starts is not None:
+            line = bisect_right(line_starts, position)
+            operation.set_source(SourceLocator(name, line, position - line_starts[line - 1]))
+
+        if parent is not None:
+            parent.add_child(operation)
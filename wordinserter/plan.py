@@ -0,0 +1,179 @@
+"""
+Render plans: an operation tree compiled into a flat list of instructions.
+
+A plan lists what a renderer will do, in order: enter an operation (start a paragraph, turn bold on, start a table
+with its dimensions), emit an operation without children (type some text, insert an image) and exit an operation.
+Instructions only hold plain data describing each operation, so a plan can be printed, compared or diffed against the
+plan of another document, pickled and cached. A plan describes a render, it isn't run by the renderers.
+
+    plan = compile_plan(operations)
+    print(plan)
+    print("\\n".join(diff_plans(plan, compile_plan(other_operations))))
+    print(count_com_calls(operations, plan))
+"""
+import difflib
+import hashlib
+from collections import namedtuple
+
+from .incremental import _freeze
+from .operations import ChildlessOperation, Table
+
+ENTER, EXIT, EMIT = "enter", "exit", "emit"
+
+# `index` is the position of the operation in render order, see `plan_operations`
+Instruction = namedtuple("Instruction", ["opcode", "index", "name", "args"])
+
+
+def walk(operations):
+    """
+    Yield (opcode, operation) pairs for each of `operations` and their descendants, in the order they are rendered.
+    Like the render loop, `operations` is iterated, so passing a Group yields its children and not the Group itself.
+    """
+    stack = [(None, iter(operations))]
+
+    while stack:
+        parent, children = stack[-1]
+
+        for operation in children:
+            if isinstance(operation, ChildlessOperation):
+                yield EMIT, operation
+            else:
+                yield ENTER, operation
+                stack.append((operation, iter(operation.children)))
+                break
+        else:
+            stack.pop()
+            if parent is not None:
+                yield EXIT, parent
+
+
+def plan_operations(operations):
+    """
+    :return: Every operation that is rendered, in render order. An instruction's `index` is a position in this list.
+    """
+    return [operation for opcode, operation in walk(operations) if opcode != EXIT]
+
+
+def describe(operation):
+    """
+    :return: The arguments of an operation as a tuple of (name, value) pairs, with its format properties prefixed
+             by "format."
+    """
+    args = []
+
+    if operation.id is not None:
+        args.append(("id", operation.id))
+
+    if isinstance(operation, Table):
+        rows, columns = operation.dimensions
+        args.extend((("rows", rows), ("columns", columns)))
+
+    for name in sorted(operation.requires | operation.optional):
+        value = getattr(operation, name, None)
+        if value is not None:
+            args.append((name, _freeze(value)))
+
+    if operation.format is not None and operation.format.has_format():
+        for name in sorted(operation.format.optional):
+            value = getattr(operation.format, name, None)
+            if value:
+                args.append(("format." + name, _freeze(value)))
+
+    return tuple(args)
+
+
+def compile_plan(operations):
+    """
+    Compile `operations` into a RenderPlan
+    """
+    instructions = []
+    # The index of each operation that has been entered and not exited yet
+    open_indexes = []
+    index = 0
+
+    for opcode, operation in walk(operations):
+        name = operation.__class__.__name__
+
+        if opcode == EXIT:
+            instructions.append(Instruction(EXIT, open_indexes.pop(), name, ()))
+            continue
+
+        if opcode == ENTER:
+            open_indexes.append(index)
+
+        instructions.append(Instruction(opcode, index, name, describe(operation)))
+        index += 1
+
+    return RenderPlan(instructions)
+
+
+class RenderPlan(object):
+    """
+    A compiled list of render instructions. Plans of structurally identical documents are equal and have the same
+    digest.
+    """
+    def __init__(self, instructions):
+        self.instructions = tuple(instructions)
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def __iter__(self):
+        return iter(self.instructions)
+
+    def __eq__(self, other):
+        return isinstance(other, RenderPlan) and self.instructions == other.instructions
+
+    def __hash__(self):
+        return hash(self.instructions)
+
+    @property
+    def digest(self):
+        return hashlib.sha1(repr(self.instructions).encode("utf8")).hexdigest()
+
+    def lines(self):
+        """
+        :return: Each instruction as a line of text, indented by its depth
+        """
+        lines = []
+        depth = 0
+
+        for instruction in self.instructions:
+            if instruction.opcode == EXIT:
+                depth -= 1
+
+            args = " ".join("{0}={1!r}".format(name, value) for name, value in instruction.args)
+            lines.append(("  " * depth + "{0} {1} {2}".format(instruction.opcode, instruction.name, args)).rstrip())
+
+            if instruction.opcode == ENTER:
+                depth += 1
+
+        return lines
+
+    def __str__(self):
+        return "\n".join(self.lines())
+
+    def __repr__(self):
+        return "<RenderPlan: {0} instructions>".format(len(self.instructions))
+
+
+def diff_plans(old, new):
+    """
+    :return: The lines of a unified diff between two plans
+    """
+    return list(difflib.unified_diff(old.lines(), new.lines(), "old", "new", lineterm=""))
+
+
+def count_com_calls(operations, **kwargs):
+    """
+    Count the COM calls the COMRenderer makes to render `operations`, by rendering them into a FakeDocument instead
+    of Word. Keyword arguments are passed to the COMRenderer.
+    """
+    from .profiling import Profiler
+    from .renderers.com import COMRenderer
+    from .renderers.fake import FakeConstants, FakeDocument
+
+    profiler = Profiler()
+    renderer = COMRenderer(FakeDocument(), FakeConstants(), profiler=profiler, **kwargs)
+    renderer.render(operations)
+    return profiler.com_calls
@@ -0,0 +1,239 @@
+"""
+Structured profiling for parsing and rendering.
+
+Pass a `Profiler` to `parse()` and `insert()` to record how long each parser phase, operation type and render method
+took and how many COM calls each of them made:
+
+    profiler = Profiler()
+    operations = parse(html, profiler=profiler)
+    insert(operations, document=document, constants=constants, profiler=profiler)
+
+    profiler.as_dict()
+    profiler.to_json()
+    profiler.write_flamegraph("profile.folded")
+
+Nothing is recorded, and the COM objects are not wrapped, if no profiler is given.
+"""
+import decimal
+import inspect
+import json
+import time
+from collections import OrderedDict
+
+_PRIMITIVES = (str, bytes, int, float, bool, type(None), decimal.Decimal, tuple, list)
+
+
+class Stat(object):
+    __slots__ = ("count", "time", "com_calls", "active")
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.com_calls = 0
+        # The number of frames for this stat currently running. Nested frames (a Group inside a Group) are only
+        # added to the totals once, when the outermost one finishes.
+        self.active = 0
+
+    def as_dict(self):
+        return {"count": self.count, "time": self.time, "com_calls": self.com_calls}
+
+
+class _Frame(object):
+    __slots__ = ("stat", "name", "start", "child_time", "com_calls")
+
+    def __init__(self, stat, name, com_calls):
+        self.stat = stat
+        self.name = name
+        self.child_time = 0.0
+        self.com_calls = com_calls
+        self.start = time.perf_counter()
+
+
+class _Record(object):
+    __slots__ = ("profiler", "category", "name")
+
+    def __init__(self, profiler, category, name):
+        self.profiler = profiler
+        self.category = category
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.start(self.category, self.name)
+
+    def __exit__(self, *args):
+        self.profiler.stop()
+
+
+class _NullRecord(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+_NULL_RECORD = _NullRecord()
+
+
+def record(profiler, category, name):
+    """
+    Return a context manager that records a block with `profiler`, or does nothing if `profiler` is None
+    """
+    if profiler is None:
+        return _NULL_RECORD
+    return _Record(profiler, category, name)
+
+
+class Profiler(object):
+    def __init__(self):
+        self.stats = OrderedDict()
+        self.counters = OrderedDict()
+        self.stacks = OrderedDict()
+        self.com_calls = 0
+        self._frames = []
+
+    def start(self, category, name, count=True):
+        """
+        Start timing a block. Blocks nest, and the time and COM calls of inner blocks are included in the outer ones.
+        :param count: Whether to increment the call count of this block. Work done in several parts (like a render
+                      method that runs before and after its children) should only count once.
+        """
+        key = (category, name)
+        stat = self.stats.get(key)
+        if stat is None:
+            stat = self.stats[key] = Stat()
+
+        if count:
+            stat.count += 1
+
+        stat.active += 1
+        self._frames.append(_Frame(stat, name, self.com_calls))
+
+    def stop(self):
+        frame = self._frames.pop()
+        elapsed = time.perf_counter() - frame.start
+
+        stat = frame.stat
+        stat.active -= 1
+        if not stat.active:
+            stat.time += elapsed
+            stat.com_calls += self.com_calls - frame.com_calls
+
+        stack = ";".join([f.name for f in self._frames] + [frame.name])
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + (elapsed - frame.child_time)
+
+        if self._frames:
+            self._frames[-1].child_time += elapsed
+
+    @property
+    def depth(self):
+        return len(self._frames)
+
+    def unwind(self, depth):
+        """
+        Stop every block started since the profiler was at `depth`, used when rendering is aborted by an error
+        """
+        while len(self._frames) > depth:
+            self.stop()
+
+    def record(self, category, name):
+        return _Record(self, category, name)
+
+    def add_count(self, name, value=1):
+        """
+        Add to a named counter, for things that are counted rather than timed (like operations removed by a fix)
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_com_call(self):
+        self.com_calls += 1
+
+    def wrap(self, com_object):
+        """
+        Wrap a COM object (usually a Document) so that every property access, property set and method call made
+        through it, or through any object reached from it, is counted.
+        """
+        return CountingProxy(com_object, self)
+
+    def as_dict(self):
+        result = OrderedDict()
+        for (category, name), stat in self.stats.items():
+            result.setdefault(category, OrderedDict())[name] = stat.as_dict()
+
+        result["counters"] = OrderedDict(self.counters)
+        result["com_calls"] = self.com_calls
+        return result
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def collapsed_stacks(self):
+        """
+        :return: Lines in the collapsed stack format used by flamegraph.pl and speedscope. Values are the time spent
+                 in each stack, excluding its children, in microseconds.
+        """
+        return ["{0} {1}".format(stack, int(round(seconds * 1000000))) for stack, seconds in self.stacks.items()]
+
+    def write_flamegraph(self, path):
+        with open(path, "w") as fd:
+            fd.write("\n".join(self.collapsed_stacks()) + "\n")
+
+
+def _unwrap(value):
+    return value._target if isinstance(value, CountingProxy) else value
+
+
+class CountingProxy(object):
+    """
+    Wraps a COM object and counts calls made through it. Reading a property counts as one call, as does setting a
+    property or calling a method (or a collection). Looking up a method in order to call it is not counted.
+    """
+    __slots__ = ("_target", "_profiler")
+
+    def __init__(self, target, profiler):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_profiler", profiler)
+
+    def _wrap(self, value):
+        if isinstance(value, _PRIMITIVES):
+            return value
+        return CountingProxy(value, self._profiler)
+
+    def __getattr__(self, item):
+        value = getattr(self._target, item)
+        if not (inspect.ismethod(value) or inspect.isbuiltin(value)):
+            self._profiler.count_com_call()
+        return self._wrap(value)
+
+    def __setattr__(self, key, value):
+        self._profiler.count_com_call()
+        setattr(self._target, key, _unwrap(value))
+
+    def __call__(self, *args, **kwargs):
+        self._profiler.count_com_call()
+        result = self._target(*[_unwrap(arg) for arg in args],
+                              **{key: _unwrap(value) for key, value in kwargs.items()})
+        return self._wrap(result)
+
+    def __iter__(self):
+        for item in self._target:
+            yield self._wrap(item)
+
+    def __len__(self):
+        self._profiler.count_com_call()
+        return len(self._target)
+
+    def __bool__(self):
+        return bool(self._target)
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return "<CountingProxy {0!r}>".format(self._target)
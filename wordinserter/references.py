@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+from .operations import Heading, HyperLink
+from .plan import EXIT, walk
+
+# Hyperlink locations that refer to a bookmark in the document: "#name" links to it, "!name" inserts a REF field
+CROSS_REFERENCE_PREFIXES = ("#", "!")
+
+
+class ReferenceIndex(object):
+    """
+    The bookmarks that rendering some operations will create (one for each Heading with an id) and the hyperlinks
+    that refer to bookmarks, so cross-references can be resolved before anything is rendered.
+    """
+    def __init__(self, operations):
+        self.bookmarks = OrderedDict()
+        self.references = OrderedDict()
+
+        for opcode, operation in walk(operations):
+            if opcode == EXIT:
+                continue
+
+            if isinstance(operation, Heading) and operation.id is not None:
+                self.bookmarks.setdefault(str(operation.id), operation)
+            elif isinstance(operation, HyperLink) and operation.location.startswith(CROSS_REFERENCE_PREFIXES):
+                self.references.setdefault(operation.location[1:], []).append(operation)
+
+    def resolve(self, location):
+        """
+        :return: The Heading a "#name" or "!name" location refers to, or None
+        """
+        if not location.startswith(CROSS_REFERENCE_PREFIXES):
+            return None
+
+        return self.bookmarks.get(location[1:])
+
+    def unresolved(self):
+        """
+        :return: The names of bookmarks that are referred to but not created by these operations
+        """
+        return [name for name in self.references if name not in self.bookmarks]
@@ -1,10 +1,12 @@
 import abc
+import importlib
 import inspect
-
 import sys
+import types
 
 from wordinserter.operations import ChildlessOperation, IgnoredOperation, Group, Text
 from wordinserter.exceptions import InsertError
+from wordinserter.profiling import record
 import contextlib
 from collections.abc import Iterable
 
@@ -13,8 +15,8 @@ def renders(*operations):
     def _wrapper(func):
         func.renders_operations = operations
 
-        if any(isinstance(op, ChildlessOperation) for op in operations):
-            if not all(isinstance(op, ChildlessOperation) for op in operations):
+        if any(issubclass(op, ChildlessOperation) for op in operations):
+            if not all(issubclass(op, ChildlessOperation) for op in operations):
                 raise Exception("Cannot mix ChildlessOperations and normal Operations")
 
             return func
@@ -30,10 +32,15 @@ class NewOperations(object):
 
 
 class BaseRenderer(abc.ABC):
-    def __init__(self, debug=False, hooks=None):
+    def __init__(self, debug=False, hooks=None, profiler=None):
         self.debug = debug
         self.render_methods = {}
         self.hooks = hooks or {}
+        self.profiler = profiler
+
+        # The undecorated generator functions of render methods that have children. The render loop drives these
+        # directly instead of going through contextlib for every operation.
+        self._render_generators = {}
 
         for name, method in inspect.getmembers(self, inspect.ismethod):
             if hasattr(method, "renders_operations"):
@@ -42,6 +49,9 @@ class BaseRenderer(abc.ABC):
                         raise RuntimeError("{0} has multiple renderer functions defined!".format(op.__class__))
                     self.render_methods[op] = method
 
+                    if hasattr(method, "__wrapped__"):
+                        self._render_generators[op] = types.MethodType(method.__wrapped__, self)
+
     def _call_hook(self, key, operation, *args):
         cls = operation.__class__
         if key in self.hooks and cls in self.hooks[key]:
@@ -65,70 +75,193 @@ class BaseRenderer(abc.ABC):
     def ignored_element(self, *args, **kwargs):
         yield
 
-    def render_operation(self, operation, args=None, indent=0, **kwargs):
-        method = self.render_methods.get(operation.__class__, None)
-        if method is None or not callable(method):  # The callable check isn't strictly needed, but Pycharm likes it
-            raise NotImplementedError(
-                "Operation {0} not supported by this renderer".format(operation.__class__.__name__))
+    def render_operation(self, operation):
+        self._render([operation])
 
-        with self.with_hooks(operation):
-            if isinstance(operation, ChildlessOperation):
-                if self.debug:
-                    output = operation.__class__.__name__ \
-                        if not isinstance(operation, Text) else operation.short_text
+    def render(self, *args, **kwargs):
+        # This is the entrypoint to rendering something. This is here so we can override this function,
+        # which is the first one to be called when rendering. The _render is reentrant, so it gets called by
+        # render_operation, so this is the place to do setup/teardown code in subclasses.
+        with record(self.profiler, "renderer", "render"):
+            return self._render(*args, **kwargs)
+
+    def _render(self, operations, indent=0):
+        # Operations are rendered with an explicit stack rather than by recursing, so deeply nested documents don't
+        # hit the recursion limit. Each frame holds an iterator over the children still to be rendered, when it
+        # is exhausted the frame is exited.
+        root = RenderFrame(None, None, indent - 1)
+        root.children = iter(operations)
+        stack = [root]
+        depth = self.profiler.depth if self.profiler is not None else 0
+
+        while stack:
+            frame = stack[-1]
+            operation = next(frame.children, None)
+
+            if operation is None:
+                stack.pop()
+                if frame is not root:
+                    self._step(self.exit_operation, frame, stack, depth)
+                continue
+
+            child = RenderFrame(operation, frame, frame.indent + 1)
+            children = self._step(self.enter_operation, child, stack, depth)
+            if children is not None:
+                child.children = iter(children)
+                stack.append(child)
+
+    def _step(self, func, frame, stack, depth):
+        try:
+            return func(frame)
+        except InsertError:
+            self._abort(frame, stack, depth)
+            raise
+        except Exception as e:
+            self._abort(frame, stack, depth)
+            raise InsertError(frame.operation, sys.exc_info()) from e
+
+    def _abort(self, frame, stack, depth):
+        # Close every open render method, innermost first, so their cleanup code (finally blocks) still runs.
+        frame.close()
+        for open_frame in reversed(stack):
+            open_frame.close()
+
+        if self.profiler is not None:
+            self.profiler.unwind(depth)
+
+    def enter_operation(self, frame):
+        """
+        Start rendering an operation: run the pre hooks and the render method up to its `yield`.
+        :return: The operations to render as children of this one, or None if the operation has been completely
+                 rendered (the operation is a ChildlessOperation).
+        """
+        operation = frame.operation
+        cls = operation.__class__
+        profiler = self.profiler
 
-                    output = output.encode(errors="replace")
+        method = self.render_methods.get(cls, None)
+        if method is None:
+            raise NotImplementedError("Operation {0} not supported by this renderer".format(cls.__name__))
 
-                    print((" " * indent) + str(output))
+        if profiler is not None:
+            profiler.start("operation", cls.__name__)
 
-                method(operation, *args or [])
+        self._call_hook("pre", operation)
 
+        if isinstance(operation, ChildlessOperation):
+            if self.debug:
+                output = cls.__name__ if not isinstance(operation, Text) else operation.short_text
+                print((" " * frame.indent) + str(output.encode(errors="replace")))
+
+            if profiler is not None:
+                profiler.start("method", method.__name__)
+                method(operation)
+                profiler.stop()
+                profiler.stop()
             else:
-                if self.debug:
-                    method = DebugMethod(method, indent)
+                method(operation)
 
-                with method(operation, *args or []) as new_args:
-                    if isinstance(new_args, NewOperations):
-                        self._render(new_args.ops, None, indent + 1, **kwargs)
-                    else:
-                        self._render(operation.children, new_args, indent + 1, **kwargs)
+            self._call_hook("post", operation)
+            return None
 
-    def render(self, *args, **kwargs):
-        # This is the entrypoint to rendering something. This is here so we can override this function,
-        # which is the first one to be called when rendering. The _render is reentrant, so it gets called by
-        # render_operation, so this is the place to do setup/teardown code in subclasses.
-        return self._render(*args, **kwargs)
+        if self.debug:
+            print((" " * frame.indent) + cls.__name__
+                  + " " + (str(operation.format) if operation.format is not None else ""))
 
-    def _render(self, operations, args=None, indent=0, **kwargs):
-        for operation in operations:
-            try:
-                self.render_operation(operation, args=None, indent=0, **kwargs)
-            except InsertError:
-                raise
-            except Exception as e:
-                raise InsertError(operation, sys.exc_info()) from e
+        frame.generator = self._render_generators[cls](operation)
 
+        if profiler is not None:
+            profiler.start("method", method.__name__)
+            new_args = frame.enter()
+            profiler.stop()
+        else:
+            new_args = frame.enter()
 
-class DebugMethod(object):
-    def __init__(self, method, indent):
-        self.method = method
-        self.indent = indent
-        self.operation = None
+        if isinstance(new_args, NewOperations):
+            return new_args.ops.children
+
+        return operation.children
 
-    def __call__(self, operation, *args):
+    def exit_operation(self, frame):
+        """
+        Finish rendering an operation once all of its children have been rendered: run the rest of the render
+        method and then the post hooks.
+        """
+        operation = frame.operation
+        profiler = self.profiler
+
+        if self.debug:
+            print((" " * frame.indent) + "/" + operation.__class__.__name__
+                  + " " + (str(operation.format) if operation.format is not None else ""))
+
+        if profiler is not None:
+            profiler.start("method", self.render_methods[operation.__class__].__name__, count=False)
+            frame.exit()
+            profiler.stop()
+        else:
+            frame.exit()
+
+        self._call_hook("post", operation)
+
+        if profiler is not None:
+            profiler.stop()
+
+
+class RenderFrame(object):
+    """
+    An operation that is being rendered. `generator` is the render method, which is run up to its `yield` by `enter`
+    and then to completion by `exit`.
+    """
+    def __init__(self, operation, parent, indent):
         self.operation = operation
-        self.inner_manager = self.method(operation, *args)
-        return self
+        self.parent = parent
+        self.indent = indent
+        self.children = None
+        self.generator = None
+        # A generator that wraps the render method, set by renderers that need to do work around every operation
+        self.outer_generator = None
+
+    @staticmethod
+    def _run(generator):
+        try:
+            return next(generator)
+        except StopIteration:
+            return StopIteration
+
+    def enter(self):
+        result = self._run(self.generator)
+        if result is StopIteration:
+            raise RuntimeError("Render method for {0} didn't yield".format(self.operation.__class__.__name__))
+        return result
+
+    def exit(self):
+        generator, self.generator = self.generator, None
+        if self._run(generator) is not StopIteration:
+            raise RuntimeError("Render method for {0} didn't stop".format(self.operation.__class__.__name__))
+
+    def close(self):
+        for generator in (self.generator, self.outer_generator):
+            if generator is not None:
+                generator.close()
+
+        self.generator = self.outer_generator = None
+
+
+# Renderers are imported when they are first used, so importing wordinserter doesn't import their dependencies
+RENDERERS = {
+    "COMRenderer": "wordinserter.renderers.com",
+    "OOXMLRenderer": "wordinserter.renderers.ooxml",
+}
+
 
-    def __enter__(self):
-        print((" " * self.indent) + self.operation.__class__.__name__
-              + " " + (str(self.operation.format) if self.operation.format is not None else ""))
-        return self.inner_manager.__enter__()
+def __getattr__(name):
+    if name not in RENDERERS:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
 
-    def __exit__(self, *args):
-        print((" " * self.indent) + "/" + self.operation.__class__.__name__
-              + " " + (str(self.operation.format) if self.operation.format is not None else ""))
-        return self.inner_manager.__exit__(*args)
+    return getattr(importlib.import_module(RENDERERS[name]), name)
 
 
-from .com import COMRenderer
+if sys.version_info < (3, 7):
+    # Module __getattr__ (PEP 562) needs Python 3.7, so older versions import the renderers up front
+    from .com import COMRenderer
+    from .ooxml import OOXMLRenderer
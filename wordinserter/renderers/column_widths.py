@@ -0,0 +1,100 @@
+"""
+Estimate the width of each column of a table from its content, so a table can be given its column widths once when
+it is created instead of Word refitting the columns to their content each time text is typed into a cell.
+
+Widths are worked out like an automatic HTML table layout, in points: each column needs at least room for its longest
+word and would like room for its longest line of text, columns with an explicit CSS width get that width, and the
+remaining width is shared between the other columns in proportion to what they would like. If the explicit widths
+leave the other columns less than they need, every column is scaled down together.
+"""
+from ..operations import LineBreak, Paragraph, Text
+
+# The average width of a character of 11pt body text, and Word's default left and right cell margins, in points
+AVERAGE_CHARACTER_WIDTH = 5.5
+CELL_PADDING = 10.8
+
+
+def cell_columns(row):
+    """
+    Yield (cell, column, span) for each cell in a row, where `column` is the 0-indexed column the cell starts in
+    """
+    column = 0
+    for cell in row.children:
+        span = cell.colspan or 1
+        yield cell, column, span
+        column += span
+
+
+def text_extent(operation):
+    """
+    :return: The length of the longest line of text in an operation and the length of its longest word
+    """
+    longest_line, longest_word, line = 0, 0, 0
+
+    for child in operation.descendants:
+        if isinstance(child, Text):
+            line += len(child.text)
+            longest_word = max(longest_word, max((len(word) for word in child.text.split()), default=0))
+        elif isinstance(child, (LineBreak, Paragraph)):
+            longest_line, line = max(longest_line, line), 0
+
+    return max(longest_line, line), longest_word
+
+
+def estimate_column_widths(table, available_width, character_width=AVERAGE_CHARACTER_WIDTH, padding=CELL_PADDING):
+    """
+    :param table: A Table, after its colspans are normalized
+    :param available_width: The width the table fills, in points
+    :return: The width of each column in points, or None if the table has no columns
+    """
+    metrics = table.metrics
+    columns = metrics.columns
+    if not columns:
+        return None
+
+    minimum, preferred, explicit = [padding] * columns, [padding] * columns, [None] * columns
+
+    # Cells that span several columns don't say anything about the width of any one of them
+    for row, cell_widths in zip(table.children, metrics.cell_widths):
+        for (cell, column, span), (width, unit) in zip(cell_columns(row), cell_widths):
+            if span != 1 or column >= columns:
+                continue
+
+            longest_line, longest_word = text_extent(cell)
+            minimum[column] = max(minimum[column], longest_word * character_width + padding)
+            preferred[column] = max(preferred[column], longest_line * character_width + padding)
+
+            if explicit[column] is None and width is not None:
+                explicit[column] = width if unit == 'pt' else available_width * width / 100
+
+    automatic = [column for column in range(columns) if explicit[column] is None]
+    widths = list(explicit)
+
+    if not automatic:
+        return widths
+
+    total_explicit = sum(width for width in explicit if width is not None)
+    total_minimum = sum(minimum[column] for column in automatic)
+    total_preferred = sum(preferred[column] for column in automatic)
+
+    if total_explicit + total_minimum > available_width:
+        # The explicit widths leave the other columns less than they need, so every column is scaled down together
+        # rather than squeezing the other columns to nothing
+        scale = available_width / (total_explicit + total_minimum)
+        for column in range(columns):
+            widths[column] = (minimum[column] if explicit[column] is None else explicit[column]) * scale
+        return widths
+
+    remaining = available_width - total_explicit
+
+    for column in automatic:
+        if not total_preferred:
+            widths[column] = remaining / len(automatic)
+        elif total_preferred <= remaining:
+            # Everything fits on one line, so the columns are stretched to fill the width like a fixed table
+            widths[column] = remaining * preferred[column] / total_preferred
+        else:
+            share = (remaining - total_minimum) / (total_preferred - total_minimum)
+            widths[column] = minimum[column] + (preferred[column] - minimum[column]) * share
+
+    return widths
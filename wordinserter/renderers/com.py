@@ -1,15 +1,29 @@
 import warnings
+from collections import namedtuple
 from contextlib import contextmanager
 from decimal import Decimal
+from operator import attrgetter
 
 import webcolors
 
 from . import BaseRenderer, renders
+from ..incremental import (DELETE, INSERT, KEEP, _freeze, bookmark_name, diff_blocks,
+                           parse_bookmark_name, structural_hash,
+                           top_level_blocks)
+from ..lists import list_layout
 from ..operations import (BaseList, Bold, BulletList, CodeBlock, Footnote,
                           Format, Group, Heading, HyperLink, Image, InlineCode,
                           Italic, LineBreak, ListElement, NumberedList,
                           Paragraph, Span, Style, Table, TableCell, TableRow,
                           Text, UnderLine)
+from ..profiling import record
+from ..references import ReferenceIndex
+from ..styles import style_names
+from .column_widths import cell_columns, estimate_column_widths
+from .conversions import (css_color_to_wdcolor, css_colors_to_wdcolor_batch,
+                          css_length_to_points, css_lengths_to_points_batch,
+                          rgb_to_wdcolor)
+from .run_properties import RunProperties
 
 WORD_WDCOLORINDEX_MAPPING = {
     'lightgreen': 'wdBrightGreen',
@@ -53,61 +67,134 @@ class WordFormatter(object):
         :return: A numeric WDCOLOR value
         """
         rgbstrlst = webcolors.hex_to_rgb(value)
-        return int(rgbstrlst[0]) + 0x100 * int(rgbstrlst[1]) + 0x10000 * int(rgbstrlst[2])
+        return rgb_to_wdcolor(*rgbstrlst)
 
     @staticmethod
     def style_to_wdcolor(value):
-        if value == 'none':
-            return None
-
-        try:
-            if value.startswith('rgb('):
-                value = WordFormatter.rgbstring_to_hex(value)
-            elif value in webcolors.css3_names_to_hex:
-                value = webcolors.css3_names_to_hex[value]
-
-            return WordFormatter.hex_to_wdcolor(value)
-        except Exception:
-            return None
+        """
+        Transform any CSS color into a wdColor value, see `conversions.css_color_to_wdcolor`
+        :return: A numeric WDCOLOR value, or None if there is no color
+        """
+        return css_color_to_wdcolor(value)
 
     @staticmethod
     def size_to_points(css_value):
         """
-        Transform a pixel string into points (used by word).
+        Transform a CSS length into points (used by word), see `conversions.css_length_to_points`
 
-        :param css_value: string optionally ending in px/pt
-        :return: an integer point representation
+        :param css_value: A number of pixels or a string ending in px/pt/em/rem/%/cm/mm/in/pc
+        :return: A point representation, or None if the value can't be parsed
+        """
+        return css_length_to_points(css_value)
+
+    styles_to_wdcolor = staticmethod(css_colors_to_wdcolor_batch)
+    sizes_to_points = staticmethod(css_lengths_to_points_batch)
+
+
+# Operations whose render methods only push and pop run properties
+RUN_PROPERTY_OPERATIONS = {Bold, Italic, UnderLine}
+
+# Field codes that "@" hyperlinks are allowed to insert
+ALLOWED_FIELD_CODES = {'FILENAME', 'STYLEREF'}
+
+# In deferred annotation mode, a bookmark, hyperlink (or field) or footnote to add once all the text has been typed.
+# `start` and `end` are character offsets in the document.
+Annotation = namedtuple("Annotation", ["kind", "start", "end", "operation"])
+BOOKMARK, HYPERLINK, FOOTNOTE = "bookmark", "hyperlink", "footnote"
+
+# A Word property that a compiled format sets: `attribute` of the object reached by following the attribute names in
+# `path` from the target, which is one of the names below. `value` is already converted to what Word expects. STYLE
+# assignments apply a style to the element's range, BORDERS assignments are made on each of the range's four borders.
+FormatAssignment = namedtuple("FormatAssignment", ["target", "path", "attribute", "value"])
+RANGE, STYLE, BORDERS, CELL, TABLE, IMAGE = "range", "style", "borders", "cell", "table", "image"
+
+# The Format properties that decide what a compiled format does
+FORMAT_PROPERTIES = tuple(sorted(Format.optional))
+_format_properties = attrgetter(*FORMAT_PROPERTIES)
+
+
+class ListNumbering(object):
+    """
+    A top-level list being rendered in bulk list numbering mode. The level of every element is known from
+    `list_layout`, and the position each element starts at is recorded while it is typed, so the whole list can be
+    numbered once it has been typed.
+    """
+    def __init__(self, layout, start):
+        self.levels = {id(item.element): item for item in layout}
+        self.lists = {id(item.list) for item in layout}
+        self.start = start
+        # (position, ListLevel) pairs, each level applies from its position until the next one
+        self.marks = []
+        # The elements being rendered, more than one when a list is nested inside an element's content
+        self.open = []
+
+    def segments(self, end):
         """
-        if isinstance(css_value, str):
-            is_pt = css_value.endswith('pt')
-            if css_value.endswith("px") or is_pt:
-                css_value = css_value[:-2]
+        :return: (start, end, level, list) tuples covering the list, with neighbouring runs at the same level of the
+                 same kind of list merged
+        """
+        segments = []
+        ends = [position for position, _ in self.marks[1:]] + [end]
 
-            try:
-                css_value = float(css_value)
-            except ValueError:
-                return None
+        for (start, item), stop in zip(self.marks, ends):
+            if stop <= start:
+                continue
+
+            if segments:
+                previous = segments[-1]
+                if previous[1] == start and previous[2] == item.level and list_key(previous[3]) == list_key(item.list):
+                    segments[-1] = (previous[0], stop, previous[2], previous[3])
+                    continue
+
+            segments.append((start, stop, item.level, item.list))
 
-            if is_pt:
-                # Return pt sizes directly, no rounding or multiplication.
-                return css_value
+        return segments
 
-            css_value = round(css_value)
 
-        return css_value * 0.75
+def list_key(op: BaseList):
+    # Lists with the same key use the same list template
+    return op.__class__, op.type
 
 
 class COMRenderer(BaseRenderer):
-    def __init__(self, document, constants, range=None, debug=False, hooks=None):
+    # In large document mode tables are created this many rows at a time, and the undo stack is cleared after each
+    # chunk of rows and every UNDO_CHECKPOINT_OPERATIONS operations.
+    TABLE_CHUNK_ROWS = 250
+    UNDO_CHECKPOINT_OPERATIONS = 1000
+
+    def __init__(self, document, constants, range=None, debug=False, hooks=None, incremental=False, profiler=None,
+                 large_document=False, deferred_annotations=False, bulk_list_numbering=False, styles=None,
+                 estimate_column_widths=False):
+        if profiler is not None:
+            document = profiler.wrap(document)
+
         self.word = document.Application
         self.document = document
         self.constants = constants
+        self.incremental = incremental
+        self.large_document = large_document
         self._format_stack = None
+        self._operations_since_checkpoint = 0
+        self.run_properties = RunProperties()
+        # In deferred annotation mode, the annotations recorded since they were last added
+        self._annotations = [] if deferred_annotations else None
+        self.bulk_list_numbering = bulk_list_numbering
+        self._list_numbering = None
+        self._list_templates = {}
+        # Class names that aren't styles in the document, mapped to the style a new style for them is based on
+        self.styles = styles or {}
+        # Whether each class name used so far is a style in the document
+        self._known_styles = {}
+        self._compiled_formats = {}
+        self.estimate_column_widths = estimate_column_widths
+        self._text_width = None
+        self._border_edges = (constants.wdBorderBottom, constants.wdBorderTop, constants.wdBorderLeft,
+                              constants.wdBorderRight)
 
         if range is not None:
             range.Select()
 
-        super().__init__(debug, hooks)
+        super().__init__(debug, hooks, profiler)
 
     @property
     def selection(self):
@@ -134,6 +221,11 @@ class COMRenderer(BaseRenderer):
 
     @renders(Footnote)
     def footnote(self, op: Footnote):
+        if self._annotations is not None:
+            position = self.selection.Start
+            self._annotations.append(Annotation(FOOTNOTE, position, position, op))
+            return
+
         rng = self.selection.Range
         content = op.attributes['data-content']
         footnote = self.document.Footnotes.Add(rng)
@@ -155,6 +247,15 @@ class COMRenderer(BaseRenderer):
     def style(self, op: Style):
         # old_style = self.selection.Style
         self.selection.Style = self.document.Styles(op.name)
+
+        if self._annotations is not None:
+            start = self.selection.Start if op.id else None
+            yield
+            if op.id:
+                self._annotations.append(Annotation(BOOKMARK, start, self.selection.End, op))
+            self.selection.TypeParagraph()
+            return
+
         with self.get_range() as rng:
             yield
         self.selection.TypeParagraph()
@@ -165,21 +266,49 @@ class COMRenderer(BaseRenderer):
 
     @renders(Bold)
     def bold(self, op: Bold):
-        self.selection.BoldRun()
+        self.run_properties.push("bold")
         yield
-        self.selection.BoldRun()
+        self.run_properties.pop("bold")
 
     @renders(Italic)
     def italic(self, op: Italic):
-        self.selection.ItalicRun()
+        self.run_properties.push("italic")
         yield
-        self.selection.ItalicRun()
+        self.run_properties.pop("italic")
 
     @renders(UnderLine)
     def underline(self, op: UnderLine):
-        self.selection.Font.Underline = self.constants.wdUnderlineSingle
+        self.run_properties.push("underline")
         yield
-        self.selection.Font.Underline = self.constants.wdUnderlineNone
+        self.run_properties.pop("underline")
+
+    def apply_run_properties(self):
+        """
+        Bring the selection's character formatting up to date with the run properties, if it has changed
+        """
+        run_properties = self.run_properties
+        if not run_properties.dirty:
+            return
+
+        changes = run_properties.pending()
+        if changes:
+            font = self.selection.Font
+
+            for name, value in changes:
+                if name == "bold":
+                    font.Bold = value
+                elif name == "italic":
+                    font.Italic = value
+                elif name == "underline":
+                    font.Underline = self.constants.wdUnderlineSingle if value else self.constants.wdUnderlineNone
+                elif name == "font_name":
+                    if run_properties.applied["font_name"] is None:
+                        run_properties.original_font_name = font.Name
+                    font.Name = value if value is not None else run_properties.original_font_name
+
+                run_properties.mark_applied(name, value)
+
+        run_properties.mark_clean()
 
     @renders(Text)
     def text(self, op: Text):
@@ -220,11 +349,10 @@ class COMRenderer(BaseRenderer):
     @renders(InlineCode)
     def inline_code(self, op: InlineCode):
         previous_style = self.selection.Style
-        previous_font_name, previous_font_size = self.selection.Font.Name, self.selection.Font.Size
-        self.selection.Font.Name = "Courier New"
+        self.run_properties.push_font("Courier New")
         yield
         self.selection.Style = previous_style
-        self.selection.Font.Name = previous_font_name
+        self.run_properties.pop_font()
 
     @renders(CodeBlock)
     def code_block(self, op: CodeBlock):
@@ -274,6 +402,12 @@ class COMRenderer(BaseRenderer):
 
     @renders(HyperLink)
     def hyperlink(self, op: HyperLink):
+        if self._annotations is not None:
+            start = self.selection.Start
+            yield
+            self._annotations.append(Annotation(HYPERLINK, start, self.selection.End, op))
+            return
+
         with self.get_range() as rng:
             yield
         # Inserting a hyperlink that contains different styles can reset the style. IE:
@@ -282,31 +416,55 @@ class COMRenderer(BaseRenderer):
         # Here we just reset the style after making the hyperlink.
         style = self.selection.Style
 
+        if self._field_text(op.location) is False:
+            return
+
+        field = self.add_hyperlink(op, rng)
+        if field is not None:
+            # When inserting fields, the cursor stays at the beginning, select it and move the cursor to escape from it
+            field.Result.Select()
+            self.selection.MoveRight()
+
+        self.selection.Collapse(Direction=self.constants.wdCollapseEnd)
+        self.selection.Style = style
+
+    @staticmethod
+    def _field_text(location):
+        """
+        :return: The field code a "!" or "@" hyperlink location inserts, None if the location is not a field, or False
+                 if the field code is not allowed
+        """
+        if location.startswith('!'):
+            return "REF {} \\h \\* charformat".format(location.replace('!', '', 1))
+
+        if location.startswith('@'):
+            text = location.replace('@', '', 1)
+            code = text.split(' ')[0]
+            # Whitelist field codes
+            return text if code in ALLOWED_FIELD_CODES else False
+
+        return None
+
+    def add_hyperlink(self, op: HyperLink, rng):
+        """
+        Turn `rng` into a hyperlink, or a field for "!" and "@" locations
+        :return: The field, if one was added
+        """
+        field_text = self._field_text(op.location)
+
         if op.location.startswith('#'):
             self.document.Hyperlinks.Add(Anchor=rng, TextToDisplay="", SubAddress=op.location.replace('#', '', 1))
-        elif op.location.startswith('!') or op.location.startswith('@'):
-            if op.location.startswith('!'):
-                text = "REF {} \h \* charformat".format(op.location.replace('!', '', 1))
-            else:
-                text = op.location.replace('@', '', 1)
-                code = text.split(' ')[0]
-                # Whitelist field codes
-                if code not in {'FILENAME', 'STYLEREF'}:
-                    return
-
-            field = self.document.Fields.Add(
+        elif field_text:
+            return self.document.Fields.Add(
                 Range=rng,
                 Type=self.constants.wdFieldEmpty,
-                Text=text,
+                Text=field_text,
                 PreserveFormatting=False
             )
-            # When inserting fields, the cursor stays at the beginning, select it and move the cursor to escape from it
-            field.Result.Select()
-            self.selection.MoveRight()
-        else:
+        elif field_text is None:
             self.document.Hyperlinks.Add(Anchor=rng, Address=op.location[:2048])  # Prevent out of memory error
-        self.selection.Collapse(Direction=self.constants.wdCollapseEnd)
-        self.selection.Style = style
+
+        return None
 
     def _get_constants_for_list(self, op: BaseList):
         if isinstance(op, NumberedList):
@@ -318,12 +476,13 @@ class COMRenderer(BaseRenderer):
 
         return gallery_type, list_types
 
-    @renders(BulletList, NumberedList)
-    def render_list(self, op):
-        list_level = op.depth + 1
-        first_list = list_level == 1
+    def _list_template(self, op: BaseList):
+        # Looking a template up takes several COM calls, and looping through the gallery for roman numerals many more
+        key = list_key(op)
+        if key in self._list_templates:
+            return self._list_templates[key]
 
-        gallery_type, list_types = self._get_constants_for_list(op)
+        gallery_type, _ = self._get_constants_for_list(op)
         gallery = self.word.ListGalleries(gallery_type)
         template = gallery.ListTemplates(1)
 
@@ -341,6 +500,29 @@ class COMRenderer(BaseRenderer):
                 else:
                     warnings.warn('Unable to locate list style for {0}, using default'.format(op.type))
 
+        self._list_templates[key] = template
+        return template
+
+    @renders(BulletList, NumberedList)
+    def render_list(self, op):
+        numbering = self._list_numbering
+        if numbering is not None and id(op) in numbering.lists:
+            # Numbered along with the top-level list
+            yield
+            return
+
+        list_level = op.depth + 1
+        first_list = list_level == 1
+
+        if first_list and self.bulk_list_numbering:
+            layout = list_layout(op)
+            if layout is not None:
+                yield from self._render_numbered_list(op, layout)
+                return
+
+        _, list_types = self._get_constants_for_list(op)
+        template = self._list_template(op)
+
         if first_list:
             self.selection.Range.ListFormat.ApplyListTemplateWithLevel(
                 ListTemplate=template,
@@ -370,11 +552,79 @@ class COMRenderer(BaseRenderer):
         else:
             self.selection.Range.ListFormat.ListOutdent()
 
+    def _render_numbered_list(self, op: BaseList, layout):
+        # The list and every list nested in it are typed as plain paragraphs, then numbered all at once: one
+        # template is applied to the whole list, then each run of paragraphs below the first level is moved to its
+        # level, then levels that belong to a different kind of list get their own template.
+        if op.format.style:
+            self._apply_style_to_range(op.format)
+
+        numbering = self._list_numbering = ListNumbering(layout, self.selection.Start)
+        try:
+            yield
+        finally:
+            self._list_numbering = None
+
+        end = self.selection.Start
+        if end <= numbering.start:
+            return
+
+        self.document.Range(Start=numbering.start, End=end).ListFormat.ApplyListTemplateWithLevel(
+            ListTemplate=self._list_template(op),
+            ContinuePreviousList=False,
+            DefaultListBehavior=self.constants.wdWord10ListBehavior
+        )
+
+        segments = numbering.segments(end)
+        for start, stop, level, owner in segments:
+            if level > 1:
+                self.document.Range(Start=start, End=stop).ListFormat.ListLevelNumber = level
+
+        templates = {(1, list_key(op))}
+        for start, stop, level, owner in segments:
+            if (level, list_key(owner)) in templates:
+                continue
+
+            templates.add((level, list_key(owner)))
+            self.document.Range(Start=start, End=stop).ListFormat.ApplyListTemplateWithLevel(
+                ListTemplate=self._list_template(owner),
+                ContinuePreviousList=True,
+                DefaultListBehavior=self.constants.wdWord10ListBehavior,
+                ApplyLevel=level,
+                ApplyTo=self.constants.wdListApplyToWholeList
+            )
+
+        self.selection.Style = self.constants.wdStyleNormal
+
     @renders(ListElement)
     def list_element(self, op: ListElement):
+        numbering = self._list_numbering
+        if numbering is None:
+            yield
+            self.selection.TypeParagraph()
+            return
+
+        item = numbering.levels[id(op)]
+        numbering.open.append(item)
+        self._mark_list_level(numbering, item)
+
         yield
         self.selection.TypeParagraph()
 
+        numbering.open.pop()
+        if numbering.open:
+            # The rest of the enclosing element's content is back at its level
+            self._mark_list_level(numbering, numbering.open[-1])
+
+    def _mark_list_level(self, numbering, item):
+        # Positions are only read where the level changes, not for every element
+        if numbering.marks:
+            previous = numbering.marks[-1][1]
+            if previous.level == item.level and list_key(previous.list) == list_key(item.list):
+                return
+
+        numbering.marks.append((self.selection.Start, item))
+
     @renders(Table)
     def table(self, op: Table):
         table_range = self.selection.Range
@@ -390,16 +640,27 @@ class COMRenderer(BaseRenderer):
 
         end_range = self.selection.Range
 
-        rows, columns = op.dimensions
+        metrics = op.metrics
+        rows, columns = metrics.dimensions
+        chunked = self.large_document and rows > self.TABLE_CHUNK_ROWS
 
         table = self.selection.Tables.Add(
             table_range,
-            NumRows=rows,
+            NumRows=self.TABLE_CHUNK_ROWS if chunked else rows,
             NumColumns=columns,
             AutoFitBehavior=self.constants.wdAutoFitFixed
         )
         table.Style = "Table Grid"
-        table.AllowAutoFit = True
+        column_widths = self._estimate_column_widths(op) if self.estimate_column_widths else None
+        # Estimated columns are sized once, so Word doesn't need to refit them as each cell's content is typed
+        table.AllowAutoFit = column_widths is None
+
+        if chunked:
+            self._add_table_rows(table, rows)
+
+        if column_widths is not None:
+            for index, width in enumerate(column_widths):
+                table.Columns(index + 1).Width = width
 
         table.Borders.Enable = 0 if op.border == '0' else 1
 
@@ -481,7 +742,7 @@ class COMRenderer(BaseRenderer):
         # Store the table object for later use
         op.render.table = table
 
-        table_width, unit = op.width
+        table_width, unit = metrics.width
 
         if table_width:
             width_type_map = {
@@ -495,10 +756,8 @@ class COMRenderer(BaseRenderer):
             table.PreferredWidthType = width_type_map[unit]
             table.PreferredWidth = table_width
 
-            for row_child in op.children:
-                for cell_child in row_child.children:
-                    cell_width, unit = cell_child.width
-
+            for row_child, cell_widths in zip(op.children, metrics.cell_widths):
+                for cell_child, (cell_width, unit) in zip(row_child.children, cell_widths):
                     if cell_width is not None:
                         cell_o = cell_child.render.cell_object
                         cell_o.PreferredWidthType = width_type_map[unit]
@@ -511,6 +770,51 @@ class COMRenderer(BaseRenderer):
         yield
         end_range.Select()
 
+    @property
+    def text_width(self):
+        """
+        The width between the page margins, in points
+        """
+        if self._text_width is None:
+            page_setup = self.document.PageSetup
+            self._text_width = page_setup.PageWidth - page_setup.LeftMargin - page_setup.RightMargin
+        return self._text_width
+
+    def _estimate_column_widths(self, op: Table):
+        # Nested tables fill the estimated width of the cell they are in, so are only estimated if it was
+        if isinstance(op.parent, TableCell):
+            available = getattr(op.parent.render, "estimated_width", None)
+            if available is None:
+                return None
+        else:
+            available = self.text_width
+
+        table_width, unit = op.metrics.width
+        if table_width:
+            available = table_width if unit == 'pt' else available * max(0, min(table_width, 100)) / 100
+
+        widths = estimate_column_widths(op, available)
+
+        if widths is not None:
+            for row in op.children:
+                for cell, column, span in cell_columns(row):
+                    cell.render.estimated_width = sum(widths[column:column + span])
+
+        return widths
+
+    def _add_table_rows(self, table, rows):
+        # Adding every row of a huge table at once gets slower the larger the undo stack and the document are, so
+        # rows are added a chunk at a time below the last row, clearing the undo stack in between. All of the rows are
+        # created here, before any cell content is typed.
+        added = self.TABLE_CHUNK_ROWS
+
+        while added < rows:
+            count = min(self.TABLE_CHUNK_ROWS, rows - added)
+            table.Rows(added).Select()
+            self.selection.InsertRowsBelow(count)
+            added += count
+            self.undo_checkpoint()
+
     @renders(TableRow)
     def table_row(self, op):
         yield
@@ -535,38 +839,271 @@ class COMRenderer(BaseRenderer):
         rng = rng or self.selection.Range
 
         for klass in op.style or []:
+            if not self.resolve_style(klass):
+                continue
+
             try:
                 rng.Style = klass
             except Exception:
                 warnings.warn("Unable to apply style name '{0}'".format(klass))
 
-    def render_operation(self, operation, *args, **kwargs):
+    def enter_operation(self, frame):
+        operation = frame.operation
+
+        # Formatting operations only change the run properties, everything else may type text so needs them applied
+        if operation.__class__ not in RUN_PROPERTY_OPERATIONS:
+            self.apply_run_properties()
+
+        self._operations_since_checkpoint += 1
+
+        # Formats are collected into a tree of lists mirroring the operations, then applied once rendering finishes
+        frame.format_list = self._format_stack if frame.parent.operation is None else frame.parent.child_format_list
+        frame.child_format_list = []
+
         if operation.format is not None \
                 and operation.format.has_format() \
                 and operation.format.__class__ in self.render_methods:
-            format_func = self.collect_format_data
-        else:
-            format_func = self.ignored_element
+            frame.outer_generator = self._render_generators[Format](operation.format, operation, frame.format_list)
+            next(frame.outer_generator)
 
-        if 'format_list' in kwargs:
-            format_list = kwargs.pop('format_list')
-        else:
-            format_list = self._format_stack
+        children = super().enter_operation(frame)
 
-        child_format_list = []
+        if children is None:
+            self._finish_format(frame)
 
-        with format_func(operation.format, operation, format_list):
-            super().render_operation(operation, *args, format_list=child_format_list, **kwargs)
+        return children
 
-        if child_format_list:
-            format_list.append(child_format_list)
+    def exit_operation(self, frame):
+        if frame.operation.__class__ not in RUN_PROPERTY_OPERATIONS:
+            self.apply_run_properties()
 
-    def render(self, *args, **kwargs):
-        self._format_stack = []
+        super().exit_operation(frame)
+        self._finish_format(frame)
 
-        super().render(*args, **kwargs)
-        self.apply_recursive_formatting(self._format_stack)
-        self._format_stack = None
+        if self.large_document and self._operations_since_checkpoint >= self.UNDO_CHECKPOINT_OPERATIONS:
+            self.undo_checkpoint()
+
+    def _finish_format(self, frame):
+        if frame.outer_generator is not None:
+            generator, frame.outer_generator = frame.outer_generator, None
+            next(generator, None)
+
+        if frame.child_format_list:
+            frame.format_list.append(frame.child_format_list)
+
+    def render(self, operations, *args, **kwargs):
+        # Operations are walked before they are rendered, so a one-shot iterator has to be kept
+        if iter(operations) is operations:
+            operations = list(operations)
+
+        if self._annotations is not None:
+            self.check_references(operations)
+
+        with record(self.profiler, "renderer", "resolve_styles"):
+            self.resolve_styles(operations)
+
+        with self.document_mode():
+            if self.incremental:
+                return self.render_incremental(operations, *args, **kwargs)
+
+            self._format_stack = []
+
+            super().render(operations, *args, **kwargs)
+            self.apply_run_properties()
+            self.apply_annotations()
+            self.apply_recursive_formatting(self._format_stack)
+            self._format_stack = None
+
+    def resolve_styles(self, operations):
+        """
+        Look up every class name the operations use in the document's styles once, before anything is rendered, and
+        create the missing ones that have an entry in `self.styles`.
+        :return: The class names that are styles in the document
+        """
+        return [name for name in style_names(operations) if self.resolve_style(name)]
+
+    def resolve_style(self, name):
+        """
+        :return: True if `name` is a style in the document, creating it if it is missing and in `self.styles`. Missing
+                 styles are warned about the first time they are resolved.
+        """
+        known = self._known_styles.get(name)
+        if known is not None:
+            return known
+
+        try:
+            self.document.Styles(name)
+            known = True
+        except Exception:
+            known = False
+
+        if not known and name in self.styles:
+            try:
+                style = self.document.Styles.Add(Name=name, Type=self.constants.wdStyleTypeParagraph)
+                style.BaseStyle = self.styles[name]
+                known = True
+            except Exception:
+                warnings.warn("Unable to create style '{0}' based on '{1}'".format(name, self.styles[name]))
+        elif not known:
+            warnings.warn("Unable to apply style name '{0}'".format(name))
+
+        self._known_styles[name] = known
+        return known
+
+    def check_references(self, operations):
+        """
+        Warn about "#" and "!" hyperlinks to bookmarks that neither the operations nor the document have, before
+        anything is rendered.
+        :return: The ReferenceIndex of the operations
+        """
+        index = ReferenceIndex(operations)
+
+        for name in index.unresolved():
+            if not self.document.Bookmarks.Exists(name):
+                warnings.warn("Cross-reference to bookmark '{0}', which does not exist".format(name))
+
+        return index
+
+    def apply_annotations(self):
+        """
+        In deferred annotation mode, add the bookmarks, hyperlinks, fields and footnotes recorded while rendering.
+        A range is created for each of them before anything is added, as Word moves ranges when the text before them
+        changes. Bookmarks are added first, so fields that refer to a bookmark later in the document find it, and
+        fields are updated once at the end.
+        """
+        if not self._annotations:
+            # Not in deferred annotation mode, or nothing was recorded
+            return
+
+        annotations, self._annotations = self._annotations, []
+
+        with record(self.profiler, "method", "apply_annotations"):
+            ranges = [self.document.Range(Start=annotation.start, End=annotation.end) for annotation in annotations]
+            pending = sorted(zip(annotations, ranges), key=lambda item: item[0].start)
+            has_fields = False
+
+            for annotation, rng in pending:
+                if annotation.kind == BOOKMARK:
+                    self.document.Bookmarks.Add(str(annotation.operation.id), rng)
+
+            # Last first, so inserting footnote references and field results doesn't move anything still to be added
+            for annotation, rng in reversed(pending):
+                if annotation.kind == HYPERLINK:
+                    has_fields = self.add_hyperlink(annotation.operation, rng) is not None or has_fields
+                elif annotation.kind == FOOTNOTE:
+                    footnote = self.document.Footnotes.Add(rng)
+                    footnote.Range.Text = annotation.operation.attributes['data-content']
+
+            if has_fields:
+                self.document.Fields.Update()
+
+    @contextmanager
+    def document_mode(self):
+        """
+        In large document mode, turn off screen updating, background pagination and spelling and grammar checking
+        while rendering, and record the whole render as a single undo entry. Everything is restored afterwards.
+        """
+        if not self.large_document:
+            yield
+            return
+
+        word, options = self.word, self.word.Options
+        saved = (word.ScreenUpdating, options.Pagination, options.CheckSpellingAsYouType,
+                 options.CheckGrammarAsYouType)
+
+        recording = False
+
+        # Inside the try so the options are restored even if changing one of them or starting the undo record fails
+        # (UndoRecord needs Word 2010)
+        try:
+            word.ScreenUpdating = False
+            options.Pagination = False
+            options.CheckSpellingAsYouType = False
+            options.CheckGrammarAsYouType = False
+            word.UndoRecord.StartCustomRecord("wordinserter")
+            recording = True
+
+            yield
+        finally:
+            if recording:
+                word.UndoRecord.EndCustomRecord()
+            (word.ScreenUpdating, options.Pagination, options.CheckSpellingAsYouType,
+             options.CheckGrammarAsYouType) = saved
+
+    def undo_checkpoint(self):
+        """
+        Clear the undo stack in large document mode. Word gets slower the more undo entries it has to keep.
+        """
+        if not self.large_document:
+            return
+
+        self._operations_since_checkpoint = 0
+        undo_record = self.word.UndoRecord
+        undo_record.EndCustomRecord()
+        self.document.UndoClear()
+        undo_record.StartCustomRecord("wordinserter")
+
+    def _rendered_blocks(self):
+        # Hidden bookmarks (ones that start with an underscore) are not listed unless ShowHidden is set.
+        bookmarks = self.document.Bookmarks
+        bookmarks.ShowHidden = True
+
+        blocks = []
+        for bookmark in bookmarks:
+            parsed = parse_bookmark_name(bookmark.Name)
+            if parsed is not None:
+                blocks.append((bookmark.Range.Start, parsed[0], bookmark))
+
+        blocks.sort(key=lambda block: block[0])
+        return [(block_hash, bookmark) for _, block_hash, bookmark in blocks]
+
+    def render_incremental(self, operations):
+        """
+        Render only the top-level blocks that differ from the ones rendered into the document last time. Every
+        rendered block is wrapped in a hidden bookmark that records its structural hash, blocks that are unchanged
+        are left untouched and blocks that no longer exist are deleted.
+        """
+        previous = self._rendered_blocks()
+        blocks = top_level_blocks(operations)
+        hashes = [structural_hash(block) for block in blocks]
+
+        used_names = {bookmark.Name for _, bookmark in previous}
+        insert_at = previous[0][1].Range.Start if previous else self.selection.Start
+        last_bookmark = None
+
+        for change in diff_blocks([block_hash for block_hash, _ in previous], hashes):
+            if change.action == KEEP:
+                last_bookmark = previous[change.old_index][1]
+
+            elif change.action == DELETE:
+                bookmark = previous[change.old_index][1]
+                used_names.discard(bookmark.Name)
+                insert_at = bookmark.Range.Start
+                bookmark.Range.Delete()
+                bookmark.Delete()
+
+            elif change.action == INSERT:
+                if last_bookmark is not None:
+                    insert_at = last_bookmark.Range.End
+
+                self.document.Range(Start=insert_at, End=insert_at).Select()
+                start = self.selection.Start
+
+                self._format_stack = []
+                super().render([blocks[change.new_index]])
+                self.apply_annotations()
+                self.apply_recursive_formatting(self._format_stack)
+                self._format_stack = None
+
+                number = 0
+                while bookmark_name(hashes[change.new_index], number) in used_names:
+                    number += 1
+
+                name = bookmark_name(hashes[change.new_index], number)
+                used_names.add(name)
+                last_bookmark = self.document.Bookmarks.Add(
+                    name, self.document.Range(Start=start, End=self.selection.End)
+                )
 
     @renders(Format)
     def collect_format_data(self, op, parent_operation, format_stack):
@@ -579,213 +1116,158 @@ class COMRenderer(BaseRenderer):
         format_stack.append((op, parent_operation, rng))
 
     def apply_recursive_formatting(self, stack):
-        for item in stack:
-            if isinstance(item, tuple):
-                with self.with_hooks(*item):
+        pending = [iter(stack)]
+
+        while pending:
+            item = next(pending[-1], None)
+
+            if item is None:
+                pending.pop()
+            elif isinstance(item, tuple):
+                with self.with_hooks(*item), record(self.profiler, "method", "handle_format"):
                     self.handle_format(*item)
             else:
-                self.apply_recursive_formatting(item)
+                pending.append(iter(item))
 
     def handle_format(self, op, parent_operation, element_range):
-        # should_type_x = op.should_use_x_hack
-
         # Why TypeText('X')? Styles seem to overrun their containers (especially when they span an entire line). This
         # adds a buffer to the end of the element, which is removed at the end. This is the least horrible way to do
         # this, trust us.
-        # if should_type_x:
+        # if op.should_use_x_hack:
         #    self.selection.TypeText("X")
 
+        assignments = self.compile_format(op, parent_operation.__class__)
+        if not assignments:
+            return
+
         if isinstance(parent_operation, TableCell):
             element_range = parent_operation.render.cell_object.Range
 
-        if op.style and not isinstance(parent_operation, BaseList):
-            self._apply_style_to_range(op, element_range)
+        targets = {RANGE: element_range}
+
+        for target_name, path, attribute, value in assignments:
+            if target_name == STYLE:
+                try:
+                    element_range.Style = value
+                except Exception:
+                    warnings.warn("Unable to apply style name '{0}'".format(value))
+                continue
+
+            target = targets.get(target_name)
+            if target is None:
+                target = targets[target_name] = self._format_target(target_name, parent_operation, element_range)
+
+            if target_name == BORDERS:
+                for border in target:
+                    setattr(border, attribute, value)
+                continue
+
+            for name in path:
+                target = getattr(target, name)
+            setattr(target, attribute, value)
+
+    def _format_target(self, target_name, parent_operation, element_range):
+        if target_name == BORDERS:
+            return [element_range.Borders(edge) for edge in self._border_edges]
+        if target_name == CELL:
+            return parent_operation.render.cell_object
+        if target_name == TABLE:
+            return parent_operation.render.table
+        if target_name == IMAGE:
+            return parent_operation.render.image
+        raise RuntimeError("Unknown format target {0}".format(target_name))
+
+    def compile_format(self, op: Format, parent_class):
+        """
+        Work out the Word properties a format sets on an element rendered by `parent_class`, with CSS values
+        already converted to Word values. Formats with the same properties on the same kind of element share the
+        result, so each distinct format is only worked out once per renderer.
+        :return: A tuple of FormatAssignments
+        """
+        key = [parent_class]
+        for name, value in zip(FORMAT_PROPERTIES, _format_properties(op)):
+            if value:
+                key.append((name, _freeze(value) if isinstance(value, (dict, list)) else value))
+
+        key = tuple(key)
+        assignments = self._compiled_formats.get(key)
+        if assignments is None:
+            assignments = self._compiled_formats[key] = tuple(self._compile_format(op, parent_class))
+        return assignments
+
+    def _compile_format(self, op: Format, parent_class):
+        is_table = issubclass(parent_class, Table)
+        is_cell = issubclass(parent_class, TableCell)
+        constants = self.constants
+
+        if op.style and not issubclass(parent_class, BaseList):
+            for klass in op.style:
+                if self.resolve_style(klass):
+                    yield FormatAssignment(STYLE, (), "Style", klass)
 
         if op.font_size:
             size = WordFormatter.size_to_points(op.font_size)
             if size:
-                element_range.Font.Size = size
+                yield FormatAssignment(RANGE, ("Font",), "Size", size)
 
         if op.color:
             col = WordFormatter.style_to_wdcolor(op.color)
             if col:
-                element_range.Font.Color = col
+                yield FormatAssignment(RANGE, ("Font",), "Color", col)
 
         if op.text_decoration == "underline":
-            element_range.Font.UnderlineColor = self.constants.wdColorAutomatic
-            element_range.Font.Underline = self.constants.wdUnderlineSingle
+            yield FormatAssignment(RANGE, ("Font",), "UnderlineColor", constants.wdColorAutomatic)
+            yield FormatAssignment(RANGE, ("Font",), "Underline", constants.wdUnderlineSingle)
 
         if op.margin:
-            if op.margin["left"] == "auto" and op.margin["right"] == "auto":
-                if not isinstance(parent_operation, Table):
-                    # We don't want to center a table.
-                    element_range.ParagraphFormat.Alignment = self.constants.wdAlignParagraphCenter
+            # We don't want to center a table.
+            if op.margin["left"] == "auto" and op.margin["right"] == "auto" and not is_table:
+                yield FormatAssignment(RANGE, ("ParagraphFormat",), "Alignment", constants.wdAlignParagraphCenter)
 
-            if op.margin["left"] != 'auto':
-                if isinstance(parent_operation, Table):
-                    parent_operation.render.table.Rows.LeftIndent = WordFormatter.size_to_points(op.margin["left"])
+            if op.margin["left"] != 'auto' and is_table:
+                yield FormatAssignment(TABLE, ("Rows",), "LeftIndent", WordFormatter.size_to_points(op.margin["left"]))
 
         if op.background:
             background = op.background.split(" ")[0]
-            # This needs refactoring :/
-            if isinstance(parent_operation, Table):
+            if is_table or is_cell or op.display == 'block':
+                # Tables, cells and block elements with a background get a Shading.BackgroundPatternColor
                 bg_color = WordFormatter.style_to_wdcolor(background)
                 if bg_color:
-                    parent_operation.render.table.Shading.BackgroundPatternColor = bg_color
-            elif isinstance(parent_operation, TableCell):
-                bg_color = WordFormatter.style_to_wdcolor(background)
-                if bg_color:
-                    parent_operation.render.cell_object.Shading.BackgroundPatternColor = bg_color
+                    target = TABLE if is_table else CELL if is_cell else RANGE
+                    yield FormatAssignment(target, ("Shading",), "BackgroundPatternColor", bg_color)
             else:
-                if op.display == 'block':
-                    # If it's a block element with a background then we set the Shading.BackgroundPatternColor
-                    bg_color = WordFormatter.style_to_wdcolor(background)
-                    if bg_color:
-                        element_range.Shading.BackgroundPatternColor = bg_color
-                else:
-                    bg_color = WordFormatter.style_to_highlight_wdcolor(background, self.constants)
-                    if bg_color:
-                        element_range.HighlightColorIndex = bg_color
-
-        if op.vertical_align:
-            if isinstance(parent_operation, TableCell):
-                alignment = {
-                    'top': self.constants.wdCellAlignVerticalTop,
-                    'middle': self.constants.wdCellAlignVerticalCenter,
-                    'bottom': self.constants.wdCellAlignVerticalBottom
-                }
-                if op.vertical_align in alignment:
-                    parent_operation.render.cell_object.VerticalAlignment = alignment[op.vertical_align]
+                bg_color = WordFormatter.style_to_highlight_wdcolor(background, constants)
+                if bg_color:
+                    yield FormatAssignment(RANGE, (), "HighlightColorIndex", bg_color)
 
-        if op.text_align:
+        if op.vertical_align and is_cell:
             alignment = {
-                'center': self.constants.wdAlignParagraphCenter,
-                'left': self.constants.wdAlignParagraphLeft,
-                'right': self.constants.wdAlignParagraphRight
+                'top': constants.wdCellAlignVerticalTop,
+                'middle': constants.wdCellAlignVerticalCenter,
+                'bottom': constants.wdCellAlignVerticalBottom
             }
+            if op.vertical_align in alignment:
+                yield FormatAssignment(CELL, (), "VerticalAlignment", alignment[op.vertical_align])
 
+        if op.text_align:
+            alignment = {
+                'center': constants.wdAlignParagraphCenter,
+                'left': constants.wdAlignParagraphLeft,
+                'right': constants.wdAlignParagraphRight
+            }
             if op.text_align in alignment:
-                element_range.ParagraphFormat.Alignment = alignment[op.text_align]
+                yield FormatAssignment(RANGE, ("ParagraphFormat",), "Alignment", alignment[op.text_align])
 
-        if op.writing_mode:
-            orientations = {"vertical-lr": 1, "sideways-lr": 2}
-            if isinstance(parent_operation, TableCell):
-                orientation = orientations.get(op.writing_mode)
-                if orientation is not None:
-                    parent_operation.render.cell_object.Range.Orientation = orientation
+        if op.writing_mode and is_cell:
+            orientation = {"vertical-lr": 1, "sideways-lr": 2}.get(op.writing_mode)
+            if orientation is not None:
+                yield FormatAssignment(CELL, ("Range",), "Orientation", orientation)
 
         if op.border:
-            if isinstance(parent_operation, Image):
-                img = parent_operation.render.image
-                img.Line.Visible = True
-
-                if op.border["style"]:
-                    style = op.border["style"]
-                    constants = {
-                        "solid": self.constants.msoLineSolid,
-                    }
-
-                    if style in constants:
-                        img.Line.DashStyle = constants[style]
-
-                if op.border["width"]:
-                    width = WordFormatter.size_to_points(op.border["width"])
-                    if width:
-                        img.Line.Weight = width
-
-                if op.border["color"]:
-                    color = WordFormatter.style_to_wdcolor(op.border["color"])
-                    if color:
-                        img.Line.ForeColor.RGB = color
-
-            if isinstance(parent_operation, (Table, TableRow, TableCell)):
-                edges = {
-                    "bottom": self.constants.wdBorderBottom,
-                    "top":  self.constants.wdBorderTop,
-                    "left": self.constants.wdBorderLeft,
-                    "right": self.constants.wdBorderRight,
-                }
-
-                # TODO: Support individual border-left, border-right, border-top and border-bottom properties
-                borders = {edge: element_range.Borders(constant) for edge, constant in edges.items()}
-
-                if op.border["style"]:
-                    style = op.border["style"]
-                    constants = {
-                        "none": self.constants.wdLineStyleNone,
-                        "solid": self.constants.wdLineStyleSingle,
-                        "dotted": self.constants.wdLineStyleDot,
-                        "dashed": self.constants.wdLineStyleDashSmallGap,
-                        "double": self.constants.wdLineStyleDouble,
-                        "inset": self.constants.wdLineStyleInset,
-                        "outset": self.constants.wdLineStyleOutset,
-                        "initial": self.word.Options.DefaultBorderLineStyle,
-                    }
-
-                    if style in constants:
-                        for border in borders.values():
-                            border.LineStyle = constants[style]
-
-                if op.border["width"]:
-                    width = WordFormatter.size_to_points(op.border["width"])
-                    # Numbers? Where we are going we don't need numbers
-                    constants = {
-                        0.25: self.constants.wdLineWidth025pt,
-                        0.5: self.constants.wdLineWidth050pt,
-                        0.75: self.constants.wdLineWidth075pt,
-                        1: self.constants.wdLineWidth100pt,
-                        1.5: self.constants.wdLineWidth150pt,
-                        2.25: self.constants.wdLineWidth225pt,
-                        3: self.constants.wdLineWidth300pt,
-                        4.5: self.constants.wdLineWidth450pt,
-                        6: self.constants.wdLineWidth600pt,
-                    }
-                    if width in constants:
-                        for border in borders.values():
-                            border.LineWidth = constants[width]
-
-                if op.border["color"]:
-                    color = WordFormatter.style_to_wdcolor(op.border["color"])
-                    if color:
-                        for border in borders.values():
-                            border.Color = color
+            yield from self._compile_border(op.border, parent_class)
 
         if op.padding:
-            if op.padding['top']:
-                px = WordFormatter.size_to_points(op.padding['top'])
-                if px is not None:
-                    if isinstance(parent_operation, Table):
-                        parent_operation.render.table.TopPadding = px
-                    elif isinstance(parent_operation, TableCell):
-                        parent_operation.render.cell_object.TopPadding = px
-                    else:
-                        element_range.ParagraphFormat.SpaceBefore = px
-
-            if op.padding['bottom']:
-                px = WordFormatter.size_to_points(op.padding['bottom'])
-                if px is not None:
-                    if isinstance(parent_operation, Table):
-                        parent_operation.render.table.BottomPadding = px
-                    elif isinstance(parent_operation, TableCell):
-                        parent_operation.render.cell_object.BottomPadding = px
-                    else:
-                        element_range.ParagraphFormat.SpaceAfter = px
-
-            if op.padding['left']:
-                px = WordFormatter.size_to_points(op.padding['left'])
-                if px is not None:
-                    if isinstance(parent_operation, Table):
-                        parent_operation.render.table.LeftPadding = px
-                    elif isinstance(parent_operation, TableCell):
-                        parent_operation.render.cell_object.LeftPadding = px
-
-            if op.padding['right']:
-                px = WordFormatter.size_to_points(op.padding['right'])
-                if px is not None:
-                    if isinstance(parent_operation, Table):
-                        parent_operation.render.table.RightPadding = px
-                    elif isinstance(parent_operation, TableCell):
-                        parent_operation.render.cell_object.RightPadding = px
+            yield from self._compile_padding(op.padding, is_table, is_cell)
 
         if op.line_height:
             if op.line_height.isdecimal():
@@ -794,4 +1276,81 @@ class COMRenderer(BaseRenderer):
                 points = self.word.LinesToPoints(Decimal(op.line_height.split('%')[0]) / 100)
             else:
                 points = WordFormatter.size_to_points(op.line_height)
-            element_range.ParagraphFormat.LineSpacing = points
+            yield FormatAssignment(RANGE, ("ParagraphFormat",), "LineSpacing", points)
+
+    def _compile_border(self, border, parent_class):
+        constants = self.constants
+
+        if issubclass(parent_class, Image):
+            yield FormatAssignment(IMAGE, ("Line",), "Visible", True)
+
+            if border["style"] == "solid":
+                yield FormatAssignment(IMAGE, ("Line",), "DashStyle", constants.msoLineSolid)
+
+            if border["width"]:
+                width = WordFormatter.size_to_points(border["width"])
+                if width:
+                    yield FormatAssignment(IMAGE, ("Line",), "Weight", width)
+
+            if border["color"]:
+                color = WordFormatter.style_to_wdcolor(border["color"])
+                if color:
+                    yield FormatAssignment(IMAGE, ("Line", "ForeColor"), "RGB", color)
+
+        if not issubclass(parent_class, (Table, TableRow, TableCell)):
+            return
+
+        # TODO: Support individual border-left, border-right, border-top and border-bottom properties
+        if border["style"]:
+            styles = {
+                "none": constants.wdLineStyleNone,
+                "solid": constants.wdLineStyleSingle,
+                "dotted": constants.wdLineStyleDot,
+                "dashed": constants.wdLineStyleDashSmallGap,
+                "double": constants.wdLineStyleDouble,
+                "inset": constants.wdLineStyleInset,
+                "outset": constants.wdLineStyleOutset,
+            }
+
+            if border["style"] in styles:
+                yield FormatAssignment(BORDERS, (), "LineStyle", styles[border["style"]])
+            elif border["style"] == "initial":
+                yield FormatAssignment(BORDERS, (), "LineStyle", self.word.Options.DefaultBorderLineStyle)
+
+        if border["width"]:
+            width = WordFormatter.size_to_points(border["width"])
+            # Numbers? Where we are going we don't need numbers
+            widths = {
+                0.25: constants.wdLineWidth025pt,
+                0.5: constants.wdLineWidth050pt,
+                0.75: constants.wdLineWidth075pt,
+                1: constants.wdLineWidth100pt,
+                1.5: constants.wdLineWidth150pt,
+                2.25: constants.wdLineWidth225pt,
+                3: constants.wdLineWidth300pt,
+                4.5: constants.wdLineWidth450pt,
+                6: constants.wdLineWidth600pt,
+            }
+            if width in widths:
+                yield FormatAssignment(BORDERS, (), "LineWidth", widths[width])
+
+        if border["color"]:
+            color = WordFormatter.style_to_wdcolor(border["color"])
+            if color:
+                yield FormatAssignment(BORDERS, (), "Color", color)
+
+    def _compile_padding(self, padding, is_table, is_cell):
+        # Tables and cells have padding on every side, other elements only have space before and after paragraphs
+        for side, paragraph_property in (("top", "SpaceBefore"), ("bottom", "SpaceAfter"),
+                                         ("left", None), ("right", None)):
+            if not padding[side]:
+                continue
+
+            px = WordFormatter.size_to_points(padding[side])
+            if px is None:
+                continue
+
+            if is_table or is_cell:
+                yield FormatAssignment(TABLE if is_table else CELL, (), side.capitalize() + "Padding", px)
+            elif paragraph_property is not None:
+                yield FormatAssignment(RANGE, ("ParagraphFormat",), paragraph_property, px)
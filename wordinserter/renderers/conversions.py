@@ -0,0 +1,152 @@
+"""
+Conversions from CSS values to the values Word expects.
+
+Documents tend to repeat the same handful of colors and sizes on every element, so each conversion is memoized on the
+raw CSS string and named colors are looked up in a table built once at import time. The `*_batch` functions convert
+a sequence of values at once.
+"""
+import colorsys
+import re
+from functools import lru_cache
+
+import webcolors
+
+if hasattr(webcolors, "names"):
+    _NAMED_HEX = {name: webcolors.name_to_hex(name) for name in webcolors.names("css3")}
+else:  # webcolors < 1.13, whose mapping is named css3_names_to_hex before 1.11
+    _NAMED_HEX = dict(getattr(webcolors, "CSS3_NAMES_TO_HEX", None) or webcolors.css3_names_to_hex)
+
+
+def rgb_to_wdcolor(red, green, blue):
+    """
+    Word's wdColor values are BGR integers
+    """
+    return int(red) + 0x100 * int(green) + 0x10000 * int(blue)
+
+
+def _hex_to_rgb(value):
+    value = value.lstrip("#")
+    if len(value) in (3, 4):
+        value = "".join(character * 2 for character in value[:3])
+    elif len(value) in (6, 8):
+        value = value[:6]
+    else:
+        raise ValueError(value)
+
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+
+NAMED_COLORS = {name: rgb_to_wdcolor(*_hex_to_rgb(value)) for name, value in _NAMED_HEX.items()}
+
+_FUNCTION_REGEX = re.compile(r"^(rgba?|hsla?)\((.*)\)$")
+# The # is required, or words made of hex digits ("face", "bad") would be colors
+_HEX_REGEX = re.compile(r"^#([0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})$")
+
+
+def _channel(value):
+    if value.endswith("%"):
+        return max(0.0, min(float(value[:-1]), 100.0)) * 255 / 100
+    return max(0.0, min(float(value), 255.0))
+
+
+def _function_to_rgb(name, arguments):
+    # Both the legacy comma separated syntax and the space separated one, with an optional "/ alpha"
+    arguments = arguments.replace("/", " ").replace(",", " ").split()
+    if len(arguments) not in (3, 4):
+        raise ValueError(arguments)
+
+    if name.startswith("rgb"):
+        return tuple(round(_channel(value)) for value in arguments[:3])
+
+    hue = float(arguments[0].replace("deg", "")) % 360 / 360
+    saturation, lightness = (max(0.0, min(float(value.rstrip("%")), 100.0)) / 100 for value in arguments[1:3])
+    return tuple(round(channel * 255) for channel in colorsys.hls_to_rgb(hue, lightness, saturation))
+
+
+@lru_cache(maxsize=1024)
+def _css_color_to_wdcolor(value):
+    value = value.strip().lower()
+
+    if value in NAMED_COLORS:
+        return NAMED_COLORS[value]
+
+    try:
+        match = _FUNCTION_REGEX.match(value)
+        if match is not None:
+            return rgb_to_wdcolor(*_function_to_rgb(*match.groups()))
+
+        if _HEX_REGEX.match(value):
+            return rgb_to_wdcolor(*_hex_to_rgb(value))
+    except ValueError:
+        pass
+
+    return None
+
+
+def css_color_to_wdcolor(value):
+    """
+    Convert any CSS color (a name, #rgb, #rrggbb, rgb(), rgba(), hsl() or hsla()) to a wdColor. Alpha is ignored,
+    Word has no transparency.
+    :return: An integer, or None for "none", "transparent" and colors that can't be parsed
+    """
+    if not isinstance(value, str):
+        return None
+
+    return _css_color_to_wdcolor(value)
+
+
+# Points per unit. em and rem are relative to Word's default 12pt font, px are 96 per inch. Percentages depend on what
+# the length is a percentage of, so they are only converted when the caller gives that length.
+POINTS_PER_UNIT = {
+    "pt": 1.0,
+    "px": 0.75,
+    "in": 72.0,
+    "cm": 72 / 2.54,
+    "mm": 72 / 25.4,
+    "pc": 12.0,
+    "em": 12.0,
+    "rem": 12.0,
+}
+
+_LENGTH_REGEX = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+))\s*([a-z%]*)$")
+
+
+@lru_cache(maxsize=1024)
+def _css_length_to_points(value, percent_of):
+    match = _LENGTH_REGEX.match(value.strip().lower())
+    if match is None:
+        return None
+
+    number, unit = match.groups()
+
+    if unit in ("", "px"):
+        # Pixels are rounded to whole pixels first, as browsers do
+        return round(float(number)) * 0.75
+
+    if unit == "%":
+        return None if percent_of is None else float(number) * percent_of / 100
+
+    if unit not in POINTS_PER_UNIT:
+        return None
+
+    return float(number) * POINTS_PER_UNIT[unit]
+
+
+def css_length_to_points(value, percent_of=None):
+    """
+    Convert a CSS length (px, pt, em, rem, %, cm, mm, in or pc) to points. Unitless strings and numbers are pixels.
+    :param percent_of: The length in points a percentage is relative to. Percentages are None without it.
+    :return: A number of points, or None if the value can't be parsed
+    """
+    if isinstance(value, str):
+        return _css_length_to_points(value, percent_of)
+
+    return value * 0.75
+
+
+def css_colors_to_wdcolor_batch(values):
+    return [css_color_to_wdcolor(value) for value in values]
+
+
+def css_lengths_to_points_batch(values):
+    return [css_length_to_points(value) for value in values]
@@ -0,0 +1,333 @@
+"""
+A fake Word COM backend for running renderers without Word.
+
+`FakeDocument` models just enough of the Word object model for `COMRenderer` to run against it: a text buffer with a
+selection, ranges that move as text is inserted or deleted before them, tables, bookmarks, styles, a page setup and a
+log of every property set and method call made on it. Every other attribute is a `FakeObject` that accepts anything.
+It is intended for tests and for measuring how many COM calls a document needs, not for producing documents.
+
+    document = FakeDocument()
+    insert(operations, document=document, constants=FakeConstants())
+    print(document.text, len(document.calls))
+"""
+import weakref
+
+
+class FakeConstants(object):
+    """
+    Every constant is its own name, so `constants.wdPageBreak == "wdPageBreak"`
+    """
+    def __getattr__(self, item):
+        if item.startswith("__"):
+            raise AttributeError(item)
+        return item
+
+
+class FakeObject(object):
+    """
+    Any object in the Word object model. Attributes are created on demand and property sets and method calls are
+    recorded on the document.
+    """
+    def __init__(self, document, path):
+        object.__setattr__(self, "_document", document)
+        object.__setattr__(self, "_path", path)
+        object.__setattr__(self, "_attributes", {})
+
+    def __getattr__(self, item):
+        if item.startswith("__"):
+            raise AttributeError(item)
+
+        attributes = self._attributes
+        if item not in attributes:
+            attributes[item] = FakeObject(self._document, self._path + "." + item)
+        return attributes[item]
+
+    def __setattr__(self, key, value):
+        self._document.record("set", self._path + "." + key, value)
+        self._attributes[key] = value
+
+    def __call__(self, *args, **kwargs):
+        self._document.record("call", self._path, *args, **kwargs)
+        return FakeObject(self._document, self._path + "()")
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return "<FakeObject {0}>".format(self._path)
+
+
+class FakeRange(FakeObject):
+    def __init__(self, document, start, end, path="Range"):
+        super().__init__(document, path)
+        object.__setattr__(self, "Start", start)
+        object.__setattr__(self, "End", end)
+        document._ranges.add(self)
+
+    @property
+    def Duplicate(self):
+        return FakeRange(self._document, self.Start, self.End)
+
+    @property
+    def Range(self):
+        return FakeRange(self._document, self.Start, self.End)
+
+    @property
+    def Text(self):
+        return self._document.text[self.Start:self.End]
+
+    def SetRange(self, start, end):
+        self._document.record("call", self._path + ".SetRange", start, end)
+        object.__setattr__(self, "Start", start)
+        object.__setattr__(self, "End", end)
+
+    def Select(self):
+        self._document.record("call", self._path + ".Select")
+        self._document.selection.SetRange(self.Start, self.End)
+
+    select = Select
+
+    def Collapse(self, Direction=None):
+        self._document.record("call", self._path + ".Collapse", Direction=Direction)
+        position = self.End if Direction == "wdCollapseEnd" else self.Start
+        object.__setattr__(self, "Start", position)
+        object.__setattr__(self, "End", position)
+
+    def Delete(self):
+        self._document.record("call", self._path + ".Delete")
+        self._document.delete(self.Start, self.End)
+
+    def _move(self, start, end):
+        object.__setattr__(self, "Start", start)
+        object.__setattr__(self, "End", end)
+
+    def __repr__(self):
+        return "<FakeRange {0}-{1}>".format(self.Start, self.End)
+
+
+class FakeSelection(FakeRange):
+    def __init__(self, document):
+        super().__init__(document, 0, 0, path="Selection")
+
+    def TypeText(self, text):
+        self._document.record("call", "Selection.TypeText", text)
+        self._type(text)
+
+    def TypeParagraph(self):
+        self._document.record("call", "Selection.TypeParagraph")
+        self._type("\r")
+
+    def InsertRowsBelow(self, NumRows=1):
+        self._document.record("call", "Selection.InsertRowsBelow", NumRows)
+        row = self._document.selected_row
+        rows = row.table.Rows._items
+        index = rows.index(row) + 1
+        rows[index:index] = [FakeRow(self._document, row.table, len(row.Cells)) for _ in range(NumRows)]
+
+    def InsertBreak(self, break_type=None):
+        self._document.record("call", "Selection.InsertBreak", break_type)
+        self._type("\x0c")
+
+    def MoveRight(self, *args, **kwargs):
+        self._document.record("call", "Selection.MoveRight", *args, **kwargs)
+        position = min(self.End + 1, len(self._document.text))
+        self._move(position, position)
+
+    def _type(self, text):
+        if self.End != self.Start:
+            self._document.delete(self.Start, self.End)
+        self._document.insert(self.Start, text)
+
+    @property
+    def Tables(self):
+        return FakeTables(self._document)
+
+
+class FakeTables(FakeObject):
+    def __init__(self, document):
+        super().__init__(document, "Tables")
+
+    def Add(self, rng, NumRows, NumColumns, **kwargs):
+        self._document.record("call", "Tables.Add", rng, NumRows=NumRows, NumColumns=NumColumns, **kwargs)
+        return FakeTable(self._document, NumRows, NumColumns)
+
+
+class FakeTable(FakeObject):
+    def __init__(self, document, rows, columns):
+        super().__init__(document, "Table")
+        object.__setattr__(self, "Rows", FakeCollection(
+            document, "Table.Rows", [FakeRow(document, self, columns) for _ in range(rows)]
+        ))
+
+    def Select(self):
+        self._document.record("call", "Table.Select")
+
+
+class FakeRow(FakeObject):
+    def __init__(self, document, table, columns):
+        super().__init__(document, "Row")
+        object.__setattr__(self, "table", table)
+        object.__setattr__(self, "Cells", FakeCollection(
+            document, "Row.Cells", [FakeCell(document) for _ in range(columns)]
+        ))
+
+    def Select(self):
+        self._document.record("call", "Row.Select")
+        object.__setattr__(self._document, "selected_row", self)
+
+
+class FakeCell(FakeObject):
+    def __init__(self, document):
+        super().__init__(document, "Cell")
+
+    @property
+    def Range(self):
+        # Cells are not modelled as separate positions in the text, their content is typed wherever the selection is
+        selection = self._document.selection
+        return FakeRange(self._document, selection.End, selection.End, path="Cell.Range")
+
+    def Merge(self, MergeTo):
+        self._document.record("call", "Cell.Merge", MergeTo=MergeTo)
+
+
+class FakeCollection(FakeObject):
+    """
+    A 1-indexed collection that can be called, iterated and measured like a COM collection
+    """
+    def __init__(self, document, path, items):
+        super().__init__(document, path)
+        object.__setattr__(self, "_items", items)
+
+    def __call__(self, index):
+        return self._items[index - 1]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+
+class FakeBookmark(FakeObject):
+    def __init__(self, document, name, rng):
+        super().__init__(document, "Bookmark")
+        object.__setattr__(self, "Name", name)
+        object.__setattr__(self, "Range", FakeRange(document, rng.Start, rng.End, path="Bookmark.Range"))
+
+    def Delete(self):
+        self._document.record("call", "Bookmark.Delete", self.Name)
+        self._document.Bookmarks._items.remove(self)
+
+
+class FakeBookmarks(FakeCollection):
+    def __init__(self, document):
+        super().__init__(document, "Bookmarks", [])
+
+    def Add(self, Name, Range):
+        self._document.record("call", "Bookmarks.Add", Name, Range)
+        bookmark = FakeBookmark(self._document, Name, Range)
+        self._items.append(bookmark)
+        return bookmark
+
+    def __call__(self, name):
+        for bookmark in self._items:
+            if bookmark.Name == name:
+                return bookmark
+        raise KeyError(name)
+
+    def Exists(self, name):
+        return any(bookmark.Name == name for bookmark in self._items)
+
+
+class FakeStyle(FakeObject):
+    def __init__(self, document, name):
+        super().__init__(document, "Style")
+        object.__setattr__(self, "NameLocal", name)
+
+
+class FakeStyles(FakeCollection):
+    """
+    The document's styles: Word's common built-in styles plus any that are added. Like Word, names are looked up
+    without regard to case, and looking up a style that doesn't exist raises an error.
+    """
+    BUILT_IN = ("Normal", "No Spacing", "Caption", "Title", "Subtitle", "Quote", "Intense Quote", "List Paragraph",
+                "Hyperlink", "Footnote Text", "Strong", "Emphasis", "Table Grid") + \
+        tuple("Heading {0}".format(level) for level in range(1, 10))
+
+    def __init__(self, document):
+        super().__init__(document, "Document.Styles", [FakeStyle(document, name) for name in self.BUILT_IN])
+
+    def Add(self, Name, Type=None):
+        self._document.record("call", "Document.Styles.Add", Name=Name, Type=Type)
+        style = FakeStyle(self._document, Name)
+        self._items.append(style)
+        return style
+
+    def __call__(self, name):
+        self._document.record("call", "Document.Styles", name)
+        for style in self._items:
+            if style.NameLocal.lower() == str(name).lower():
+                return style
+        raise KeyError(name)
+
+
+class FakeDocument(FakeObject):
+    def __init__(self):
+        super().__init__(self, "Document")
+        object.__setattr__(self, "calls", [])
+        object.__setattr__(self, "text", "")
+        object.__setattr__(self, "_ranges", weakref.WeakSet())
+        object.__setattr__(self, "selection", FakeSelection(self))
+        object.__setattr__(self, "Application", FakeObject(self, "Application"))
+        object.__setattr__(self, "ActiveWindow", FakeObject(self, "ActiveWindow"))
+        object.__setattr__(self, "Bookmarks", FakeBookmarks(self))
+        object.__setattr__(self, "Styles", FakeStyles(self))
+        object.__setattr__(self, "PageSetup", FakeObject(self, "Document.PageSetup"))
+        # A Letter page with one inch margins
+        self.PageSetup._attributes.update(PageWidth=612.0, LeftMargin=72.0, RightMargin=72.0)
+        object.__setattr__(self, "selected_row", None)
+        object.__setattr__(self.ActiveWindow, "Selection", self.selection)
+
+    def record(self, kind, path, *args, **kwargs):
+        self.calls.append((kind, path, args, kwargs))
+
+    def Range(self, Start=0, End=0):
+        return FakeRange(self, Start, End)
+
+    def insert(self, position, text):
+        object.__setattr__(self, "text", self.text[:position] + text + self.text[position:])
+        length = len(text)
+
+        for rng in list(self._ranges):
+            if rng is self.selection:
+                continue
+            # Ranges that start at the insertion point only move if they are not collapsed, which keeps ranges
+            # captured before typing (see COMRenderer.get_range) anchored to the start of the new text.
+            moves_start = rng.Start > position or (rng.Start == position and rng.End > rng.Start)
+            rng._move(
+                rng.Start + length if moves_start else rng.Start,
+                rng.End + length if rng.End > position else rng.End,
+            )
+
+        end = position + length
+        self.selection._move(end, end)
+
+    def delete(self, start, end):
+        object.__setattr__(self, "text", self.text[:start] + self.text[end:])
+        length = end - start
+
+        for rng in list(self._ranges):
+            rng._move(
+                rng.Start - min(max(rng.Start - start, 0), length),
+                rng.End - min(max(rng.End - start, 0), length),
+            )
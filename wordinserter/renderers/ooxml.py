@@ -0,0 +1,733 @@
+"""
+Renders operations to a WordprocessingML (.docx) package without Word.
+
+Top-level blocks of the document don't share any state apart from list numbering, relationships (hyperlinks and
+images) and bookmark ids, so they can be rendered independently. The renderer writes placeholders like
+`w:numId="@num:1"` for those, numbered from 1 within the blocks it rendered, and collects the matching definitions in
+a `Fragment`. `merge_fragments` then joins the fragments in order and rewrites every placeholder to a document-wide
+id. With `processes` set, the blocks are split into chunks that are rendered into fragments on a process pool:
+
+    insert(operations, renderer="ooxml", path="report.docx", processes=8)
+
+Formatting is limited to what WordprocessingML can express without styles from a template: bold, italic, underline,
+the code font, color, font size and text alignment. Footnotes are not rendered.
+"""
+import itertools
+import multiprocessing
+import pickle
+import re
+import sys
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+from . import BaseRenderer, renders
+from ..incremental import top_level_blocks
+from ..operations import (BaseList, Bold, BlockParagraph, BulletList,
+                          ChildlessOperation, CodeBlock, Footnote, Group,
+                          Heading, HyperLink, Image, InlineCode, Italic,
+                          LineBreak, ListElement, NumberedList, Paragraph,
+                          Span, Style, Table, TableCell, TableRow, Text,
+                          UnderLine)
+from ..profiling import record
+from .conversions import css_color_to_wdcolor, css_length_to_points
+from .run_properties import RunProperties
+
+# Operations that start a new paragraph. Chunks are only split before one of these, so runs of inline operations at
+# the top level end up in the same paragraph whether or not the document is rendered in parallel.
+BLOCK_OPERATIONS = (Paragraph, BlockParagraph, Heading, Style, CodeBlock, BaseList, Table)
+
+NUMBER_FORMATS = {
+    None: "decimal",
+    "roman-lowercase": "lowerRoman",
+    "roman-uppercase": "upperRoman",
+}
+
+ALIGNMENTS = {"left": "left", "center": "center", "right": "right", "justify": "both"}
+
+IMAGE_TYPES = [
+    (b"\x89PNG", "png", "image/png"),
+    (b"\xff\xd8", "jpeg", "image/jpeg"),
+    (b"GIF8", "gif", "image/gif"),
+    (b"BM", "bmp", "image/bmp"),
+]
+
+# The placeholder ids written by the renderer, as `"@kind:local id"`. Text and attribute values are always escaped
+# with &quot; so this can't match document content.
+_PLACEHOLDER_REGEX = re.compile(r'"@(num|rel|bm|shape):(\d+)"')
+
+# rId1 and rId2 are the styles and numbering parts
+_RESERVED_RELATIONSHIPS = 2
+
+NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture"'
+)
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+RELATIONSHIP_TYPES = {
+    "hyperlink": "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink",
+    "image": "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image",
+    "styles": "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles",
+    "numbering": "http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering",
+}
+
+STYLES = XML_DECLARATION + (
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/>'
+    '<w:pPr><w:spacing w:after="160" w:line="259" w:lineRule="auto"/></w:pPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="NoSpacing"><w:name w:val="No Spacing"/><w:basedOn w:val="Normal"/>'
+    '<w:pPr><w:spacing w:after="0" w:line="240" w:lineRule="auto"/></w:pPr></w:style>'
+    '{headings}'
+    '<w:style w:type="character" w:styleId="Hyperlink"><w:name w:val="Hyperlink"/>'
+    '<w:rPr><w:color w:val="0563C1"/><w:u w:val="single"/></w:rPr></w:style>'
+    '<w:style w:type="table" w:styleId="TableGrid"><w:name w:val="Table Grid"/><w:tblPr><w:tblBorders>'
+    '<w:top w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:left w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:bottom w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:right w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:insideH w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:insideV w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '</w:tblBorders></w:tblPr></w:style>'
+    '</w:styles>'
+).format(headings="".join(
+    '<w:style w:type="paragraph" w:styleId="Heading{0}"><w:name w:val="heading {0}"/><w:basedOn w:val="Normal"/>'
+    '<w:next w:val="Normal"/><w:pPr><w:keepNext/><w:spacing w:before="240" w:after="60"/>'
+    '<w:outlineLvl w:val="{1}"/></w:pPr><w:rPr><w:b/><w:sz w:val="{2}"/></w:rPr></w:style>'.format(
+        level, level - 1, 36 - 4 * level)
+    for level in range(1, 7)
+))
+
+Fragment = namedtuple("Fragment", ["xml", "lists", "relationships", "counts"])
+Fragment.__doc__ = """
+The WordprocessingML for some blocks of a document.
+:param xml: Body content with placeholder ids
+:param lists: A dict of level -> numFmt for each list, in order of their local ids
+:param relationships: A (type, target, data) tuple for each relationship, in order of their local ids
+:param counts: The number of each other kind of placeholder id used
+"""
+
+
+# Characters outside of XML 1.0's Char production, such as most control characters. Word won't open a document
+# containing them, even as character references.
+_INVALID_XML_REGEX = re.compile("[^\t\n\r\u0020-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]")
+
+
+def _escape(text):
+    return escape(_INVALID_XML_REGEX.sub("", text), {'"': "&quot;"})
+
+
+def _image_type(data):
+    for magic, extension, content_type in IMAGE_TYPES:
+        if data.startswith(magic):
+            return extension, content_type
+
+    return None
+
+
+class OOXMLRenderer(BaseRenderer):
+    """
+    :param path: Write the rendered .docx package to this path
+    :param processes: Render chunks of top-level blocks on a pool of this many processes. None renders in this process.
+    :param chunk_size: The number of top-level blocks in each chunk. Defaults to 4 chunks per process.
+    :param executor: An existing concurrent.futures executor to render chunks on, instead of creating a pool
+    :param hooks: Hooks run for each operation. They are sent to the worker processes, so when rendering on a process
+                  pool they have to be picklable: module level functions rather than lambdas or nested functions.
+    """
+    def __init__(self, path=None, processes=None, chunk_size=None, executor=None, debug=False, hooks=None,
+                 profiler=None):
+        super().__init__(debug=debug, hooks=hooks, profiler=profiler)
+        self.path = path
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.executor = executor
+        self.package = None
+
+        self.run_properties = RunProperties()
+        self._parts = []
+        self._paragraph_open = False
+        # Paragraph properties for the paragraphs opened by the innermost block, see _open_paragraph
+        self._paragraph_properties = [{}]
+        # The color and size of the runs in each operation being rendered, None if it doesn't set either
+        self._run_formats = []
+        self._run_styles = []
+        self._list_ids = []
+
+        self._lists = []
+        self._relationships = []
+        self._counts = {"bm": 0, "shape": 0}
+
+    def render(self, operations, *args, **kwargs):
+        with record(self.profiler, "renderer", "render"):
+            if self.processes is None and self.executor is None:
+                fragments = [self.render_fragment(operations)]
+            else:
+                fragments = self._render_parallel(operations)
+
+            with record(self.profiler, "renderer", "merge_fragments"):
+                self.package = merge_fragments(fragments)
+
+            if self.path is not None:
+                self.package.save(self.path)
+
+        return self.package
+
+    def render_fragment(self, operations):
+        """
+        Render `operations` into a Fragment, with ids numbered from 1
+        """
+        self._render(operations.children if isinstance(operations, Group) else operations)
+        self._close_paragraph()
+
+        return Fragment("".join(self._parts), self._lists, self._relationships, dict(self._counts))
+
+    def _render_parallel(self, operations):
+        global _shared_blocks
+
+        blocks = top_level_blocks(operations) if isinstance(operations, Group) else list(operations)
+        chunks = split_blocks(blocks, self.chunk_size or max(1, len(blocks) // ((self.processes or 1) * 4)))
+        if self.executor is None or isinstance(self.executor, ProcessPoolExecutor):
+            _check_picklable_hooks(self.hooks)
+        hooks = itertools.repeat(self.hooks)
+
+        with record(self.profiler, "renderer", "render_chunks"):
+            if self.executor is not None:
+                return list(self.executor.map(_render_chunk, [_pickle_detached(chunk) for chunk in chunks], hooks))
+
+            context = _fork_context()
+            if context is None:
+                with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                    return list(executor.map(_render_chunk, [_pickle_detached(chunk) for chunk in chunks], hooks))
+
+            # Forked workers inherit the operations, so only the bounds of each chunk have to be sent to them.
+            # Pickling the operations costs more than rendering them.
+            ends = list(itertools.accumulate(len(chunk) for chunk in chunks))
+            _shared_blocks = blocks
+            try:
+                with ProcessPoolExecutor(max_workers=self.processes, mp_context=context) as executor:
+                    return list(executor.map(_render_shared_chunk, [0] + ends[:-1], ends, hooks))
+            finally:
+                _shared_blocks = None
+
+    def enter_operation(self, frame):
+        operation = frame.operation
+
+        if isinstance(operation, ChildlessOperation):
+            return super().enter_operation(frame)
+
+        self._run_formats.append(self._run_format(operation))
+        return super().enter_operation(frame)
+
+    def exit_operation(self, frame):
+        super().exit_operation(frame)
+        self._run_formats.pop()
+
+    @staticmethod
+    def _run_format(operation):
+        format = operation.format
+        if format is None or not (format.color or format.font_size):
+            return None
+
+        color = css_color_to_wdcolor(format.color) if format.color else None
+        size = css_length_to_points(format.font_size) if format.font_size else None
+
+        if color is not None:
+            # wdColor values are BGR
+            color = "{0:02X}{1:02X}{2:02X}".format(color & 0xFF, (color >> 8) & 0xFF, color >> 16)
+
+        return color, size
+
+    def _write(self, xml):
+        self._parts.append(xml)
+
+    def _next_id(self, kind):
+        self._counts[kind] += 1
+        return self._counts[kind]
+
+    def _add_relationship(self, type, target, data=None):
+        self._relationships.append((type, target, data))
+        return len(self._relationships)
+
+    def _push_paragraph_properties(self, **properties):
+        current = dict(self._paragraph_properties[-1])
+        current.update((name, value) for name, value in properties.items() if value is not None)
+        self._paragraph_properties.append(current)
+
+    def _pop_paragraph_properties(self):
+        self._paragraph_properties.pop()
+
+    @staticmethod
+    def _alignment(operation):
+        if operation.format is None:
+            return None
+
+        return ALIGNMENTS.get(operation.format.text_align)
+
+    def _open_paragraph(self):
+        if self._paragraph_open:
+            return
+
+        properties = self._paragraph_properties[-1]
+        pPr = []
+
+        if "style" in properties:
+            pPr.append('<w:pStyle w:val="{0}"/>'.format(_escape(properties["style"])))
+
+        # Only the first paragraph of a list element is numbered, the rest are indented to line up with it. The
+        # numbering is a list shared with the properties of nested blocks, so it is only used once.
+        numbering = properties.get("numbering")
+        if numbering is not None:
+            if numbering[0] is not None:
+                pPr.append(numbering[0])
+                numbering[0] = None
+            else:
+                pPr.append(properties["indent"])
+
+        if "align" in properties:
+            pPr.append('<w:jc w:val="{0}"/>'.format(properties["align"]))
+
+        self._write("<w:p><w:pPr>{0}</w:pPr>".format("".join(pPr)) if pPr else "<w:p>")
+        self._paragraph_open = True
+
+    def _close_paragraph(self):
+        if self._paragraph_open:
+            self._write("</w:p>")
+            self._paragraph_open = False
+
+    def _ends_with_paragraph(self):
+        return self._paragraph_open or (self._parts and self._parts[-1] == "</w:p>")
+
+    def _run_properties(self, operation):
+        wanted = self.run_properties.wanted
+        rPr = []
+
+        if self._run_styles:
+            rPr.append('<w:rStyle w:val="{0}"/>'.format(_escape(self._run_styles[-1])))
+        if wanted["font_name"] is not None:
+            rPr.append('<w:rFonts w:ascii="{0}" w:hAnsi="{0}" w:cs="{0}"/>'.format(_escape(wanted["font_name"])))
+        if wanted["bold"]:
+            rPr.append("<w:b/>")
+        if wanted["italic"]:
+            rPr.append("<w:i/>")
+
+        color = size = None
+        for run_format in [self._run_format(operation)] + self._run_formats[::-1]:
+            if run_format is not None:
+                color = color or run_format[0]
+                size = size or run_format[1]
+
+        if color is not None:
+            rPr.append('<w:color w:val="{0}"/>'.format(color))
+        if size:
+            rPr.append('<w:sz w:val="{0}"/>'.format(int(size * 2)))
+        if wanted["underline"]:
+            rPr.append('<w:u w:val="single"/>')
+
+        return "<w:rPr>{0}</w:rPr>".format("".join(rPr)) if rPr else ""
+
+    @renders(Footnote)
+    def footnote(self, op: Footnote):
+        pass
+
+    @renders(Span)
+    def span(self, op: Span):
+        yield
+
+    @renders(Text)
+    def text(self, op: Text):
+        self._open_paragraph()
+        lines = [
+            '<w:t xml:space="preserve">{0}</w:t>'.format(_escape(line)) if line else ""
+            for line in op.text.split("\n")
+        ]
+        self._write("<w:r>{0}{1}</w:r>".format(self._run_properties(op), "<w:br/>".join(lines)))
+
+    @renders(LineBreak)
+    def linebreak(self, op: LineBreak):
+        self._open_paragraph()
+
+        if op.format is not None and op.format.page_break_after == "always":
+            self._write('<w:r><w:br w:type="page"/></w:r>')
+        else:
+            self._write("<w:r><w:br/></w:r>")
+
+    @renders(Bold)
+    def bold(self, op: Bold):
+        self.run_properties.push("bold")
+        yield
+        self.run_properties.pop("bold")
+
+    @renders(Italic)
+    def italic(self, op: Italic):
+        self.run_properties.push("italic")
+        yield
+        self.run_properties.pop("italic")
+
+    @renders(UnderLine)
+    def underline(self, op: UnderLine):
+        self.run_properties.push("underline")
+        yield
+        self.run_properties.pop("underline")
+
+    @renders(InlineCode)
+    def inline_code(self, op: InlineCode):
+        self.run_properties.push_font("Courier New")
+        yield
+        self.run_properties.pop_font()
+
+    @renders(Paragraph, BlockParagraph)
+    def paragraph(self, op):
+        self._close_paragraph()
+        self._push_paragraph_properties(align=self._alignment(op))
+        yield
+        self._open_paragraph()
+        self._close_paragraph()
+        self._pop_paragraph_properties()
+
+    @renders(Heading, Style)
+    def heading(self, op):
+        style = "Heading{0}".format(op.level) if isinstance(op, Heading) else op.name.replace(" ", "")
+
+        self._close_paragraph()
+        self._push_paragraph_properties(style=style, align=self._alignment(op))
+        self._open_paragraph()
+
+        bookmark = None
+        if op.id:
+            bookmark = self._next_id("bm")
+            self._write('<w:bookmarkStart w:id="@bm:{0}" w:name={1}/>'.format(bookmark, _quote(op.id)))
+
+        yield
+
+        if bookmark is not None:
+            self._write('<w:bookmarkEnd w:id="@bm:{0}"/>'.format(bookmark))
+
+        self._close_paragraph()
+        self._pop_paragraph_properties()
+
+    @renders(CodeBlock)
+    def code_block(self, op: CodeBlock):
+        self._close_paragraph()
+        self._push_paragraph_properties(style="NoSpacing")
+        self.run_properties.push_font("Courier New")
+
+        new_operations = op.highlighted_operations() if op.highlight else None
+        if new_operations:
+            yield self.new_operations(new_operations)
+        else:
+            yield
+
+        self._open_paragraph()
+        self._close_paragraph()
+        self.run_properties.pop_font()
+        self._pop_paragraph_properties()
+
+    @renders(HyperLink)
+    def hyperlink(self, op: HyperLink):
+        # Word field codes ('!' and '@' locations) can't be expressed without Word, the text is rendered on its own
+        if op.location.startswith('!') or op.location.startswith('@'):
+            yield
+            return
+
+        self._open_paragraph()
+
+        if op.location.startswith('#'):
+            self._write("<w:hyperlink w:anchor={0}>".format(_quote(op.location[1:])))
+        else:
+            relationship = self._add_relationship("hyperlink", op.location[:2048])
+            self._write('<w:hyperlink r:id="@rel:{0}">'.format(relationship))
+
+        self._run_styles.append("Hyperlink")
+        yield
+        self._run_styles.pop()
+
+        self._write("</w:hyperlink>")
+
+    @renders(Image)
+    def image(self, op: Image):
+        location, height, width = op.get_image_path_and_dimensions()
+
+        with open(location, "rb") as image_file:
+            data = image_file.read()
+
+        image_type = _image_type(data)
+        if image_type is None:
+            location, height, width = op.get_404_image_and_dimensions()
+            with open(location, "rb") as image_file:
+                data = image_file.read()
+            image_type = _image_type(data)
+
+        relationship = self._add_relationship("image", image_type[0], data)
+        shape = self._next_id("shape")
+        # 9525 EMUs per pixel
+        cx, cy = int(float(width or 220) * 9525), int(float(height or 300) * 9525)
+
+        self._open_paragraph()
+        self._write(
+            '<w:r><w:drawing><wp:inline><wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="@shape:{shape}" name="Picture"/>'
+            '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture"><pic:pic>'
+            '<pic:nvPicPr><pic:cNvPr id="0" name="Picture"/><pic:cNvPicPr/></pic:nvPicPr>'
+            '<pic:blipFill><a:blip r:embed="@rel:{relationship}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+            '<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm><a:prstGeom prst="rect"/>'
+            '</pic:spPr></pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r>'.format(
+                cx=cx, cy=cy, shape=shape, relationship=relationship)
+        )
+
+    @renders(BulletList, NumberedList)
+    def render_list(self, op: BaseList):
+        self._close_paragraph()
+
+        if not self._list_ids:
+            # Each top-level list is numbered on its own, nested lists are levels of it
+            self._lists.append({})
+            list_id = len(self._lists)
+        else:
+            list_id = self._list_ids[-1]
+
+        level = min(len(self._list_ids), 8)
+        if isinstance(op, BulletList):
+            number_format = "bullet"
+        else:
+            number_format = NUMBER_FORMATS.get(op.type, "decimal")
+        self._lists[list_id - 1].setdefault(level, number_format)
+
+        self._list_ids.append(list_id)
+        yield
+        self._list_ids.pop()
+
+    @renders(ListElement)
+    def list_element(self, op: ListElement):
+        self._close_paragraph()
+
+        level = min(len(self._list_ids), 9) - 1
+        numbering = ['<w:numPr><w:ilvl w:val="{0}"/><w:numId w:val="@num:{1}"/></w:numPr>'.format(
+            level, self._list_ids[-1])]
+        indent = '<w:ind w:left="{0}"/>'.format(720 * (level + 1))
+        self._push_paragraph_properties(numbering=numbering, indent=indent, align=self._alignment(op))
+
+        yield
+
+        if numbering[0] is not None:
+            self._open_paragraph()
+        self._close_paragraph()
+        self._pop_paragraph_properties()
+
+    @renders(Table)
+    def table(self, op: Table):
+        self._close_paragraph()
+
+        rows, columns = op.dimensions
+        self._write(
+            '<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:w="0" w:type="auto"/></w:tblPr>'
+            '<w:tblGrid>{0}</w:tblGrid>'.format("<w:gridCol/>" * columns)
+        )
+        self._paragraph_properties.append({})
+        yield
+        self._paragraph_properties.pop()
+        self._write("</w:tbl>")
+
+    @renders(TableRow)
+    def table_row(self, op: TableRow):
+        self._write("<w:tr>")
+        yield
+        self._write("</w:tr>")
+
+    @renders(TableCell)
+    def table_cell(self, op: TableCell):
+        if op.colspan and op.colspan > 1:
+            self._write('<w:tc><w:tcPr><w:gridSpan w:val="{0}"/></w:tcPr>'.format(op.colspan))
+        else:
+            self._write("<w:tc>")
+
+        self._push_paragraph_properties(align=self._alignment(op))
+        yield
+        self._pop_paragraph_properties()
+
+        # A cell has to end with a paragraph
+        if not self._ends_with_paragraph():
+            self._open_paragraph()
+        self._close_paragraph()
+        self._write("</w:tc>")
+
+
+def _quote(value):
+    return '"{0}"'.format(_escape(str(value)))
+
+
+def split_blocks(blocks, chunk_size):
+    """
+    Split top-level blocks into chunks of about `chunk_size`, only splitting before block operations
+    """
+    chunks, chunk = [], []
+
+    for block in blocks:
+        if len(chunk) >= chunk_size and isinstance(block, BLOCK_OPERATIONS):
+            chunks.append(chunk)
+            chunk = []
+        chunk.append(block)
+
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
+
+
+def _pickle_detached(blocks):
+    # Top-level blocks point to the root Group, which would pickle the whole document with every chunk
+    parents = [block.parent for block in blocks]
+    for block in blocks:
+        block.parent = None
+
+    try:
+        return pickle.dumps(blocks, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for block, parent in zip(blocks, parents):
+            block.parent = parent
+
+
+def _check_picklable_hooks(hooks):
+    try:
+        pickle.dumps(hooks)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise ValueError("Hooks have to be picklable to render on a process pool, use module level functions or "
+                         "render in this process with processes=None: {0}".format(e)) from e
+
+
+def _render_chunk(payload, hooks):
+    root = Group(pickle.loads(payload))
+    for block in root.children:
+        block.set_parent(root)
+
+    return OOXMLRenderer(hooks=hooks).render_fragment(root)
+
+
+# The blocks being rendered by _render_parallel, for forked workers
+_shared_blocks = None
+
+
+def _render_shared_chunk(start, end, hooks):
+    return OOXMLRenderer(hooks=hooks).render_fragment(_shared_blocks[start:end])
+
+
+def _fork_context():
+    # ProcessPoolExecutor only takes a context from Python 3.7
+    if sys.version_info < (3, 7) or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+
+    return multiprocessing.get_context("fork")
+
+
+class Package(namedtuple("Package", ["document", "numbering", "relationships", "media"])):
+    """
+    The parts of a .docx file. `media` is a list of (name, data) for each image.
+    """
+    def save(self, path):
+        content_types = {extension: content_type for _, extension, content_type in IMAGE_TYPES}
+
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+            package.writestr("[Content_Types].xml", XML_DECLARATION + (
+                '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                '{0}'
+                '<Override PartName="/word/document.xml" ContentType="application/'
+                'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+                '<Override PartName="/word/styles.xml" ContentType="application/'
+                'vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+                '<Override PartName="/word/numbering.xml" ContentType="application/'
+                'vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>'
+                '</Types>'
+            ).format("".join('<Default Extension="{0}" ContentType="{1}"/>'.format(extension, content_type)
+                             for extension, content_type in content_types.items())))
+            package.writestr("_rels/.rels", XML_DECLARATION + (
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+                'officeDocument" Target="word/document.xml"/></Relationships>'
+            ))
+            package.writestr("word/document.xml", self.document)
+            package.writestr("word/styles.xml", STYLES)
+            package.writestr("word/numbering.xml", self.numbering)
+            package.writestr("word/_rels/document.xml.rels", self.relationships)
+
+            for name, data in self.media:
+                package.writestr("word/" + name, data)
+
+
+def merge_fragments(fragments):
+    """
+    Join fragments in order, giving every list, relationship, bookmark and shape a document-wide id
+    """
+    body = []
+    lists = []
+    relationships = [
+        '<Relationship Id="rId1" Type="{0}" Target="styles.xml"/>'.format(RELATIONSHIP_TYPES["styles"]),
+        '<Relationship Id="rId2" Type="{0}" Target="numbering.xml"/>'.format(RELATIONSHIP_TYPES["numbering"]),
+    ]
+    media = []
+    offsets = {"num": 0, "rel": _RESERVED_RELATIONSHIPS, "bm": 0, "shape": 0}
+
+    for fragment in fragments:
+        fragment_offsets = dict(offsets)
+
+        def replace(match):
+            kind, local_id = match.groups()
+            value = fragment_offsets[kind] + int(local_id)
+            return '"rId{0}"'.format(value) if kind == "rel" else '"{0}"'.format(value)
+
+        body.append(_PLACEHOLDER_REGEX.sub(replace, fragment.xml))
+
+        lists.extend(fragment.lists)
+
+        for type, target, data in fragment.relationships:
+            relationship_id = "rId{0}".format(len(relationships) + 1)
+            if type == "image":
+                target = "media/image{0}.{1}".format(len(media) + 1, target)
+                media.append((target, data))
+                relationships.append('<Relationship Id="{0}" Type="{1}" Target={2}/>'.format(
+                    relationship_id, RELATIONSHIP_TYPES[type], _quote(target)))
+            else:
+                relationships.append('<Relationship Id="{0}" Type="{1}" Target={2} TargetMode="External"/>'.format(
+                    relationship_id, RELATIONSHIP_TYPES[type], _quote(target)))
+
+        offsets["num"] += len(fragment.lists)
+        offsets["rel"] += len(fragment.relationships)
+        offsets["bm"] += fragment.counts["bm"]
+        offsets["shape"] += fragment.counts["shape"]
+
+    document = XML_DECLARATION + "<w:document {0}><w:body>{1}<w:sectPr/></w:body></w:document>".format(
+        NAMESPACES, "".join(body))
+
+    numbering = XML_DECLARATION + (
+        '<w:numbering xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">{0}{1}</w:numbering>'
+    ).format(
+        "".join(_abstract_numbering(number, levels) for number, levels in enumerate(lists, 1)),
+        "".join('<w:num w:numId="{0}"><w:abstractNumId w:val="{0}"/></w:num>'.format(number)
+                for number in range(1, len(lists) + 1)),
+    )
+
+    relationships = XML_DECLARATION + (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{0}</Relationships>'
+    ).format("".join(relationships))
+
+    return Package(document, numbering, relationships, media)
+
+
+def _abstract_numbering(number, levels):
+    default = levels.get(0, "decimal")
+    xml = []
+
+    for level in range(9):
+        number_format = levels.get(level, default)
+        text = "•" if number_format == "bullet" else "%{0}.".format(level + 1)
+        xml.append(
+            '<w:lvl w:ilvl="{0}"><w:start w:val="1"/><w:numFmt w:val="{1}"/><w:lvlText w:val="{2}"/>'
+            '<w:lvlJc w:val="left"/><w:pPr><w:ind w:left="{3}" w:hanging="360"/></w:pPr></w:lvl>'.format(
+                level, number_format, text, 720 * (level + 1))
+        )
+
+    return '<w:abstractNum w:abstractNumId="{0}">{1}</w:abstractNum>'.format(number, "".join(xml))
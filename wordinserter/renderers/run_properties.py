@@ -0,0 +1,65 @@
+"""
+Tracks the character formatting text should be typed with.
+
+Render methods for formatting operations (Bold, Italic, UnderLine, InlineCode) push and pop properties as they are
+entered and left without making any COM calls. Before anything is typed the renderer asks for the `pending` changes,
+the properties whose wanted value differs from the one last applied to the selection, and applies only those. Nested
+or adjacent runs with the same formatting (`<b>a</b><b>b</b>`, `<b><strong>x</strong></b>`) cost nothing.
+"""
+
+
+class RunProperties(object):
+    """
+    Assumes the text is typed into a selection that is not bold, italic or underlined, as it is at the start of a new
+    paragraph with the default style. Inserting into a run that already has one of these set leaves it set until the
+    first operation that sets and then clears it.
+    """
+    FLAGS = ("bold", "italic", "underline")
+
+    def __init__(self):
+        # How many operations currently want each flag set
+        self.depths = dict.fromkeys(self.FLAGS, 0)
+        self.fonts = []
+        # What the selection is known to have. Font name None means the font has not been overridden.
+        self.applied = dict.fromkeys(self.FLAGS, False)
+        self.applied["font_name"] = None
+        # The font the selection had before it was first overridden, to restore it afterwards
+        self.original_font_name = None
+        # Whether anything has been pushed or popped since the properties were last applied
+        self.dirty = False
+
+    def push(self, name):
+        self.depths[name] += 1
+        self.dirty = True
+
+    def pop(self, name):
+        self.depths[name] -= 1
+        self.dirty = True
+
+    def push_font(self, font_name):
+        self.fonts.append(font_name)
+        self.dirty = True
+
+    def pop_font(self):
+        self.fonts.pop()
+        self.dirty = True
+
+    @property
+    def wanted(self):
+        wanted = {name: depth > 0 for name, depth in self.depths.items()}
+        wanted["font_name"] = self.fonts[-1] if self.fonts else None
+        return wanted
+
+    def pending(self):
+        """
+        :return: A list of (name, value) for each property that has to change. A font_name of None means the
+                 original font should be restored.
+        """
+        applied = self.applied
+        return [(name, value) for name, value in self.wanted.items() if applied[name] != value]
+
+    def mark_applied(self, name, value):
+        self.applied[name] = value
+
+    def mark_clean(self):
+        self.dirty = False
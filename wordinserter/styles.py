@@ -0,0 +1,19 @@
+from .plan import EXIT, walk
+
+
+def style_names(operations):
+    """
+    Collect the class names the formats of some operations use as Word style names, so they can be looked up in the
+    document once before anything is rendered rather than each time an element is formatted.
+    :return: The names in the order they are first used
+    """
+    names = {}
+
+    for opcode, operation in walk(operations):
+        if opcode == EXIT or operation.format is None:
+            continue
+
+        for name in operation.format.style or ():
+            names.setdefault(name, None)
+
+    return list(names)
@@ -19,13 +19,20 @@ class CombinedConstants(object):
 
 
 def pprint(tokens, indent=0):
-    pad = '\t' * indent
-    for token in tokens:
-        if isinstance(token, Text):
+    # Each item is a token to print, or the closing line of a token whose children have been printed
+    stack = [(token, indent, False) for token in reversed(list(tokens))]
+
+    while stack:
+        token, indent, closing = stack.pop()
+        pad = '\t' * indent
+
+        if closing:
+            print(pad + '/' + token.__class__.__name__)
+        elif isinstance(token, Text):
             print(pad + '\t' + repr(token.text))
         elif isinstance(token, ChildlessOperation):
             print(pad + token.__class__.__name__)
         else:
             print(pad + token.__class__.__name__)
-            pprint(list(token), indent + 1)
-            print(pad + '/' + token.__class__.__name__)
+            stack.append((token, indent, True))
+            stack.extend((child, indent + 1, False) for child in reversed(list(token)))